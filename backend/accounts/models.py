@@ -37,8 +37,8 @@ class AccountManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
     def generate_account_number(self, account_instance):
-        """Generate unique account number in format: CLV-XXX-DDMMYY-YY"""
-        import random
+        """Generate unique account number in format: CLV-XXX-DDMMYY-YY-NNNN"""
+        from transactions.sequences import next_value
 
         # Extract last 3 digits of phone
         phone_last_3 = account_instance.phone[-3:] if account_instance.phone else '000'
@@ -56,16 +56,16 @@ class AccountManager(BaseUserManager):
         else:
             dob = None
 
-        # Generate random suffix
-        random_suffix = ''.join(str(random.randint(0, 9)) for _ in range(2))
+        # Unique suffix from the shared account number sequence
+        sequence_suffix = f"{next_value('account_number'):04d}"
 
-        # Format account number: CLV-XXX-DDMMYY-YY-RR
+        # Format account number: CLV-XXX-DDMMYY-YY-NNNN
         if dob:
-            account_number = f"CLV-{phone_last_3}-{dob.strftime('%d%m%y')}-{str(timezone.now().year)[-2:]}-{random_suffix}"
+            account_number = f"CLV-{phone_last_3}-{dob.strftime('%d%m%y')}-{str(timezone.now().year)[-2:]}-{sequence_suffix}"
         else:
             # Use current date if DOB not available
             today = timezone.now().date()
-            account_number = f"CLV-{phone_last_3}-{today.strftime('%d%m%y')}-{str(today.year)[-2:]}-{random_suffix}"
+            account_number = f"CLV-{phone_last_3}-{today.strftime('%d%m%y')}-{str(today.year)[-2:]}-{sequence_suffix}"
 
         return account_number
 
@@ -51,10 +51,10 @@ class Card(models.Model):
     # ?? COMPUTED PROPERTIES
     @property
     def balance(self):
-        """Get real balance from Wallet"""
-        if hasattr(self.account, 'wallet'):
-            return self.account.wallet.balance
-        return Decimal('0.00')
+        """Get real balance from the wallet balance cache"""
+        from transactions.balance_cache import BalanceCache
+        cached = BalanceCache.get(self.account.account_number)
+        return cached[0] if cached else Decimal('0.00')
 
     @property
     def account_number(self):
@@ -41,7 +41,7 @@ class CardViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # FIXED: Filter by account instead of user
-        return Card.objects.filter(account=self.request.user).order_by('-is_primary', '-created_at')
+        return Card.objects.filter(account=self.request.user).select_related('account').order_by('-is_primary', '-created_at')
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -125,7 +125,7 @@ class UserCardsAPIView(generics.ListAPIView):
 
     def get_queryset(self):
         # FIXED: Filter by account
-        return Card.objects.filter(account=self.request.user).order_by('-is_primary', '-created_at')
+        return Card.objects.filter(account=self.request.user).select_related('account').order_by('-is_primary', '-created_at')
 
 
 class CardBalanceAPIView(generics.RetrieveAPIView):
@@ -157,7 +157,7 @@ def user_cards_simple(request):
     """Simple cards endpoint for frontend"""
     try:
         user = request.user
-        cards = Card.objects.filter(account=user).order_by('-is_primary', '-created_at')
+        cards = Card.objects.filter(account=user).select_related('account').order_by('-is_primary', '-created_at')
 
         cards_data = []
         for card in cards:
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0002_alter_transferrequest_reference'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transferrequest',
+            name='compliance__tac_cod_56a7cf_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['tac_code', 'status', 'tac_expires_at'], name='compliance__tac_cod_6805a4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['status', 'tac_expires_at'], name='compliance__status_f7871f_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:20
+
+import compliance.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compliance', '0003_transferrequest_tac_indexes'),
+        ('transactions', '0009_sequence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transferrequest',
+            name='reference',
+            field=models.CharField(default=compliance.models.generate_transfer_request_reference, max_length=50, unique=True),
+        ),
+    ]
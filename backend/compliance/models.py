@@ -5,10 +5,18 @@ from django.utils import timezone
 import uuid
 import random
 
+from transfers.state_machine import StateMachine
+
 # Named function to generate UUID (NO LAMBDA)
 def generate_uuid_reference():
     return str(uuid.uuid4())
 
+
+def generate_transfer_request_reference():
+    """TR-XXXXXXXX (base 36) from the shared transfer request sequence"""
+    from transactions.sequences import next_value, to_base36
+    return f"TR-{to_base36(next_value('transfer_request'), 8)}"
+
 class TransferRequest(models.Model):
     STATUS_CHOICES = [
         ('pending_tac', 'Pending TAC Generation'),
@@ -29,7 +37,7 @@ class TransferRequest(models.Model):
     ]
 
     #  FIXED: Using named function instead of lambda
-    reference = models.CharField(max_length=50, unique=True, default=generate_uuid_reference)
+    reference = models.CharField(max_length=50, unique=True, default=generate_transfer_request_reference)
 
     #  CRITICAL FIX: Use AUTH_USER_MODEL which points to your Account model
     account = models.ForeignKey(
@@ -79,7 +87,8 @@ class TransferRequest(models.Model):
         indexes = [
             models.Index(fields=['account', 'status']),
             models.Index(fields=['status', 'created_at']),
-            models.Index(fields=['tac_code']),
+            models.Index(fields=['tac_code', 'status', 'tac_expires_at']),
+            models.Index(fields=['status', 'tac_expires_at']),
         ]
 
     def __str__(self):
@@ -107,38 +116,31 @@ class TransferRequest(models.Model):
 
         super().save(*args, **kwargs)
 
+    def _transition(self, target, fields=None, **log):
+        """Apply a TRANSFER_REQUEST_STATES transition; ValueError if it loses a race"""
+        if not TRANSFER_REQUEST_STATES.transition(self, target, fields, log):
+            raise ValueError("Transfer was updated by another request, please retry")
+
     def generate_tac(self, admin_user=None):
         if self.status not in ['pending_tac', 'tac_generated']:
             raise ValueError(f"Cannot generate TAC for status: {self.status}")
 
-        self.tac_code = str(random.randint(100000, 999999))
-        self.tac_generated_at = timezone.now()
-        self.tac_expires_at = timezone.now() + timezone.timedelta(hours=24)
-
+        fields = {
+            'tac_code': str(random.randint(100000, 999999)),
+            'tac_generated_at': timezone.now(),
+            'tac_expires_at': timezone.now() + timezone.timedelta(hours=24),
+        }
         if admin_user:
-            self.generated_by = admin_user
-
-        self.status = 'tac_generated'
-        self.save()
+            fields['generated_by'] = admin_user
 
-        TransferLog.objects.create(
-            transfer=self,
-            log_type='tac_generated',
-            message=f'TAC {self.tac_code} generated by admin'
-        )
+        self._transition('tac_generated', fields, log_type='tac_generated',
+                         message=f"TAC {fields['tac_code']} generated by admin")
 
         return self.tac_code
 
     def mark_tac_sent(self):
-        self.status = 'tac_sent'
-        self.tac_sent_at = timezone.now()
-        self.save()
-
-        TransferLog.objects.create(
-            transfer=self,
-            log_type='tac_sent',
-            message='TAC manually sent to client by admin'
-        )
+        self._transition('tac_sent', {'tac_sent_at': timezone.now()}, log_type='tac_sent',
+                         message='TAC manually sent to client by admin')
 
     def verify_tac(self, code):
         if self.status != 'tac_sent':
@@ -150,15 +152,8 @@ class TransferRequest(models.Model):
         if self.tac_expires_at and timezone.now() > self.tac_expires_at:
             return False
 
-        self.status = 'tac_verified'
-        self.tac_verified_at = timezone.now()
-        self.save()
-
-        TransferLog.objects.create(
-            transfer=self,
-            log_type='tac_verified',
-            message=f'TAC verified successfully'
-        )
+        self._transition('tac_verified', {'tac_verified_at': timezone.now()}, log_type='tac_verified',
+                         message='TAC verified successfully')
 
         return True
 
@@ -166,30 +161,18 @@ class TransferRequest(models.Model):
         if self.status != 'tac_verified':
             raise ValueError("Transfer must have verified TAC first")
 
-        self.status = 'pending_settlement'
+        fields = {}
         if admin_user:
-            self.settled_by = admin_user
+            fields['settled_by'] = admin_user
         if external_ref:
-            self.external_reference = external_ref
-
-        self.save()
+            fields['external_reference'] = external_ref
 
-        TransferLog.objects.create(
-            transfer=self,
-            log_type='pending_settlement',
-            message='Ready for external settlement'
-        )
+        self._transition('pending_settlement', fields, log_type='pending_settlement',
+                         message='Ready for external settlement')
 
     def mark_completed(self):
-        self.status = 'completed'
-        self.settled_at = timezone.now()
-        self.save()
-
-        TransferLog.objects.create(
-            transfer=self,
-            log_type='completed',
-            message='Transfer completed with external settlement'
-        )
+        self._transition('completed', {'settled_at': timezone.now()}, log_type='completed',
+                         message='Transfer completed with external settlement')
 
 
 class TransferLog(models.Model):
@@ -224,6 +207,17 @@ class TransferLog(models.Model):
         return f"{self.transfer.reference} - {self.log_type}"
 
 
+# Allowed TransferRequest status transitions (see transfers/state_machine.py)
+TRANSFER_REQUEST_STATES = StateMachine(TransferRequest, TransferLog, {
+    'pending_tac': ('tac_generated', 'kyc_required', 'cancelled'),
+    'kyc_required': ('pending_tac', 'cancelled'),
+    'tac_generated': ('tac_generated', 'tac_sent', 'pending_tac', 'cancelled'),
+    'tac_sent': ('tac_verified', 'pending_tac', 'cancelled'),
+    'tac_verified': ('pending_settlement',),
+    'pending_settlement': ('completed',),
+})
+
+
 class ComplianceSetting(models.Model):
     SETTING_TYPES = [
         ('kyc_threshold', 'KYC Transfer Threshold'),
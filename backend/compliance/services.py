@@ -3,8 +3,22 @@ compliance/services.py - Business logic for compliance
 """
 from django.utils import timezone
 from django.db import transaction, models  #  ADD 'models' import
+from django.core.cache import cache
+import logging
+
 from django.core.exceptions import ValidationError
 from .models import TransferRequest, TransferLog, ComplianceSetting
+from transfers.limits import TransferLimitService
+
+logger = logging.getLogger(__name__)
+
+# Statuses in which a TransferRequest holds a live TAC
+TAC_ISSUED_STATUSES = ('tac_generated', 'tac_sent')
+TAC_EXPIRY_BATCH_SIZE = 1000
+
+PENDING_ADMIN_STATUSES = ('pending_tac', 'tac_generated', 'tac_verified', 'kyc_required')
+PENDING_ADMIN_ACTIONS_CACHE_KEY = 'compliance:pending-admin-actions'
+PENDING_ADMIN_ACTIONS_CACHE_TIMEOUT = 300
 
 
 class TransferService:
@@ -20,22 +34,10 @@ class TransferService:
         if amount <= 0:
             raise ValidationError("Amount must be positive")
 
-        # Check daily limit
-        daily_limit = ComplianceSetting.objects.filter(
-            setting_type='daily_limit',
-            is_active=True
-        ).first()
-
-        if daily_limit:
-            today = timezone.now().date()
-            today_total = TransferRequest.objects.filter(
-                account=account,
-                created_at__date=today,
-                status__in=['completed', 'tac_verified']
-            ).aggregate(models.Sum('amount'))['amount__sum'] or 0
-
-            if today_total + amount > float(daily_limit.value):
-                raise ValidationError(f"Daily limit exceeded. Remaining: ${float(daily_limit.value) - today_total}")
+        # Check per-transaction and daily/weekly/monthly limits
+        limit_errors = TransferLimitService.check(account.account_number, amount)
+        if limit_errors:
+            raise ValidationError("; ".join(limit_errors))
 
         # Create transfer
         transfer = TransferRequest.objects.create(
@@ -118,15 +120,66 @@ class TransferService:
             account=account
         ).select_related('account').prefetch_related('logs').order_by('-created_at')[:limit]
 
+    @staticmethod
+    def expire_tacs(batch_size=TAC_EXPIRY_BATCH_SIZE):
+        """
+        Send requests whose TAC expired back to pending_tac (code cleared),
+        so they show up for TAC generation again. Works batch_size rows per
+        transaction and logs each request.
+
+        Returns:
+            Number of transfer requests expired
+        """
+        expired = 0
+        while True:
+            now = timezone.now()
+            with transaction.atomic():
+                rows = list(
+                    TransferRequest.objects.select_for_update(skip_locked=True).filter(
+                        status__in=TAC_ISSUED_STATUSES, tac_expires_at__lte=now
+                    ).values_list('id', 'status')[:batch_size]
+                )
+                if not rows:
+                    break
+
+                TransferRequest.objects.filter(id__in=[row_id for row_id, _ in rows]).update(
+                    status='pending_tac', tac_code=None, updated_at=now
+                )
+                TransferLog.objects.bulk_create([
+                    TransferLog(
+                        transfer_id=row_id,
+                        log_type='status_change',
+                        message='TAC expired; awaiting new TAC',
+                        metadata={'previous_status': previous_status}
+                    )
+                    for row_id, previous_status in rows
+                ])
+            expired += len(rows)
+
+        if expired:
+            # Bulk updates bypass the status-change signals
+            TransferService.invalidate_pending_admin_actions()
+            logger.info(f"Expired TACs on {expired} transfer requests")
+        return expired
+
     @staticmethod
     def get_pending_admin_actions():
-        """Get counts of pending admin actions"""
-        return {
-            'pending_tac': TransferRequest.objects.filter(status='pending_tac').count(),
-            'tac_generated': TransferRequest.objects.filter(status='tac_generated').count(),
-            'tac_verified': TransferRequest.objects.filter(status='tac_verified').count(),
-            'kyc_required': TransferRequest.objects.filter(status='kyc_required').count(),
-        }
+        """Get counts of pending admin actions (one grouped query, cached)"""
+        actions = cache.get(PENDING_ADMIN_ACTIONS_CACHE_KEY)
+        if actions is None:
+            actions = dict.fromkeys(PENDING_ADMIN_STATUSES, 0)
+            actions.update(
+                TransferRequest.objects.filter(
+                    status__in=PENDING_ADMIN_STATUSES
+                ).values_list('status').annotate(count=models.Count('id')).order_by()
+            )
+            cache.set(PENDING_ADMIN_ACTIONS_CACHE_KEY, actions, PENDING_ADMIN_ACTIONS_CACHE_TIMEOUT)
+        return actions
+
+    @staticmethod
+    def invalidate_pending_admin_actions():
+        """Drop the cached counts once the current transaction commits"""
+        transaction.on_commit(lambda: cache.delete(PENDING_ADMIN_ACTIONS_CACHE_KEY))
 
 
 class ComplianceService:
@@ -147,44 +200,7 @@ class ComplianceService:
     @staticmethod
     def check_transfer_limits(account, amount):
         """Check if transfer exceeds limits"""
-        errors = []
-
-        # Get limits
-        daily_limit = ComplianceSetting.objects.filter(
-            setting_type='daily_limit',
-            is_active=True
-        ).first()
-
-        weekly_limit = ComplianceSetting.objects.filter(
-            setting_type='weekly_limit',
-            is_active=True
-        ).first()
-
-        # Check daily limit
-        if daily_limit:
-            today = timezone.now().date()
-            today_total = TransferRequest.objects.filter(
-                account=account,
-                created_at__date=today,
-                status__in=['completed', 'tac_verified']
-            ).aggregate(models.Sum('amount'))['amount__sum'] or 0
-
-            if today_total + amount > float(daily_limit.value):
-                errors.append(f"Daily limit: ${daily_limit.value}. Used: ${today_total}")
-
-        # Check weekly limit
-        if weekly_limit:
-            week_ago = timezone.now() - timezone.timedelta(days=7)
-            weekly_total = TransferRequest.objects.filter(
-                account=account,
-                created_at__gte=week_ago,
-                status__in=['completed', 'tac_verified']
-            ).aggregate(models.Sum('amount'))['amount__sum'] or 0
-
-            if weekly_total + amount > float(weekly_limit.value):
-                errors.append(f"Weekly limit: ${weekly_limit.value}. Used: ${weekly_total}")
-
-        return errors
+        return TransferLimitService.check(account.account_number, amount)
 
     @staticmethod
     def update_settings(settings_data, updated_by):
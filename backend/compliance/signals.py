@@ -0,0 +1,26 @@
+"""
+compliance/signals.py - Keep cached compliance aggregates current
+"""
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import TransferRequest
+from .services import TransferService
+
+
+@receiver(post_init, sender=TransferRequest)
+def remember_pending_actions_status(sender, instance, **kwargs):
+    instance._pending_actions_status = instance.status
+
+
+@receiver(post_save, sender=TransferRequest)
+def invalidate_pending_actions_on_save(sender, instance, created, **kwargs):
+    """Pending admin action counts only move when a request is created or changes status"""
+    if created or instance.status != instance._pending_actions_status:
+        TransferService.invalidate_pending_admin_actions()
+        instance._pending_actions_status = instance.status
+
+
+@receiver(post_delete, sender=TransferRequest)
+def invalidate_pending_actions_on_delete(sender, instance, **kwargs):
+    TransferService.invalidate_pending_admin_actions()
@@ -10,7 +10,7 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db import models
 
-from .models import TransferRequest, TransferLog, ComplianceSetting
+from .models import TransferRequest, TransferLog, ComplianceSetting, TRANSFER_REQUEST_STATES
 from .serializers import (
     TransferCreateSerializer, TransferSerializer, TransferDetailSerializer,
     TACVerificationSerializer, TransferStatusSerializer,
@@ -72,9 +72,11 @@ class TransferViewSet(viewsets.ModelViewSet):
             ).exists()
 
             if data['amount'] >= 1500.00 and not has_kyc:
-                transfer.requires_kyc = True
-                transfer.status = 'kyc_required'
-                transfer.save()
+                if transfer.status != 'kyc_required':
+                    TRANSFER_REQUEST_STATES.transition(
+                        transfer, 'kyc_required', {'requires_kyc': True},
+                        {'log_type': 'status_change', 'message': 'KYC required for this transfer amount'}
+                    )
                 
                 #  ADDED: Trigger Pusher for KYC requirement
                 trigger_notification(
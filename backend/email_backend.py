@@ -1,99 +1,233 @@
+"""
+SendGrid email backend (HTTP v3 mail/send API)
+
+send_messages() groups messages that share sender, subject and content
+into one request with a personalization per message, up to SendGrid's
+limits (SENDGRID_MAX_PERSONALIZATIONS personalizations and 1000
+recipients per request), and posts the independent requests concurrently
+on SENDGRID_MAX_WORKERS threads. All requests go through one keep-alive
+connection pool, so a burst of mail does not pay a TLS handshake per
+message.
+
+Unless fail_silently is set, a request that fails (connection error or a
+non-202 response) raises once every request of the call has finished:
+SendGridError, with .sent set to the messages SendGrid did accept, so a
+caller can tell delivered mail from mail to retry.
+
+    SENDGRID_API_KEY = '...'
+    SENDGRID_API_URL = 'https://api.sendgrid.com/v3/mail/send'  # or a local stub
+"""
+
 import logging
 import os
-import sendgrid
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parseaddr
+
+import requests
+from requests.adapters import HTTPAdapter
 from django.core.mail.backends.base import BaseEmailBackend
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+SENDGRID_API_URL = 'https://api.sendgrid.com/v3/mail/send'
+MAX_PERSONALIZATIONS = 1000  # SendGrid: personalizations per request
+MAX_RECIPIENTS = 1000  # SendGrid: to + cc + bcc across one request
+
+
+
+class SendGridError(Exception):
+    """A mail/send request failed; sent is the number of messages accepted anyway"""
+
+    def __init__(self, message, sent=0):
+        super().__init__(message)
+        self.sent = sent
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=10):
+    """
+    Process-wide HTTP session with a keep-alive connection pool.
+
+    Shared by all backend instances and threads: urllib3's pool is
+    thread-safe and this API sets no cookies. Rebuilt after fork.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+
 class SendGridEmailBackend(BaseEmailBackend):
     """SendGrid email backend that properly sends BOTH HTML and plain text versions"""
-    
-    def __init__(self, fail_silently=False, **kwargs):
+
+    def __init__(self, fail_silently=False, api_key=None, api_url=None, max_personalizations=None,
+                 max_workers=None, timeout=None, **kwargs):
         super().__init__(fail_silently=fail_silently)
         # Try to get API key from environment first, then from settings
-        self.api_key = os.environ.get('SENDGRID_API_KEY')
+        self.api_key = api_key or os.environ.get('SENDGRID_API_KEY') or getattr(settings, 'SENDGRID_API_KEY', None)
+        self.api_url = api_url or getattr(settings, 'SENDGRID_API_URL', SENDGRID_API_URL)
+        self.max_personalizations = min(
+            max_personalizations or getattr(settings, 'SENDGRID_MAX_PERSONALIZATIONS', MAX_PERSONALIZATIONS),
+            MAX_PERSONALIZATIONS
+        )
+        self.max_workers = max_workers or getattr(settings, 'SENDGRID_MAX_WORKERS', 4)
+        self.timeout = timeout or getattr(settings, 'SENDGRID_TIMEOUT', 10)
+
         if not self.api_key:
-            self.api_key = getattr(settings, 'SENDGRID_API_KEY', None)
-        
-        if self.api_key:
-            logger.info(f"SendGrid backend initialized. API Key present: {self.api_key[:8]}...")
-        else:
             logger.error("CRITICAL: No SendGrid API key found!")
-        
+
     def send_messages(self, email_messages):
+        """Send messages; returns how many were accepted by SendGrid"""
         if not email_messages:
             return 0
-        
-        sent_count = 0
+
+        if not self.api_key:
+            logger.error("Cannot send email: No API key available")
+            return 0
+
+        batches = self._batches(email_messages)
+        if len(batches) == 1:
+            return self._post(*batches[0])
+
+        # Wait for every request before raising, so mail already accepted is counted
+        sent, errors = 0, []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+            for future in as_completed([pool.submit(self._post, *batch) for batch in batches]):
+                try:
+                    sent += future.result()
+                except Exception as e:
+                    errors.append(e)
+
+        if errors:
+            raise SendGridError(
+                f"{len(errors)} of {len(batches)} SendGrid requests failed "
+                f"({sent} message(s) sent): {errors[0]}", sent=sent
+            ) from errors[0]
+        return sent
+
+    def _batches(self, email_messages):
+        """Split messages into requests: [(payload, message_count), ...]"""
+        groups = {}
         for message in email_messages:
-            if self._send(message):
-                sent_count += 1
-        return sent_count
-    
-    def _send(self, message):
+            personalization = self._personalization(message)
+            if personalization is None:
+                continue
+            groups.setdefault(self._group_key(message), (message, []))[1].append(personalization)
+
+        batches = []
+        for message, personalizations in groups.values():
+            chunk, recipients = [], 0
+            for personalization in personalizations:
+                count = sum(len(personalization.get(kind, ())) for kind in ('to', 'cc', 'bcc'))
+                if chunk and (len(chunk) >= self.max_personalizations or recipients + count > MAX_RECIPIENTS):
+                    batches.append((self._payload(message, chunk), len(chunk)))
+                    chunk, recipients = [], 0
+                chunk.append(personalization)
+                recipients += count
+            batches.append((self._payload(message, chunk), len(chunk)))
+        return batches
+
+    def _group_key(self, message):
+        """Messages with the same key differ only in recipients"""
+        return (
+            message.from_email or settings.DEFAULT_FROM_EMAIL,
+            message.subject,
+            message.body,
+            tuple(getattr(message, 'alternatives', None) or ()),
+            tuple(message.reply_to),
+        )
+
+    def _personalization(self, message):
+        if not message.to:
+            return None
+
+        personalization = {"to": [{"email": address} for address in message.to]}
+        if message.cc:
+            personalization["cc"] = [{"email": address} for address in message.cc]
+        if message.bcc:
+            personalization["bcc"] = [{"email": address} for address in message.bcc]
+        return personalization
+
+    def _payload(self, message, personalizations):
+        # 🔥 FIX: Build content array to include BOTH plain text AND HTML
+        content = []
+
+        # Add plain text version (always present)
+        if message.body:
+            content.append({
+                "type": "text/plain",
+                "value": message.body
+            })
+
+        # Add HTML version if it exists in alternatives
+        if hasattr(message, 'alternatives') and message.alternatives:
+            for alt_content, alt_type in message.alternatives:
+                if alt_type == 'text/html':
+                    content.append({
+                        "type": "text/html",
+                        "value": alt_content
+                    })
+
+        # If no content found (fallback)
+        if not content:
+            content.append({
+                "type": "text/plain",
+                "value": "Please view this email in HTML format for the best experience."
+            })
+
+        name, address = parseaddr(message.from_email or settings.DEFAULT_FROM_EMAIL)
+        sender = {"email": address}
+        if name:
+            sender["name"] = name
+
+        data = {
+            "personalizations": personalizations,
+            "from": sender,
+            "subject": message.subject,
+            "content": content  # 🔥 NOW CONTAINS BOTH HTML AND PLAIN TEXT
+        }
+        if message.reply_to:
+            data["reply_to"] = {"email": parseaddr(message.reply_to[0])[1]}
+        return data
+
+    def _post(self, data, message_count):
+        """
+        POST one request; returns message_count if SendGrid accepted it.
+
+        Raises:
+            requests.RequestException, SendGridError: if it was not accepted
+                (with fail_silently, 0 is returned instead)
+        """
         try:
-            if not self.api_key:
-                logger.error("Cannot send email: No API key available")
-                return False
-            
-            # Create client
-            sg = sendgrid.SendGridAPIClient(api_key=self.api_key)
-            
-            # Get recipient
-            to_email = message.to[0] if isinstance(message.to, (list, tuple)) else message.to
-            
-            # 🔥 FIX: Build content array to include BOTH plain text AND HTML
-            content = []
-            
-            # Add plain text version (always present)
-            if message.body:
-                content.append({
-                    "type": "text/plain",
-                    "value": message.body
-                })
-            
-            # Add HTML version if it exists in alternatives
-            if hasattr(message, 'alternatives') and message.alternatives:
-                for alt_content, alt_type in message.alternatives:
-                    if alt_type == 'text/html':
-                        content.append({
-                            "type": "text/html",
-                            "value": alt_content
-                        })
-            
-            # If no content found (fallback)
-            if not content:
-                content.append({
-                    "type": "text/plain",
-                    "value": "Please view this email in HTML format for the best experience."
-                })
-            
-            # Build email data with BOTH versions
-            data = {
-                "personalizations": [
-                    {
-                        "to": [{"email": to_email}]
-                    }
-                ],
-                "from": {"email": message.from_email or settings.DEFAULT_FROM_EMAIL},
-                "subject": message.subject,
-                "content": content  # 🔥 NOW CONTAINS BOTH HTML AND PLAIN TEXT
-            }
-            
-            # Send
-            response = sg.client.mail.send.post(request_body=data)
-            
-            if response.status_code == 202:
-                logger.info(f"✅ Email sent to {to_email} with {len(content)} content type(s)")
-                return True
-            else:
-                logger.error(f"❌ SendGrid error: {response.status_code}")
-                logger.error(f"Response: {response.body}")
-                return False
-                
-        except Exception as e:
+            response = get_session(self.max_workers).post(
+                self.api_url,
+                json=data,
+                headers={'Authorization': f'Bearer {self.api_key}'},
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
             logger.error(f"❌ Email error: {e}")
             if not self.fail_silently:
                 raise
-            return False
\ No newline at end of file
+            return 0
+
+        if response.status_code == 202:
+            logger.info(f"✅ Email sent: {message_count} message(s) in one request")
+            return message_count
+
+        logger.error(f"❌ SendGrid error: {response.status_code}")
+        logger.error(f"Response: {response.text}")
+        if not self.fail_silently:
+            raise SendGridError(f"SendGrid returned {response.status_code}: {response.text}")
+        return 0
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification, NotificationPreference, NotificationLog
+from .models import Notification, NotificationPreference, NotificationLog, NotificationOutbox, NotificationCounter
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -23,3 +23,17 @@ class NotificationLogAdmin(admin.ModelAdmin):
     search_fields = ['notification__title', 'details']
     readonly_fields = ['created_at']
     list_per_page = 100
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ['notification', 'channel', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['channel', 'status']
+    search_fields = ['notification__title', 'last_error']
+    readonly_fields = ['created_at', 'claimed_at', 'sent_at']
+    list_per_page = 100
+
+@admin.register(NotificationCounter)
+class NotificationCounterAdmin(admin.ModelAdmin):
+    list_display = ['account', 'unread_count', 'updated_at']
+    search_fields = ['account__account_number']
+    readonly_fields = ['updated_at']
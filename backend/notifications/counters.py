@@ -0,0 +1,195 @@
+# notifications/counters.py
+"""
+Per-account unread notification counters.
+
+The unread badge is polled constantly, so it is never counted from the
+Notification table. Each account has a NotificationCounter row, moved by
+the same transaction that creates a notification or takes one out of
+UNREAD (Notification.save, Notification.mark_as_read/mark_as_archived,
+MarkAllAsReadView, NotificationService.notify_staff). Reads come from
+the default Django cache, filled from the counter row; a write drops the
+cache entry once it commits.
+
+Anything that changes notification status behind these paths (queryset
+.update(), deletes in the admin) leaves the counter off until the
+repair_unread_counters command recounts it - run it periodically.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from accounts.models import Account
+from .models import Notification, NotificationCounter
+
+logger = logging.getLogger(__name__)
+
+UNREAD_CACHE_TIMEOUT = getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 300)
+
+
+def _key(account_id):
+    return f'notifications:unread:{account_id}'
+
+
+class UnreadCounter:
+    """Cached per-account unread notification counts"""
+
+    @staticmethod
+    def get(account_id):
+        """Unread notification count of an account (by account id)"""
+        count = cache.get(_key(account_id))
+        if count is not None:
+            return count
+
+        count = NotificationCounter.objects.filter(
+            account_id=account_id
+        ).values_list('unread_count', flat=True).first()
+        if count is None:
+            # First read before any notification moved the counter
+            count = UnreadCounter._seed(account_id)
+
+        cache.set(_key(account_id), count, UNREAD_CACHE_TIMEOUT)
+        return count
+
+    @staticmethod
+    def get_for_account_number(account_number):
+        """Unread notification count of an account (by account number)"""
+        account_id = Account.objects.filter(
+            account_number=account_number
+        ).values_list('id', flat=True).first()
+        if account_id is None:
+            return 0
+        return UnreadCounter.get(account_id)
+
+    @staticmethod
+    def adjust(account_id, delta):
+        """
+        Add delta to an account's unread count, in the caller's transaction.
+
+        Call it after the notification rows themselves have changed: an
+        account without a counter row is seeded by counting them.
+        """
+        if not delta:
+            return
+
+        with transaction.atomic():
+            updated = NotificationCounter.objects.filter(account_id=account_id).update(
+                unread_count=F('unread_count') + delta,
+                updated_at=timezone.now()
+            )
+            if not updated:
+                UnreadCounter._seed(account_id, delta)
+
+        transaction.on_commit(lambda: cache.delete(_key(account_id)))
+
+    @staticmethod
+    def increment_many(account_ids):
+        """
+        Add one to the unread count of each account (a fan-out of new
+        notifications), in the caller's transaction: one UPDATE, plus one
+        grouped count and INSERT for accounts without a counter row yet.
+        """
+        account_ids = set(account_ids)
+        if not account_ids:
+            return
+
+        with transaction.atomic():
+            updated = NotificationCounter.objects.filter(account_id__in=account_ids).update(
+                unread_count=F('unread_count') + 1,
+                updated_at=timezone.now()
+            )
+            if updated < len(account_ids):
+                existing = set(
+                    NotificationCounter.objects.filter(account_id__in=account_ids).values_list('account_id', flat=True)
+                )
+                missing = account_ids - existing
+                counts = dict(
+                    Notification.objects.filter(recipient_id__in=missing, status='UNREAD').order_by().values(
+                        'recipient_id'
+                    ).annotate(count=Count('id')).values_list('recipient_id', 'count')
+                )
+                # A counter seeded concurrently wins; repair_unread_counters settles any difference
+                NotificationCounter.objects.bulk_create(
+                    [NotificationCounter(account_id=account_id, unread_count=counts.get(account_id, 0))
+                     for account_id in missing],
+                    ignore_conflicts=True
+                )
+
+        transaction.on_commit(lambda: cache.delete_many([_key(account_id) for account_id in account_ids]))
+
+    @staticmethod
+    def rebuild(account_id):
+        """
+        Recount an account's unread notifications into its counter.
+
+        The counter row is locked first, so a concurrent adjust() either
+        committed before the count (and is in it) or waits and applies its
+        delta on top.
+
+        Returns:
+            The new unread count
+        """
+        with transaction.atomic():
+            exists = NotificationCounter.objects.select_for_update().filter(account_id=account_id).exists()
+            if not exists:
+                return UnreadCounter._seed(account_id)
+
+            count = Notification.objects.filter(recipient_id=account_id, status='UNREAD').count()
+            NotificationCounter.objects.filter(account_id=account_id).update(
+                unread_count=count,
+                updated_at=timezone.now()
+            )
+
+        transaction.on_commit(lambda: cache.delete(_key(account_id)))
+        return count
+
+    @staticmethod
+    def repair(account_ids=None):
+        """
+        Find counters that disagree with the Notification table and rebuild them.
+
+        Args:
+            account_ids: Only check these accounts (default: all)
+
+        Returns:
+            Dict with 'checked' and 'repaired' account counts
+        """
+        unread = Notification.objects.filter(status='UNREAD')
+        counters = NotificationCounter.objects.all()
+        if account_ids is not None:
+            unread = unread.filter(recipient_id__in=account_ids)
+            counters = counters.filter(account_id__in=account_ids)
+
+        actual = dict(
+            unread.order_by().values('recipient_id').annotate(count=Count('id')).values_list('recipient_id', 'count')
+        )
+        stored = dict(counters.values_list('account_id', 'unread_count'))
+
+        drifted = sorted(
+            account_id for account_id in actual.keys() | stored.keys()
+            if actual.get(account_id, 0) != stored.get(account_id)
+        )
+        for account_id in drifted:
+            count = UnreadCounter.rebuild(account_id)
+            logger.info(f"Unread counter for account #{account_id}: {stored.get(account_id)} -> {count}")
+
+        return {'checked': len(actual.keys() | stored.keys()), 'repaired': len(drifted)}
+
+    @staticmethod
+    def _seed(account_id, delta=0):
+        """Create a missing counter row from a count of the account's notifications"""
+        count = Notification.objects.filter(recipient_id=account_id, status='UNREAD').count()
+        try:
+            with transaction.atomic():
+                NotificationCounter.objects.create(account_id=account_id, unread_count=count)
+        except IntegrityError:
+            # Seeded concurrently: that count predates our change, so apply it
+            NotificationCounter.objects.filter(account_id=account_id).update(
+                unread_count=F('unread_count') + delta,
+                updated_at=timezone.now()
+            )
+            return NotificationCounter.objects.get(account_id=account_id).unread_count
+        return count
@@ -0,0 +1,148 @@
+"""
+Daily notification digests
+
+For an account with NotificationPreference.daily_digest on, email that
+would go out right away is queued as a DIGEST outbox row instead, due at
+the account's next digest_time (see NotificationPreference.digests and
+NotificationService.enqueue_delivery_many). HIGH priority email still
+goes out immediately unless immediate_delivery is off.
+
+The send_digests command runs a DigestWorker:
+
+  * claim_digests() claims every due DIGEST row of a batch of recipients
+    (SELECT ... FOR UPDATE SKIP LOCKED, like claim_outbox), so each
+    recipient's slot is in one batch;
+  * each recipient gets one email listing all of those notifications,
+    sent over one mail connection shared by the batch;
+  * outcomes are written with record_results(), so a failed digest is
+    retried with the outbox backoff and logged as DIGEST_SENT/FAILED.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import NotificationOutbox
+from .outbox import (
+    OutboxWorker, claimable_outbox, record_results,
+    OUTBOX_THREADS, OUTBOX_MAX_ATTEMPTS, OUTBOX_CLAIM_TIMEOUT
+)
+from .services import NotificationDeliveryError
+
+logger = logging.getLogger(__name__)
+
+DIGEST_BATCH_SIZE = getattr(settings, 'NOTIFICATION_DIGEST_BATCH_SIZE', 200)  # recipients per batch
+
+
+def claim_digests(batch_size=DIGEST_BATCH_SIZE, claim_timeout=OUTBOX_CLAIM_TIMEOUT):
+    """
+    Claim all due DIGEST rows of up to batch_size recipients.
+
+    Returns:
+        Dict of recipient id -> claimed NotificationOutbox rows, oldest notification first
+    """
+    now = timezone.now()
+    due = NotificationOutbox.objects.filter(claimable_outbox(now, claim_timeout), channel='DIGEST')
+
+    with transaction.atomic():
+        recipient_ids = list(
+            due.order_by().values_list('notification__recipient_id', flat=True).distinct()[:batch_size]
+        )
+        if not recipient_ids:
+            return {}
+
+        entries = list(
+            due.filter(notification__recipient_id__in=recipient_ids).select_for_update(
+                skip_locked=True, of=('self',)
+            ).select_related('notification__recipient').order_by('notification__created_at', 'id')
+        )
+        NotificationOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+            status='SENDING', claimed_at=now
+        )
+
+    digests = {}
+    for entry in entries:
+        entry.status = 'SENDING'
+        entry.claimed_at = now
+        digests.setdefault(entry.notification.recipient_id, []).append(entry)
+    return digests
+
+
+def render_digest(recipient, notifications):
+    """Build the digest email of one recipient"""
+    context = {
+        'recipient': recipient,
+        'notifications': notifications,
+        'count': len(notifications),
+    }
+    plural = '' if len(notifications) == 1 else 's'
+    message = EmailMultiAlternatives(
+        subject=f"Claverica: Your daily summary ({len(notifications)} notification{plural})",
+        body=render_to_string('notifications/digest_email.txt', context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient.email],
+    )
+    message.attach_alternative(render_to_string('notifications/digest_email.html', context), 'text/html')
+    return message
+
+
+class DigestWorker(OutboxWorker):
+    """Claims due digests by recipient and sends one email per recipient"""
+
+    poll_interval = 60  # seconds
+
+    def __init__(self, threads=OUTBOX_THREADS, batch_size=DIGEST_BATCH_SIZE,
+                 max_attempts=OUTBOX_MAX_ATTEMPTS, claim_timeout=OUTBOX_CLAIM_TIMEOUT):
+        super().__init__(threads, batch_size, max_attempts, claim_timeout)
+        self.connection = None
+
+    def claim(self):
+        """Claim a batch of recipients; returns one list of rows per recipient"""
+        digests = list(claim_digests(self.batch_size, self.claim_timeout).values())
+        if digests:
+            # One mail connection for the batch; record() closes it
+            self.connection = get_connection()
+            self.connection.open()
+        return digests
+
+    def process(self, entries):
+        """Send one recipient's digest; returns the log details or raises"""
+        recipient = entries[0].notification.recipient
+        message = render_digest(recipient, [entry.notification for entry in entries])
+
+        try:
+            sent = self.connection.send_messages([message])
+        except Exception as e:
+            raise NotificationDeliveryError(f'Digest failed: {e}')
+
+        if not sent:
+            raise NotificationDeliveryError('Digest failed: backend sent nothing')
+        return f'Digest of {len(entries)} notifications sent to {recipient.email}'
+
+    def record(self, outcomes):
+        """
+        Returns:
+            Dict of row counts: claimed, sent, failed (will be retried), dead (given up)
+        """
+        self.connection.close()
+        self.connection = None
+
+        sent, failed = [], []
+        for entries, details, error in outcomes:
+            if error is None:
+                sent.extend((entry, details) for entry in entries)
+            else:
+                logger.warning(f"Digest for account #{entries[0].notification.recipient_id} failed: {error}")
+                failed.extend((entry, error) for entry in entries)
+
+        dead = record_results(sent, failed, self.max_attempts)
+        return {
+            'claimed': len(sent) + len(failed),
+            'sent': len(sent),
+            'failed': len(failed) - dead,
+            'dead': dead,
+        }
@@ -0,0 +1,88 @@
+"""
+notifications/management/commands/benchmark_email_backend.py
+Messages per second through the SendGrid email backend, against a local stub
+
+Nothing is sent to SendGrid: the backend posts to a local HTTP server that
+answers 202 after --latency milliseconds (a stand-in for the network).
+
+    python manage.py benchmark_email_backend --messages 2000 --distinct 1 10 2000 --latency 20
+
+Modes:
+    per-message  one new HTTP client and request per message (the old backend)
+    pooled       one request per message on the pooled session, concurrent
+    batched      messages with the same content share a request
+"""
+
+import time
+
+import requests
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand
+
+from backend.email_backend import SendGridEmailBackend
+from utils.sendgrid_stub import SendGridStub
+
+
+class Command(BaseCommand):
+    help = 'Benchmark SendGrid email backend throughput against a local stub server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000, help='Messages per run')
+        parser.add_argument(
+            '--distinct',
+            type=int,
+            nargs='+',
+            default=[1, 50],
+            help='Distinct subject/body combinations among the messages'
+        )
+        parser.add_argument('--latency', type=float, default=20, help='Stub response time in milliseconds')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent requests')
+        parser.add_argument(
+            '--skip-per-message',
+            action='store_true',
+            help='Skip the (slow) one-client-per-message baseline'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('SENDGRID BACKEND BENCHMARK'))
+        self.stdout.write(f"{'mode':>12} {'distinct':>9} {'messages':>9} {'requests':>9} "
+                          f"{'conns':>6} {'sent':>6} {'seconds':>8} {'msg/s':>9}")
+
+        modes = ['pooled', 'batched'] if options['skip_per_message'] else ['per-message', 'pooled', 'batched']
+        for distinct in options['distinct']:
+            messages = [
+                EmailMessage(
+                    subject=f'Claverica: Notification {i % distinct}',
+                    body=f'Benchmark notification body {i % distinct}',
+                    to=[f'bench-{i}@claverica.local'],
+                )
+                for i in range(options['messages'])
+            ]
+            for mode in modes:
+                with SendGridStub(latency=options['latency'] / 1000) as stub:
+                    started = time.perf_counter()
+                    sent = self._run(mode, stub.url, messages, options['workers'])
+                    elapsed = time.perf_counter() - started
+
+                self.stdout.write(
+                    f"{mode:>12} {distinct:>9} {len(messages):>9} {len(stub.requests):>9} "
+                    f"{stub.connections:>6} {sent:>6} {elapsed:>8.2f} {sent / elapsed if elapsed else 0:>9.1f}"
+                )
+
+    def _run(self, mode, url, messages, workers):
+        if mode == 'per-message':
+            backend = SendGridEmailBackend(api_key='benchmark', api_url=url, max_personalizations=1)
+            sent = 0
+            for message in messages:
+                data, count = backend._batches([message])[0]
+                response = requests.post(url, json=data, headers={'Authorization': 'Bearer benchmark'}, timeout=10)
+                sent += count if response.status_code == 202 else 0
+            return sent
+
+        backend = SendGridEmailBackend(
+            api_key='benchmark',
+            api_url=url,
+            max_workers=workers,
+            max_personalizations=1 if mode == 'pooled' else None,
+        )
+        return backend.send_messages(messages)
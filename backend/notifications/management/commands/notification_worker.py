@@ -0,0 +1,52 @@
+"""
+notifications/management/commands/notification_worker.py
+Deliver queued notification email and push from the notification outbox
+
+    python manage.py notification_worker [--threads 8] [--batch-size 100] [--once]
+
+Run as many workers as needed; they claim disjoint batches with
+SELECT ... FOR UPDATE SKIP LOCKED. Failed deliveries are retried with
+exponential backoff (see notifications/outbox.py).
+"""
+
+from notifications.outbox import (
+    OutboxWorker, OUTBOX_BATCH_SIZE, OUTBOX_THREADS, OUTBOX_MAX_ATTEMPTS, OUTBOX_CLAIM_TIMEOUT
+)
+from utils.workers import ClaimWorkerCommand
+
+
+class Command(ClaimWorkerCommand):
+    help = 'Deliver queued notification email and push'
+
+    default_threads = OUTBOX_THREADS
+    default_batch_size = OUTBOX_BATCH_SIZE
+    default_claim_timeout = OUTBOX_CLAIM_TIMEOUT
+    default_poll_interval = OutboxWorker.poll_interval
+    batch_help = 'Outbox rows claimed per batch'
+
+    def add_worker_arguments(self, parser):
+        parser.add_argument('--max-attempts', type=int, default=OUTBOX_MAX_ATTEMPTS,
+                            help=f'Attempts before a delivery is given up (default {OUTBOX_MAX_ATTEMPTS})')
+
+    def make_worker(self, options):
+        return OutboxWorker(
+            threads=options['threads'],
+            batch_size=options['batch_size'],
+            max_attempts=options['max_attempts'],
+            claim_timeout=options['claim_timeout'],
+        )
+
+    def header_line(self, worker, options):
+        return f"Notification worker: {worker.threads} threads, batches of {worker.batch_size}"
+
+    def batch_line(self, counts):
+        return (
+            f"claimed {counts['claimed']}: {counts['sent']} sent, "
+            f"{counts['failed']} to retry, {counts['dead']} given up"
+        )
+
+    def summary_line(self, totals, elapsed):
+        return (
+            f"Sent {totals['sent']} of {totals['claimed']} claimed deliveries in {elapsed:.2f}s; "
+            f"{totals['failed']} to retry, {totals['dead']} given up"
+        )
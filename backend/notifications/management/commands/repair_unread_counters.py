@@ -0,0 +1,41 @@
+"""
+notifications/management/commands/repair_unread_counters.py
+Recount unread notifications into the per-account counters behind the badge
+
+    python manage.py repair_unread_counters
+    python manage.py repair_unread_counters --account CLV-123-010190-26-0001
+
+Counters are maintained incrementally (see notifications/counters.py);
+run this periodically (e.g. hourly from cron) to correct any drift.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Account
+from notifications.counters import UnreadCounter
+
+
+class Command(BaseCommand):
+    help = 'Repair per-account unread notification counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account',
+            nargs='+',
+            help='Only check these account numbers'
+        )
+
+    def handle(self, *args, **options):
+        account_ids = None
+        if options['account']:
+            account_ids = list(
+                Account.objects.filter(account_number__in=options['account']).values_list('id', flat=True)
+            )
+            if not account_ids:
+                raise CommandError('No accounts found for the given account numbers')
+
+        result = UnreadCounter.repair(account_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {result['checked']} counters, repaired {result['repaired']}")
+        )
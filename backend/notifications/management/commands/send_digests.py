@@ -0,0 +1,49 @@
+"""
+notifications/management/commands/send_digests.py
+Send daily notification digests whose digest time has come
+
+    python manage.py send_digests [--threads 8] [--batch-size 200] [--once]
+
+Each recipient's due notifications go out as one email (see
+notifications/digest.py). Run it continuously, or with --once from cron
+every few minutes.
+"""
+
+from notifications.digest import DigestWorker, DIGEST_BATCH_SIZE
+from notifications.outbox import OUTBOX_THREADS, OUTBOX_MAX_ATTEMPTS, OUTBOX_CLAIM_TIMEOUT
+from utils.workers import ClaimWorkerCommand
+
+
+class Command(ClaimWorkerCommand):
+    help = 'Send due daily notification digests'
+
+    default_threads = OUTBOX_THREADS
+    default_batch_size = DIGEST_BATCH_SIZE
+    default_claim_timeout = OUTBOX_CLAIM_TIMEOUT
+    default_poll_interval = DigestWorker.poll_interval
+    batch_help = 'Recipients claimed per batch'
+    threads_help = 'Concurrent digest emails'
+
+    def add_worker_arguments(self, parser):
+        parser.add_argument('--max-attempts', type=int, default=OUTBOX_MAX_ATTEMPTS,
+                            help=f'Attempts before a digest is given up (default {OUTBOX_MAX_ATTEMPTS})')
+
+    def make_worker(self, options):
+        return DigestWorker(
+            threads=options['threads'],
+            batch_size=options['batch_size'],
+            max_attempts=options['max_attempts'],
+            claim_timeout=options['claim_timeout'],
+        )
+
+    def batch_line(self, counts):
+        return (
+            f"{counts['sent']} notifications digested, "
+            f"{counts['failed']} to retry, {counts['dead']} given up"
+        )
+
+    def summary_line(self, totals, elapsed):
+        return (
+            f"Digested {totals['sent']} of {totals['claimed']} due notifications in {elapsed:.2f}s; "
+            f"{totals['failed']} to retry, {totals['dead']} given up"
+        )
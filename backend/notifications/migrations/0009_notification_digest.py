@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_notification_counter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='action',
+            field=models.CharField(choices=[('CREATED', 'Created'), ('EMAIL_SENT', 'Email Sent'), ('EMAIL_FAILED', 'Email Failed'), ('PUSH_SENT', 'Push Sent'), ('PUSH_FAILED', 'Push Failed'), ('READ', 'Marked as Read'), ('ARCHIVED', 'Archived'), ('EXPIRED', 'Expired'), ('DIGEST_SENT', 'Digest Sent'), ('DIGEST_FAILED', 'Digest Failed')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='channel',
+            field=models.CharField(blank=True, choices=[('EMAIL', 'Email'), ('PUSH', 'Push'), ('IN_APP', 'In-App'), ('SMS', 'SMS'), ('DIGEST', 'Daily Digest')], max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='channel',
+            field=models.CharField(choices=[('EMAIL', 'Email'), ('PUSH', 'Push'), ('DIGEST', 'Daily Digest')], max_length=10),
+        ),
+    ]
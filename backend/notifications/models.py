@@ -1,9 +1,10 @@
 # notifications/models.py - CORRECTED VERSION WITH JSON ENCODER
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
 import json
+from datetime import timedelta
 
 # ============================================
 # CUSTOM JSON ENCODER FOR HANDLING MODEL INSTANCES
@@ -137,18 +138,41 @@ class Notification(models.Model):
         user_email = self.recipient.email if self.recipient else 'No User'
         return f'{self.title} - {user_email}'
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding and self.status == 'UNREAD':
+            from .counters import UnreadCounter
+            UnreadCounter.adjust(self.recipient_id, 1)
+
     def mark_as_read(self):
         """Mark notification as read"""
         if self.status != 'READ':
-            self.status = 'READ'
-            self.read_at = timezone.now()
-            self.save(update_fields=['status', 'read_at'])
+            self._set_status('READ', read_at=timezone.now())
 
     def mark_as_archived(self):
         """Archive the notification"""
-        self.status = 'ARCHIVED'
-        self.archived_at = timezone.now()
-        self.save(update_fields=['status', 'archived_at'])
+        self._set_status('ARCHIVED', archived_at=timezone.now())
+
+    def _set_status(self, status, **fields):
+        """
+        Move the notification to status and keep the unread counter in step.
+
+        The counter is only decremented by the request whose UPDATE actually
+        moved the row out of UNREAD, so concurrent mark-as-read calls count once.
+        """
+        from .counters import UnreadCounter
+
+        with transaction.atomic():
+            was_unread = Notification.objects.filter(pk=self.pk, status='UNREAD').update(status=status, **fields)
+            if not was_unread:
+                Notification.objects.filter(pk=self.pk).update(status=status, **fields)
+            if was_unread and status != 'UNREAD':
+                UnreadCounter.adjust(self.recipient_id, -1)
+
+        self.status = status
+        for name, value in fields.items():
+            setattr(self, name, value)
 
     def is_expired(self):
         """Check if notification has expired"""
@@ -172,8 +196,9 @@ class Notification(models.Model):
 
     @classmethod
     def get_unread_count(cls, account_number):
-        """Get count of unread notifications for an account"""
-        return cls.objects.filter(recipient__account_number=account_number, status='UNREAD').count()
+        """Get count of unread notifications for an account (from the counter cache)"""
+        from .counters import UnreadCounter
+        return UnreadCounter.get_for_account_number(account_number)
 
     @classmethod
     def get_admin_alerts(cls):
@@ -189,6 +214,28 @@ class Notification(models.Model):
         ).order_by('-created_at')
 
 
+# Notification type -> NotificationPreference flag that opts out of it
+NOTIFICATION_TYPE_FLAGS = {
+    'PAYMENT_RECEIVED': 'receive_payment_notifications',
+    'TRANSFER_INITIATED': 'receive_transfer_notifications',
+    'TRANSFER_COMPLETED': 'receive_transfer_notifications',
+    'TRANSFER_FAILED': 'receive_transfer_notifications',
+    'TAC_SENT': 'receive_tac_notifications',
+    'TAC_VERIFIED': 'receive_tac_notifications',
+    'ACCOUNT_VERIFIED': 'receive_account_notifications',
+    'ACCOUNT_CREATED': 'receive_account_notifications',
+    'KYC_SUBMITTED': 'receive_account_notifications',
+    'KYC_APPROVED': 'receive_account_notifications',
+    'KYC_REJECTED': 'receive_account_notifications',
+    'ADMIN_PAYMENT_PROCESSED': 'receive_admin_notifications',
+    'ADMIN_TAC_REQUIRED': 'receive_admin_notifications',
+    'ADMIN_TAC_GENERATED': 'receive_admin_notifications',
+    'ADMIN_SETTLEMENT_REQUIRED': 'receive_admin_notifications',
+    'ADMIN_KYC_REVIEW_REQUIRED': 'receive_admin_notifications',
+    'ADMIN_NEW_TRANSFER': 'receive_admin_notifications',
+}
+
+
 class NotificationPreference(models.Model):
     """Account preferences for notification delivery"""
     account = models.OneToOneField(
@@ -245,6 +292,44 @@ class NotificationPreference(models.Model):
 
         return priority_map.get(priority, True)
 
+    def receives(self, notification_type):
+        """Check the receive_*_notifications flag covering a notification type"""
+        flag = NOTIFICATION_TYPE_FLAGS.get(notification_type)
+        return getattr(self, flag) if flag else True
+
+    def digests(self, priority):
+        """Check if email is held for the daily digest instead of sent right away"""
+        # With immediate_delivery on, HIGH priority (TACs, failures) still goes out now
+        return self.daily_digest and (priority != 'HIGH' or not self.immediate_delivery)
+
+    def next_digest_at(self, now=None):
+        """The next digest_time (local time) after now"""
+        digest_time = self._meta.get_field('digest_time').to_python(self.digest_time)
+        now = timezone.localtime(now)
+        slot = now.replace(
+            hour=digest_time.hour, minute=digest_time.minute, second=0, microsecond=0
+        )
+        if slot <= now:
+            slot += timedelta(days=1)
+        return slot
+
+    def delivery_channels(self, notification_type, priority):
+        """Outbox channels (EMAIL, DIGEST, PUSH) these preferences allow for a notification"""
+        if not self.receives(notification_type):
+            return []
+
+        channels = []
+        if self.should_send_email(priority):
+            channels.append('DIGEST' if self.digests(priority) else 'EMAIL')
+        if self.push_enabled:
+            channels.append('PUSH')
+        return channels
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .preferences import PreferenceResolver
+        PreferenceResolver.invalidate_on_commit(self.account_id)
+
 
 class NotificationLog(models.Model):
     """Audit log for notification delivery attempts"""
@@ -257,6 +342,8 @@ class NotificationLog(models.Model):
         ('READ', 'Marked as Read'),
         ('ARCHIVED', 'Archived'),
         ('EXPIRED', 'Expired'),
+        ('DIGEST_SENT', 'Digest Sent'),
+        ('DIGEST_FAILED', 'Digest Failed'),
     ]
 
     notification = models.ForeignKey(
@@ -267,7 +354,7 @@ class NotificationLog(models.Model):
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
     channel = models.CharField(
         max_length=20,
-        choices=[('EMAIL', 'Email'), ('PUSH', 'Push'), ('IN_APP', 'In-App'), ('SMS', 'SMS')],
+        choices=[('EMAIL', 'Email'), ('PUSH', 'Push'), ('IN_APP', 'In-App'), ('SMS', 'SMS'), ('DIGEST', 'Daily Digest')],
         null=True,
         blank=True
     )
@@ -286,3 +373,77 @@ class NotificationLog(models.Model):
 
     def __str__(self):
         return f'{self.get_action_display()} - {self.notification.title}'
+
+
+class NotificationOutbox(models.Model):
+    """
+    Pending email/push delivery of a notification.
+
+    Written in the same transaction as the notification; the
+    notification_worker command delivers it (see notifications/outbox.py).
+    DIGEST rows are due at the recipient's next digest time and are sent,
+    one email per recipient, by send_digests (notifications/digest.py).
+    """
+    CHANNEL_CHOICES = [
+        ('EMAIL', 'Email'),
+        ('PUSH', 'Push'),
+        ('DIGEST', 'Daily Digest'),  # Email held for the recipient's daily digest
+    ]
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.CASCADE,
+        related_name='outbox'
+    )
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)  # Set while a worker holds it
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Worker claim: due PENDING rows, or stale SENDING claims
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['status', 'claimed_at']),
+        ]
+        verbose_name = 'Notification Outbox Entry'
+        verbose_name_plural = 'Notification Outbox'
+
+    def __str__(self):
+        return f'{self.channel} {self.status} - notification #{self.notification_id}'
+
+
+class NotificationCounter(models.Model):
+    """
+    Unread notification count of one account.
+
+    Kept current by Notification.save/mark_as_read/mark_as_archived and
+    the mark-all-read path, cached by notifications/counters.py; the
+    repair_unread_counters command corrects any drift.
+    """
+    account = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter'
+    )
+    unread_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Notification Counter'
+        verbose_name_plural = 'Notification Counters'
+
+    def __str__(self):
+        return f'{self.unread_count} unread - account #{self.account_id}'
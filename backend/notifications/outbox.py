@@ -0,0 +1,196 @@
+"""
+Notification outbox - background delivery of notification email and push
+
+NotificationService.create_notification() writes one NotificationOutbox row
+per channel in the same transaction as the notification, so a request only
+pays for a few inserts and nothing is sent for a notification that rolled
+back.
+
+The notification_worker command runs an OutboxWorker (a ClaimWorker, see
+utils/workers.py):
+
+  * claim_outbox() locks a batch of due PENDING rows with
+    SELECT ... FOR UPDATE SKIP LOCKED and marks them SENDING in one short
+    transaction, so concurrent workers never claim the same row;
+  * the deliveries run on a thread pool outside any transaction;
+  * record_results() writes all outcomes of the batch at once: one UPDATE
+    for the sent rows, one bulk_update for the failures and one
+    bulk_create of NotificationLog rows.
+
+A failed delivery is retried with exponential backoff
+(OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1) seconds, capped at
+OUTBOX_BACKOFF_MAX) until OUTBOX_MAX_ATTEMPTS, then left FAILED. A claim
+older than OUTBOX_CLAIM_TIMEOUT (a worker that died) is claimed again, so
+delivery is at least once.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from utils.workers import ClaimWorker, backoff_delay as capped_backoff
+
+from .models import NotificationLog, NotificationOutbox
+from .services import NotificationService, NotificationDeliveryError
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = getattr(settings, 'NOTIFICATION_OUTBOX_BATCH_SIZE', 100)
+OUTBOX_THREADS = getattr(settings, 'NOTIFICATION_OUTBOX_THREADS', 8)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'NOTIFICATION_OUTBOX_MAX_ATTEMPTS', 6)
+OUTBOX_BACKOFF_BASE = getattr(settings, 'NOTIFICATION_OUTBOX_BACKOFF_BASE', 30)  # seconds
+OUTBOX_BACKOFF_MAX = getattr(settings, 'NOTIFICATION_OUTBOX_BACKOFF_MAX', 6 * 60 * 60)  # seconds
+OUTBOX_CLAIM_TIMEOUT = getattr(settings, 'NOTIFICATION_OUTBOX_CLAIM_TIMEOUT', 10 * 60)  # seconds
+
+# NotificationService method that delivers each channel
+DELIVERY_HANDLERS = {
+    'EMAIL': 'deliver_email',
+    'PUSH': 'deliver_push',
+}
+
+
+def claimable_outbox(now, claim_timeout=OUTBOX_CLAIM_TIMEOUT):
+    """Filter for due PENDING rows and abandoned SENDING claims"""
+    return Q(status='PENDING', next_attempt_at__lte=now) | Q(
+        status='SENDING', claimed_at__lt=now - timedelta(seconds=claim_timeout)
+    )
+
+
+def claim_outbox(batch_size=OUTBOX_BATCH_SIZE, claim_timeout=OUTBOX_CLAIM_TIMEOUT):
+    """
+    Claim up to batch_size due outbox rows for this worker.
+
+    Only channels in DELIVERY_HANDLERS are claimed; DIGEST rows belong to
+    send_digests (notifications/digest.py).
+
+    Returns:
+        List of claimed NotificationOutbox rows (notification and recipient loaded)
+    """
+    now = timezone.now()
+    claimable = claimable_outbox(now, claim_timeout) & Q(channel__in=list(DELIVERY_HANDLERS))
+
+    with transaction.atomic():
+        entries = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True, of=('self',)).select_related(
+                'notification__recipient'
+            ).filter(claimable).order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not entries:
+            return []
+
+        NotificationOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+            status='SENDING', claimed_at=now
+        )
+        for entry in entries:
+            entry.status = 'SENDING'
+            entry.claimed_at = now
+
+    return entries
+
+
+def backoff_delay(attempts, base=OUTBOX_BACKOFF_BASE, cap=OUTBOX_BACKOFF_MAX):
+    """Seconds to wait before retrying after the given number of failed attempts"""
+    return capped_backoff(attempts, base, cap)
+
+
+def record_results(sent, failed, max_attempts=OUTBOX_MAX_ATTEMPTS):
+    """
+    Write the outcomes of one batch.
+
+    Args:
+        sent: List of (entry, details) for delivered rows
+        failed: List of (entry, error) for rows that were not delivered
+        max_attempts: Attempts after which a row is left FAILED
+
+    Returns:
+        Number of rows given up on (FAILED)
+    """
+    now = timezone.now()
+    logs = []
+    dead = 0
+
+    for entry, details in sent:
+        logs.append(NotificationLog(
+            notification_id=entry.notification_id,
+            action=f'{entry.channel}_SENT',
+            channel=entry.channel,
+            details=details,
+            metadata={'outbox_id': entry.id, 'attempt': entry.attempts + 1}
+        ))
+
+    for entry, error in failed:
+        entry.attempts += 1
+        entry.last_error = str(error)
+        entry.claimed_at = None
+        if entry.attempts >= max_attempts:
+            entry.status = 'FAILED'
+            dead += 1
+        else:
+            entry.status = 'PENDING'
+            entry.next_attempt_at = now + timedelta(seconds=backoff_delay(entry.attempts))
+        logs.append(NotificationLog(
+            notification_id=entry.notification_id,
+            action=f'{entry.channel}_FAILED',
+            channel=entry.channel,
+            details=str(error),
+            metadata={'outbox_id': entry.id, 'attempt': entry.attempts, 'gave_up': entry.status == 'FAILED'}
+        ))
+
+    with transaction.atomic():
+        if sent:
+            NotificationOutbox.objects.filter(id__in=[entry.id for entry, _ in sent]).update(
+                status='SENT', sent_at=now, claimed_at=None, attempts=F('attempts') + 1
+            )
+        if failed:
+            NotificationOutbox.objects.bulk_update(
+                [entry for entry, _ in failed],
+                ['status', 'attempts', 'last_error', 'claimed_at', 'next_attempt_at']
+            )
+        NotificationLog.objects.bulk_create(logs)
+
+    return dead
+
+
+class OutboxWorker(ClaimWorker):
+    """Claims outbox rows in batches and delivers them on a thread pool"""
+
+    COUNTS = ('claimed', 'sent', 'failed', 'dead')
+    thread_name_prefix = 'notification'
+
+    def __init__(self, threads=OUTBOX_THREADS, batch_size=OUTBOX_BATCH_SIZE,
+                 max_attempts=OUTBOX_MAX_ATTEMPTS, claim_timeout=OUTBOX_CLAIM_TIMEOUT):
+        super().__init__(threads, batch_size, claim_timeout)
+        self.max_attempts = max_attempts
+
+    def claim(self):
+        return claim_outbox(self.batch_size, self.claim_timeout)
+
+    def process(self, entry):
+        """Deliver one row; returns the log details or raises"""
+        return getattr(NotificationService, DELIVERY_HANDLERS[entry.channel])(entry.notification)
+
+    def record(self, outcomes):
+        """
+        Returns:
+            Dict of counts: sent, failed (will be retried), dead (given up)
+        """
+        sent, failed = [], []
+        for entry, details, error in outcomes:
+            if error is None:
+                sent.append((entry, details))
+                continue
+            if isinstance(error, NotificationDeliveryError):
+                logger.warning(f"{entry.channel} for notification #{entry.notification_id} failed: {error}")
+            else:
+                logger.error(
+                    f"Unexpected error delivering {entry.channel} for notification #{entry.notification_id}",
+                    exc_info=error
+                )
+            failed.append((entry, error))
+
+        dead = record_results(sent, failed, self.max_attempts)
+        return {'sent': len(sent), 'failed': len(failed) - dead, 'dead': dead}
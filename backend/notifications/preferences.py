@@ -0,0 +1,108 @@
+# notifications/preferences.py
+"""
+Cached notification preference resolution.
+
+Every notification needs its recipient's NotificationPreference to pick
+delivery channels. The preference values are cached per account in the
+default Django cache; NotificationPreference.save drops the entry once
+its transaction commits (so NotificationPreferencesView.put and the admin
+are seen on the next notification).
+
+An account without a preference row resolves to the model defaults; no
+row is created on the delivery path. resolve_many() serves a whole
+fan-out batch with one cache round trip and at most one query.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import NotificationPreference
+
+logger = logging.getLogger(__name__)
+
+PREFERENCE_CACHE_TIMEOUT = getattr(settings, 'NOTIFICATION_PREFERENCE_CACHE_TIMEOUT', 3600)
+
+# Cached per account; everything delivery decisions read
+PREFERENCE_FIELDS = [
+    'email_enabled', 'push_enabled', 'in_app_enabled',
+    'email_high_priority', 'email_medium_priority', 'email_low_priority',
+    'receive_payment_notifications', 'receive_transfer_notifications',
+    'receive_tac_notifications', 'receive_account_notifications',
+    'receive_admin_notifications',
+    'immediate_delivery', 'daily_digest', 'digest_time',
+]
+
+
+def _key(account_id):
+    return f'notifications:prefs:{account_id}'
+
+
+class PreferenceResolver:
+    """Per-account notification preferences, read through the cache"""
+
+    @staticmethod
+    def resolve(account_id):
+        """
+        Preferences of one account.
+
+        Returns:
+            Unsaved NotificationPreference carrying the account's values
+            (use it for should_send_email/delivery_channels, not save())
+        """
+        return PreferenceResolver.resolve_many([account_id])[account_id]
+
+    @staticmethod
+    def resolve_many(account_ids):
+        """
+        Preferences of many accounts: one cache get_many, one query for misses.
+
+        Returns:
+            Dict of account id -> unsaved NotificationPreference
+        """
+        account_ids = set(account_ids)
+        cached = cache.get_many([_key(account_id) for account_id in account_ids])
+
+        values = {}
+        missing = []
+        for account_id in account_ids:
+            entry = cached.get(_key(account_id))
+            if entry is None:
+                missing.append(account_id)
+            else:
+                values[account_id] = entry
+
+        if missing:
+            found = {
+                row.pop('account_id'): row
+                for row in NotificationPreference.objects.filter(
+                    account_id__in=missing
+                ).values('account_id', *PREFERENCE_FIELDS)
+            }
+            fills = {}
+            for account_id in missing:
+                # No row yet: the model defaults apply
+                entry = found.get(account_id) or PreferenceResolver._defaults()
+                values[account_id] = fills[_key(account_id)] = entry
+            cache.set_many(fills, PREFERENCE_CACHE_TIMEOUT)
+
+        return {
+            account_id: NotificationPreference(account_id=account_id, **entry)
+            for account_id, entry in values.items()
+        }
+
+    @staticmethod
+    def invalidate(account_id):
+        cache.delete(_key(account_id))
+
+    @staticmethod
+    def invalidate_on_commit(account_id):
+        """Drop the entry once the surrounding transaction commits"""
+        transaction.on_commit(lambda: PreferenceResolver.invalidate(account_id))
+
+    @staticmethod
+    def _defaults():
+        fields = [NotificationPreference._meta.get_field(name) for name in PREFERENCE_FIELDS]
+        # to_python: the digest_time default is the string '18:00'
+        return {field.name: field.to_python(field.get_default()) for field in fields}
@@ -9,11 +9,15 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from django.utils import timezone
 from django.conf import settings
+from django.db import transaction
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
-from .models import Notification, NotificationLog, NotificationPreference
+from .models import Notification, NotificationLog, NotificationPreference, NotificationOutbox
+from .counters import UnreadCounter
+from .preferences import PreferenceResolver
+from .staff import StaffDirectory
 from accounts.models import Account
 from transactions.models import Wallet, Transaction
 from payments.models import Payment
@@ -23,6 +27,12 @@ from compliance.models import TransferRequest
 
 logger = logging.getLogger(__name__)
 
+
+class NotificationDeliveryError(Exception):
+    """An email or push was not delivered; the outbox retries it"""
+    pass
+
+
 class NotificationService:
     """Central notification service for financial workflows"""
 
@@ -40,25 +50,26 @@ class NotificationService:
             metadata: Additional data as dict
         """
         try:
-            notification = Notification.objects.create(
-                recipient=recipient,  #  CRITICAL: Using 'recipient' not 'account'
-                notification_type=notification_type,
-                title=title,
-                message=message,
-                priority=priority,
-                metadata=metadata or {}
-            )
+            with transaction.atomic():
+                notification = Notification.objects.create(
+                    recipient=recipient,  #  CRITICAL: Using 'recipient' not 'account'
+                    notification_type=notification_type,
+                    title=title,
+                    message=message,
+                    priority=priority,
+                    metadata=metadata or {}
+                )
 
-            # Log the creation
-            NotificationLog.objects.create(
-                notification=notification,
-                action='CREATED',
-                channel='IN_APP',
-                details=f'Notification created for {recipient.account_number}'
-            )
+                # Log the creation
+                NotificationLog.objects.create(
+                    notification=notification,
+                    action='CREATED',
+                    channel='IN_APP',
+                    details=f'Notification created for {recipient.account_number}'
+                )
 
-            # Send email if enabled
-            NotificationService.send_email_notification(notification)
+                # Email/push go out from the notification_worker, not this request
+                NotificationService.enqueue_delivery(notification)
 
             return notification
 
@@ -66,6 +77,57 @@ class NotificationService:
             logger.error(f" Error creating notification: {str(e)}")
             return None
 
+    @staticmethod
+    def notify_staff(notification_type, title, message, priority='MEDIUM', metadata=None):
+        """
+        Create the same notification for every active staff account
+
+        Staff come from StaffDirectory (cached). The notifications, their
+        logs, unread counters and email/push outbox rows are each written
+        in one statement, so more staff does not mean more queries.
+
+        Returns:
+            List of created notifications (empty if there is no staff or on error)
+        """
+        try:
+            staff = StaffDirectory.recipients()
+            if not staff:
+                logger.warning(f" No staff accounts to notify of {notification_type}")
+                return []
+
+            with transaction.atomic():
+                notifications = Notification.objects.bulk_create([
+                    Notification(
+                        recipient_id=account_id,
+                        notification_type=notification_type,
+                        title=title,
+                        message=message,
+                        priority=priority,
+                        metadata=metadata or {}
+                    )
+                    for account_id, _ in staff
+                ])
+
+                NotificationLog.objects.bulk_create([
+                    NotificationLog(
+                        notification=notification,
+                        action='CREATED',
+                        channel='IN_APP',
+                        details=f'Notification created for {account_number}'
+                    )
+                    for notification, (_, account_number) in zip(notifications, staff)
+                ])
+
+                # bulk_create skips Notification.save, which keeps the counters
+                UnreadCounter.increment_many(account_id for account_id, _ in staff)
+                NotificationService.enqueue_delivery_many(notifications)
+
+            return notifications
+
+        except Exception as e:
+            logger.error(f" Error notifying staff: {str(e)}")
+            return []
+
     @staticmethod
     def send_payment_received_notification(payment_instance):
         """
@@ -106,27 +168,22 @@ class NotificationService:
     def send_admin_payment_notification(payment_instance):
         """Send admin notification for payment processing"""
         try:
-            # Find an admin account (first account with is_staff=True)
-            admin_accounts = Account.objects.filter(is_staff=True)  #  FIXED: Changed from 'recipient' to 'Account'
-            if admin_accounts.exists():
-                admin_account = admin_accounts.first()
-
-                NotificationService.create_notification(
-                    recipient=admin_account,
-                    notification_type='ADMIN_PAYMENT_PROCESSED',
-                    title=' Payment Processed',
-                    message=f'Payment of ${payment_instance.amount:.2f} processed for {payment_instance.account.account_number}',
-                    priority='MEDIUM',
-                    metadata={
-                        'client_account': payment_instance.account.account_number,
-                        'client_email': payment_instance.account.email,
-                        'amount': str(payment_instance.amount),
-                        'sender': payment_instance.sender,
-                        'payment_code': payment_instance.payment_code,
-                        'admin_action_required': False,
-                        'processed_by': payment_instance.admin_user.username if payment_instance.admin_user else 'System'
-                    }
-                )
+            # Every active staff account gets it
+            NotificationService.notify_staff(
+                notification_type='ADMIN_PAYMENT_PROCESSED',
+                title=' Payment Processed',
+                message=f'Payment of ${payment_instance.amount:.2f} processed for {payment_instance.account.account_number}',
+                priority='MEDIUM',
+                metadata={
+                    'client_account': payment_instance.account.account_number,
+                    'client_email': payment_instance.account.email,
+                    'amount': str(payment_instance.amount),
+                    'sender': payment_instance.sender,
+                    'payment_code': payment_instance.payment_code,
+                    'admin_action_required': False,
+                    'processed_by': payment_instance.admin_user.username if payment_instance.admin_user else 'System'
+                }
+            )
 
         except Exception as e:
             logger.error(f" Error sending admin payment notification: {str(e)}")
@@ -269,40 +326,52 @@ class NotificationService:
             return None
 
     @staticmethod
-    def send_email_notification(notification):
+    def delivery_channels(notification, preference=None):
+        """Outbox channels the recipient's preferences allow for this notification"""
+        preference = preference or PreferenceResolver.resolve(notification.recipient_id)
+        return preference.delivery_channels(notification.notification_type, notification.priority)
+
+    @staticmethod
+    def enqueue_delivery(notification):
         """
-        Send email for important notifications
+        Queue email/push delivery of a notification in the outbox.
 
-        Args:
-            notification: Notification object
+        Call inside the transaction that creates the notification, so the
+        outbox rows commit (or roll back) with it.
         """
-        try:
-            # Check if email is enabled for this account
-            try:
-                # FIX: Use recipient (which is Account) to get preferences
-                pref = NotificationPreference.objects.get(account=notification.recipient)
-                if not pref.email_enabled:
-                    return False
-
-                # Check priority settings
-                if notification.priority == 'HIGH' and not pref.email_high_priority:
-                    return False
-                elif notification.priority == 'MEDIUM' and not pref.email_medium_priority:
-                    return False
-                elif notification.priority == 'LOW' and not pref.email_low_priority:
-                    return False
-
-            except NotificationPreference.DoesNotExist:
-                # No preference found, create default
-                pref = NotificationPreference.objects.create(account=notification.recipient)
-                if not pref.email_enabled:
-                    return False
-
-            # Prepare email
-            subject = f"Claverica: {notification.title}"
-
-            # Simple email template
-            message = f"""
+        return NotificationService.enqueue_delivery_many([notification])
+
+    @staticmethod
+    def enqueue_delivery_many(notifications):
+        """
+        Queue delivery of many saved notifications: one preference lookup
+        for all their recipients and one outbox INSERT.
+        """
+        preferences = PreferenceResolver.resolve_many(n.recipient_id for n in notifications)
+        now = timezone.now()
+
+        entries = []
+        for notification in notifications:
+            preference = preferences[notification.recipient_id]
+            for channel in NotificationService.delivery_channels(notification, preference):
+                # DIGEST rows wait for the recipient's next digest slot
+                due = preference.next_digest_at(now) if channel == 'DIGEST' else now
+                entries.append(NotificationOutbox(notification=notification, channel=channel, next_attempt_at=due))
+        return NotificationOutbox.objects.bulk_create(entries)
+
+    @staticmethod
+    def deliver_email(notification):
+        """
+        Send the email for a notification (run by the notification_worker)
+
+        Raises:
+            NotificationDeliveryError: if the email was not sent
+        """
+        # Prepare email
+        subject = f"Claverica: {notification.title}"
+
+        # Simple email template
+        message = f"""
             {notification.title}
 
             {notification.message}
@@ -317,36 +386,44 @@ class NotificationService:
             Do not reply to this email.
             """
 
-            # Send email
-            send_mail(
+        try:
+            sent = send_mail(
                 subject=subject,
                 message=message,
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[notification.recipient.email],
-                fail_silently=True,
+                fail_silently=False,
             )
+        except Exception as e:
+            raise NotificationDeliveryError(f'Email failed: {e}')
 
-            # Log email delivery
-            NotificationLog.objects.create(
-                notification=notification,
-                action='EMAIL_SENT',
-                channel='EMAIL',
-                details=f'Email sent to {notification.recipient.email}'
-            )
+        if not sent:
+            raise NotificationDeliveryError('Email failed: backend sent nothing')
+        return f'Email sent to {notification.recipient.email}'
 
-            logger.info(f" Email sent for notification #{notification.id}")
-            return True
+    @staticmethod
+    def deliver_push(notification):
+        """
+        Push a notification to the recipient's private channel (run by the notification_worker)
 
-        except Exception as e:
-            # Log email failure
-            NotificationLog.objects.create(
-                notification=notification,
-                action='EMAIL_FAILED',
-                channel='EMAIL',
-                details=f'Email failed: {str(e)}'
-            )
-            logger.error(f" Error sending email: {str(e)}")
-            return False
+        Raises:
+            NotificationDeliveryError: if the push was not sent
+        """
+        from utils.pusher import send_events, user_channel
+
+        channel = user_channel(notification.recipient.account_number)
+        sent = send_events([(channel, 'notification.created', {
+            'id': notification.id,
+            'type': notification.notification_type,
+            'title': notification.title,
+            'message': notification.message,
+            'priority': notification.priority,
+            'created_at': notification.created_at.isoformat()
+        })])
+
+        if not sent:
+            raise NotificationDeliveryError('Push failed')
+        return f'Push sent to {channel}'
 
     @staticmethod
     def mark_as_read(notification_id, account):
@@ -416,10 +493,7 @@ class NotificationService:
             account_number: Account number string
         """
         try:
-            return Notification.objects.filter(
-                recipient__account_number=account_number,
-                status='UNREAD'
-            ).count()
+            return UnreadCounter.get_for_account_number(account_number)
         except Exception as e:
             logger.error(f" Error getting unread count: {str(e)}")
             return 0
@@ -1,7 +1,7 @@
 # notifications/signals.py - COMPLETELY FIXED VERSION WITH FULL DESTINATION DETAILS
 import logging
 import json
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.core.mail import send_mail
@@ -15,6 +15,7 @@ from compliance.models import TransferRequest
 
 from .models import Notification, NotificationPreference, NotificationLog
 from .services import NotificationService
+from .staff import StaffDirectory
 
 logger = logging.getLogger(__name__)
 
@@ -24,53 +25,49 @@ def handle_compliance_notifications(sender, instance, created, **kwargs):
     '''Create notifications for compliance events'''
     try:
         if created:
-            admin_accounts = Account.objects.filter(is_staff=True)
-            if admin_accounts.exists():
-                admin_account = admin_accounts.first()
-
-                # Build comprehensive metadata with all destination details
-                metadata = {
-                    'admin_action_required': True,
-                    'transfer_reference': instance.reference,
-                    'amount': str(instance.amount),
-                    'recipient': instance.recipient_name,
-                    'action_url': f'/admin/compliance/transferrequest/{instance.id}/change/',
-                    'destination_type': instance.destination_type,
-                    'destination_details': instance.destination_details,  # Full JSON field
-                }
-                
-                # Add specific fields based on destination type for easier viewing
-                if instance.destination_type == 'mobile_wallet':
-                    metadata['provider'] = instance.destination_details.get('provider', 'N/A')
-                    metadata['phone_number'] = instance.destination_details.get('phone_number', 'N/A')
-                    metadata['send_to'] = f"{metadata['provider']} - {metadata['phone_number']}"
-                    
-                elif instance.destination_type == 'bank':
-                    metadata['bank_name'] = instance.destination_details.get('bank_name', 'N/A')
-                    metadata['account_number'] = instance.destination_details.get('account_number', 'N/A')
-                    metadata['account_type'] = instance.destination_details.get('account_type', 'N/A')
-                    metadata['branch'] = instance.destination_details.get('branch', 'N/A')
-                    metadata['send_to'] = f"{metadata['bank_name']} - {metadata['account_number']}"
-                    
-                elif instance.destination_type == 'crypto':
-                    metadata['crypto_type'] = instance.destination_details.get('crypto_type', 'N/A')
-                    metadata['crypto_address'] = instance.destination_details.get('crypto_address', 'N/A')
-                    # Truncate address for display
-                    address = metadata['crypto_address']
-                    short_address = f"{address[:8]}..." if len(address) > 8 else address
-                    metadata['send_to'] = f"{metadata['crypto_type']} - {short_address}"
-
-                NotificationService.create_notification(
-                    recipient=admin_account,
-                    notification_type='ADMIN_TAC_REQUIRED',
-                    title=f'New Transfer Requires TAC - ${instance.amount} to {instance.recipient_name}',
-                    message=f'Transfer {instance.reference} requires TAC generation. Send to: {metadata.get("send_to", "Check details")}',
-                    priority='HIGH',
-                    metadata=metadata
-                )
+            # Build comprehensive metadata with all destination details
+            metadata = {
+                'admin_action_required': True,
+                'transfer_reference': instance.reference,
+                'amount': str(instance.amount),
+                'recipient': instance.recipient_name,
+                'action_url': f'/admin/compliance/transferrequest/{instance.id}/change/',
+                'destination_type': instance.destination_type,
+                'destination_details': instance.destination_details,  # Full JSON field
+            }
+            
+            # Add specific fields based on destination type for easier viewing
+            if instance.destination_type == 'mobile_wallet':
+                metadata['provider'] = instance.destination_details.get('provider', 'N/A')
+                metadata['phone_number'] = instance.destination_details.get('phone_number', 'N/A')
+                metadata['send_to'] = f"{metadata['provider']} - {metadata['phone_number']}"
                 
-                logger.info(f"Admin notification created for transfer {instance.reference} to {instance.recipient_name}")
+            elif instance.destination_type == 'bank':
+                metadata['bank_name'] = instance.destination_details.get('bank_name', 'N/A')
+                metadata['account_number'] = instance.destination_details.get('account_number', 'N/A')
+                metadata['account_type'] = instance.destination_details.get('account_type', 'N/A')
+                metadata['branch'] = instance.destination_details.get('branch', 'N/A')
+                metadata['send_to'] = f"{metadata['bank_name']} - {metadata['account_number']}"
                 
+            elif instance.destination_type == 'crypto':
+                metadata['crypto_type'] = instance.destination_details.get('crypto_type', 'N/A')
+                metadata['crypto_address'] = instance.destination_details.get('crypto_address', 'N/A')
+                # Truncate address for display
+                address = metadata['crypto_address']
+                short_address = f"{address[:8]}..." if len(address) > 8 else address
+                metadata['send_to'] = f"{metadata['crypto_type']} - {short_address}"
+
+            # Every active staff account gets it
+            NotificationService.notify_staff(
+                notification_type='ADMIN_TAC_REQUIRED',
+                title=f'New Transfer Requires TAC - ${instance.amount} to {instance.recipient_name}',
+                message=f'Transfer {instance.reference} requires TAC generation. Send to: {metadata.get("send_to", "Check details")}',
+                priority='HIGH',
+                metadata=metadata
+            )
+            
+            logger.info(f"Admin notification created for transfer {instance.reference} to {instance.recipient_name}")
+            
         elif instance.status == 'tac_sent':
             # Notification to client when TAC is sent
             NotificationService.create_notification(
@@ -150,6 +147,12 @@ def handle_account_notifications(sender, instance, created, **kwargs):
     except Exception as e:
         logger.error(f"Error handling account notification: {e}")
 
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def refresh_staff_directory(sender, instance, **kwargs):
+    '''Drop the cached staff list when a staff account changes'''
+    StaffDirectory.account_changed(instance)
+
 @receiver(post_save, sender=Payment)
 def handle_payment_notification(sender, instance, created, **kwargs):
     '''Create notifications for payment events'''
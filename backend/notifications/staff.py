@@ -0,0 +1,47 @@
+# notifications/staff.py
+"""
+Cached list of staff accounts that receive admin notifications.
+
+NotificationService.notify_staff fans an admin alert out to every active
+staff account. The list is read once per alert from the default Django
+cache; saving or deleting an account that is (or was) staff drops it
+(see the Account receivers in notifications/signals.py). Changes made
+with queryset .update() are picked up when the entry expires.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.models import Account
+
+STAFF_CACHE_KEY = 'notifications:staff-recipients'
+STAFF_CACHE_TIMEOUT = getattr(settings, 'NOTIFICATION_STAFF_CACHE_TIMEOUT', 300)
+
+
+class StaffDirectory:
+    """Active staff accounts, read through the cache"""
+
+    @staticmethod
+    def recipients():
+        """
+        Returns:
+            List of (account id, account number) of active staff, by id
+        """
+        staff = cache.get(STAFF_CACHE_KEY)
+        if staff is None:
+            staff = list(
+                Account.objects.filter(is_staff=True, is_active=True).order_by('id').values_list('id', 'account_number')
+            )
+            cache.set(STAFF_CACHE_KEY, staff, STAFF_CACHE_TIMEOUT)
+        return staff
+
+    @staticmethod
+    def account_changed(account):
+        """Drop the cached list (on commit) if the account is, or was, on it"""
+        cached = cache.get(STAFF_CACHE_KEY)
+        if account.is_staff or (cached and any(account_id == account.id for account_id, _ in cached)):
+            transaction.on_commit(StaffDirectory.invalidate)
+
+    @staticmethod
+    def invalidate():
+        cache.delete(STAFF_CACHE_KEY)
@@ -0,0 +1,116 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from notifications.digest import DigestWorker
+from notifications.models import NotificationLog, NotificationOutbox, NotificationPreference
+from notifications.outbox import OutboxWorker
+from notifications.services import NotificationService
+from utils.factories import make_account
+
+
+class DailyDigestTests(TestCase):
+    """Test holding email for the daily digest and sending one per recipient"""
+
+    def setUp(self):
+        cache.clear()
+        self.accounts = [
+            make_account(email=f'digest{i}@claverica.com', phone=f'+25470000024{i}') for i in range(2)
+        ]
+        for account in self.accounts:
+            preference = NotificationPreference.objects.get(account=account)
+            preference.daily_digest = True
+            preference.digest_time = datetime.time(18, 0)
+            with self.captureOnCommitCallbacks(execute=True):
+                preference.save()
+        NotificationOutbox.objects.all().delete()
+        mail.outbox = []
+
+        pusher = mock.patch('utils.pusher.send_events', return_value=True)
+        pusher.start()
+        self.addCleanup(pusher.stop)
+
+    def notify(self, account, title, priority='MEDIUM'):
+        return NotificationService.create_notification(
+            recipient=account,
+            notification_type='PAYMENT_RECEIVED',
+            title=title,
+            message=f'{title} message',
+            priority=priority,
+        )
+
+    def make_due(self):
+        NotificationOutbox.objects.filter(channel='DIGEST').update(
+            next_attempt_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+
+    def test_email_held_until_digest_time(self):
+        medium = self.notify(self.accounts[0], 'Medium')
+        high = self.notify(self.accounts[0], 'High', priority='HIGH')
+
+        digest = medium.outbox.get(channel__in=['EMAIL', 'DIGEST'])
+        self.assertEqual(digest.channel, 'DIGEST')
+        self.assertEqual(timezone.localtime(digest.next_attempt_at).time(), datetime.time(18, 0))
+        self.assertGreater(digest.next_attempt_at, timezone.now())
+        self.assertEqual(high.outbox.get(channel__in=['EMAIL', 'DIGEST']).channel, 'EMAIL')
+
+        # Neither worker sends a digest before its time
+        OutboxWorker().run(once=True)
+        DigestWorker().run(once=True)
+        self.assertEqual([m.subject for m in mail.outbox], ['Claverica: High'])
+
+    def test_next_digest_at(self):
+        preference = NotificationPreference(digest_time='18:00')
+        morning = timezone.make_aware(datetime.datetime(2026, 3, 2, 9, 30))
+        evening = timezone.make_aware(datetime.datetime(2026, 3, 2, 19, 0))
+
+        self.assertEqual(preference.next_digest_at(morning), morning.replace(hour=18, minute=0))
+        self.assertEqual(preference.next_digest_at(evening), timezone.make_aware(datetime.datetime(2026, 3, 3, 18, 0)))
+
+    def test_one_email_per_recipient(self):
+        first, second = self.accounts
+        for i in range(3):
+            self.notify(first, f'First {i}')
+        for i in range(2):
+            self.notify(second, f'Second {i}')
+        self.make_due()
+
+        totals = DigestWorker(batch_size=1).run(once=True)
+
+        self.assertEqual((totals['claimed'], totals['sent']), (5, 5))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [first.email, second.email])
+        first_digest = next(m for m in mail.outbox if m.to == [first.email])
+        self.assertIn('3 notifications', first_digest.subject)
+        for i in range(3):
+            self.assertIn(f'First {i}', first_digest.body)
+            self.assertIn(f'First {i}', first_digest.alternatives[0][0])
+        self.assertFalse(NotificationOutbox.objects.filter(channel='DIGEST').exclude(status='SENT').exists())
+        self.assertEqual(NotificationLog.objects.filter(action='DIGEST_SENT').count(), 5)
+
+    def test_failed_digest_is_retried(self):
+        self.notify(self.accounts[0], 'Retry me')
+        self.make_due()
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            totals = DigestWorker().run(once=True)
+
+        entry = NotificationOutbox.objects.get(channel='DIGEST')
+        self.assertEqual(totals['failed'], 1)
+        self.assertEqual((entry.status, entry.attempts), ('PENDING', 1))
+        self.assertGreater(entry.next_attempt_at, timezone.now())
+
+    def test_command(self):
+        self.notify(self.accounts[0], 'Command')
+        self.make_due()
+        out = StringIO()
+
+        call_command('send_digests', '--once', stdout=out)
+
+        self.assertIn('Digested 1 of 1 due notifications', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
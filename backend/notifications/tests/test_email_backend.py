@@ -0,0 +1,101 @@
+from io import StringIO
+
+import requests
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from backend.email_backend import SendGridEmailBackend, SendGridError
+from utils.sendgrid_stub import SendGridStub
+
+
+def make_messages(count, subject='Claverica: Payment Received', body='You received $10.00'):
+    return [
+        EmailMessage(subject=subject, body=body, from_email='Claverica <noreply@claverica.com>', to=[f'user{i}@example.com'])
+        for i in range(count)
+    ]
+
+
+class SendGridEmailBackendTests(SimpleTestCase):
+    """Test the batched SendGrid backend against a local stub server"""
+
+    def setUp(self):
+        self.stub = SendGridStub()
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+
+    def backend(self, **kwargs):
+        return SendGridEmailBackend(api_key='test-key', api_url=self.stub.url, **kwargs)
+
+    def test_same_content_shares_one_request(self):
+        messages = make_messages(5) + make_messages(1, subject='Claverica: Transfer Completed')
+
+        self.assertEqual(self.backend().send_messages(messages), 6)
+
+        self.assertEqual(len(self.stub.requests), 2)
+        by_subject = {request['subject']: request for request in self.stub.requests}
+        payment = by_subject['Claverica: Payment Received']
+        self.assertEqual(
+            [p['to'] for p in payment['personalizations']],
+            [[{'email': f'user{i}@example.com'}] for i in range(5)]
+        )
+        self.assertEqual(payment['from'], {'email': 'noreply@claverica.com', 'name': 'Claverica'})
+
+    def test_requests_split_at_personalization_limit(self):
+        self.assertEqual(self.backend(max_personalizations=2).send_messages(make_messages(5)), 5)
+
+        self.assertEqual(sorted(len(r['personalizations']) for r in self.stub.requests), [1, 2, 2])
+
+    def test_html_alternative_and_recipients_kept(self):
+        message = EmailMultiAlternatives(
+            subject='Digest', body='plain', to=['a@example.com', 'b@example.com'], cc=['c@example.com']
+        )
+        message.attach_alternative('<p>html</p>', 'text/html')
+
+        self.backend().send_messages([message])
+
+        request, = self.stub.requests
+        self.assertEqual([c['type'] for c in request['content']], ['text/plain', 'text/html'])
+        self.assertEqual(len(request['personalizations'][0]['to']), 2)
+        self.assertEqual(request['personalizations'][0]['cc'], [{'email': 'c@example.com'}])
+
+    def test_connections_are_reused(self):
+        backend = self.backend(max_personalizations=1, max_workers=2)
+        for _ in range(3):
+            self.assertEqual(backend.send_messages(make_messages(10)), 10)
+
+        self.assertEqual(len(self.stub.requests), 30)
+        self.assertLessEqual(self.stub.connections, 2)
+
+    def test_rejected_request_raises(self):
+        self.stub.status = 400
+
+        with self.assertRaisesMessage(SendGridError, 'SendGrid returned 400'):
+            self.backend().send_messages(make_messages(3))
+        self.assertEqual(self.backend(fail_silently=True).send_messages(make_messages(3)), 0)
+
+    def test_partial_failure_counts_accepted_requests(self):
+        self.stub.reject_subjects = {'Claverica: Transfer Completed'}
+        messages = make_messages(4) + make_messages(2, subject='Claverica: Transfer Completed')
+
+        with self.assertRaises(SendGridError) as raised:
+            self.backend(max_personalizations=2, max_workers=3).send_messages(messages)
+
+        self.assertEqual(raised.exception.sent, 4)
+        self.assertEqual(len(self.stub.requests), 3)
+
+    def test_connection_error(self):
+        backend = SendGridEmailBackend(api_key='test-key', api_url='http://127.0.0.1:1/v3/mail/send', timeout=1)
+        with self.assertRaises(requests.RequestException):
+            backend.send_messages(make_messages(1))
+
+        backend.fail_silently = True
+        self.assertEqual(backend.send_messages(make_messages(1)), 0)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_email_backend', '--messages', '20', '--distinct', '2', '--latency', '0', stdout=out)
+
+        batched = next(line.split() for line in out.getvalue().splitlines() if line.split()[:1] == ['batched'])
+        mode, distinct, messages, requests_made, connections, sent = batched[:6]
+        self.assertEqual((requests_made, sent), ('2', '20'))
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from notifications.models import Notification, NotificationLog, NotificationOutbox, NotificationPreference
+from notifications.outbox import OutboxWorker, claim_outbox, backoff_delay
+from notifications.services import NotificationService
+from utils.factories import make_account
+
+
+class NotificationOutboxTests(TestCase):
+    """Test queuing notification delivery and the outbox worker"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        # Start from an empty outbox (account creation queues a welcome notification)
+        NotificationOutbox.objects.all().delete()
+        mail.outbox = []
+
+        pusher = mock.patch('utils.pusher.send_events', return_value=True)
+        self.push = pusher.start()
+        self.addCleanup(pusher.stop)
+
+    def notify(self, priority='HIGH'):
+        return NotificationService.create_notification(
+            recipient=self.account,
+            notification_type='PAYMENT_RECEIVED',
+            title='Payment Received',
+            message='You received $10.00',
+            priority=priority,
+        )
+
+    def test_create_notification_queues_instead_of_sending(self):
+        notification = self.notify()
+
+        self.assertEqual(mail.outbox, [])
+        self.push.assert_not_called()
+        self.assertEqual(
+            sorted(notification.outbox.values_list('channel', 'status')),
+            [('EMAIL', 'PENDING'), ('PUSH', 'PENDING')]
+        )
+
+    def test_outbox_follows_preferences(self):
+        preference = NotificationPreference.objects.get(account=self.account)
+        preference.push_enabled = False
+        with self.captureOnCommitCallbacks(execute=True):
+            preference.save()
+
+        self.assertEqual(list(self.notify(priority='LOW').outbox.values_list('channel', flat=True)), [])
+        self.assertEqual(list(self.notify(priority='HIGH').outbox.values_list('channel', flat=True)), ['EMAIL'])
+
+    def test_rolled_back_notification_leaves_no_outbox_rows(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.notify()
+            raise RuntimeError('request failed')
+
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_worker_delivers_and_logs(self):
+        notification = self.notify()
+
+        totals = OutboxWorker(threads=2, batch_size=1).run(once=True)
+
+        self.assertEqual((totals['claimed'], totals['sent']), (2, 2))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.account.email])
+        (event,), = self.push.call_args.args
+        self.assertEqual(event[:2], (f'private-user-{self.account.account_number}', 'notification.created'))
+        self.assertEqual(set(notification.outbox.values_list('status', flat=True)), {'SENT'})
+        self.assertEqual(
+            sorted(notification.delivery_logs.exclude(action='CREATED').values_list('action', flat=True)),
+            ['EMAIL_SENT', 'PUSH_SENT']
+        )
+
+    def test_failed_delivery_backs_off_then_gives_up(self):
+        notification = self.notify()
+        self.push.return_value = False
+
+        totals = OutboxWorker(max_attempts=2).run(once=True)
+
+        push = notification.outbox.get(channel='PUSH')
+        self.assertEqual((totals['sent'], totals['failed']), (1, 1))
+        self.assertEqual((push.status, push.attempts), ('PENDING', 1))
+        self.assertGreater(push.next_attempt_at, timezone.now() + timedelta(seconds=backoff_delay(1) - 5))
+        self.assertEqual(NotificationLog.objects.filter(action='PUSH_FAILED').count(), 1)
+
+        # Due again: second failure exhausts max_attempts
+        NotificationOutbox.objects.filter(id=push.id).update(next_attempt_at=timezone.now())
+        totals = OutboxWorker(max_attempts=2).run(once=True)
+
+        push.refresh_from_db()
+        self.assertEqual(totals['dead'], 1)
+        self.assertEqual((push.status, push.attempts), ('FAILED', 2))
+
+    def test_backoff_is_exponential_and_capped(self):
+        self.assertEqual([backoff_delay(n, base=10, cap=50) for n in range(1, 5)], [10, 20, 40, 50])
+
+    def test_stale_claim_is_reclaimed(self):
+        self.notify()
+        claimed = claim_outbox(batch_size=10)
+        self.assertEqual(claim_outbox(batch_size=10), [])
+
+        NotificationOutbox.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(len(claim_outbox(batch_size=10, claim_timeout=60)), len(claimed))
+
+    def test_command(self):
+        self.notify()
+        out = StringIO()
+
+        call_command('notification_worker', '--once', '--threads', '2', stdout=out)
+
+        self.assertIn('Sent 2 of 2 claimed deliveries', out.getvalue())
+        self.assertFalse(NotificationOutbox.objects.exclude(status='SENT').exists())
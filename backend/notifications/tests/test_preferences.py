@@ -0,0 +1,68 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from notifications.models import NotificationOutbox, NotificationPreference
+from notifications.preferences import PreferenceResolver
+from notifications.services import NotificationService
+from utils.factories import make_account
+
+
+class PreferenceResolverTests(TestCase):
+    """Test cached preference resolution for delivery"""
+
+    def setUp(self):
+        self.accounts = [
+            make_account(email=f'prefs{i}@claverica.com', phone=f'+25470000013{i}') for i in range(3)
+        ]
+        self.ids = [account.id for account in self.accounts]
+        cache.clear()
+
+    def test_bulk_resolve_is_one_query_then_cached(self):
+        NotificationPreference.objects.filter(account_id=self.ids[0]).delete()
+
+        with self.assertNumQueries(1):
+            preferences = PreferenceResolver.resolve_many(self.ids)
+        with self.assertNumQueries(0):
+            self.assertEqual(PreferenceResolver.resolve_many(self.ids).keys(), preferences.keys())
+
+        # Account without a row gets the model defaults
+        self.assertEqual(preferences[self.ids[0]].digest_time, datetime.time(18, 0))
+        self.assertFalse(preferences[self.ids[0]].email_low_priority)
+        self.assertFalse(NotificationPreference.objects.filter(account_id=self.ids[0]).exists())
+
+    def test_put_invalidates_cached_entry(self):
+        account = self.accounts[1]
+        self.assertTrue(PreferenceResolver.resolve(account.id).push_enabled)
+
+        client = APIClient()
+        client.force_authenticate(account)
+        data = client.get('/api/notifications/preferences/').data
+        data['push_enabled'] = False
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.put('/api/notifications/preferences/', data, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(PreferenceResolver.resolve(account.id).push_enabled)
+
+    def test_type_flags_suppress_delivery(self):
+        account = self.accounts[2]
+        preference = NotificationPreference.objects.get(account=account)
+        preference.receive_payment_notifications = False
+        with self.captureOnCommitCallbacks(execute=True):
+            preference.save()
+
+        payment = NotificationService.create_notification(
+            recipient=account, notification_type='PAYMENT_RECEIVED', title='Paid', message='$10', priority='HIGH'
+        )
+        transfer = NotificationService.create_notification(
+            recipient=account, notification_type='TRANSFER_COMPLETED', title='Sent', message='$10', priority='HIGH'
+        )
+
+        self.assertFalse(NotificationOutbox.objects.filter(notification=payment).exists())
+        self.assertEqual(
+            sorted(NotificationOutbox.objects.filter(notification=transfer).values_list('channel', flat=True)),
+            ['EMAIL', 'PUSH']
+        )
@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from notifications.models import Notification
+from utils.factories import make_account
+from utils.pusher import EventDispatcher, coalesce, send_events, user_channel
+from utils.pusher_stub import PusherStub
+
+
+class CoalesceTests(SimpleTestCase):
+    """Test folding event bursts"""
+
+    def test_burst_becomes_one_bulk_event(self):
+        events = [('private-user-A', 'notification.updated', {'id': i, 'status': 'READ'}) for i in range(5)]
+        events += [
+            ('private-user-B', 'notification.updated', {'id': 9, 'status': 'READ'}),
+            ('private-user-A', 'notification.created', {'id': 10}),
+            ('private-user-A', 'notification.created', {'id': 10}),
+        ]
+
+        self.assertEqual(coalesce(events), [
+            ('private-user-A', 'notifications.bulk_updated', {'count': 5, 'ids': [0, 1, 2, 3, 4], 'status': 'READ'}),
+            ('private-user-B', 'notification.updated', {'id': 9, 'status': 'READ'}),
+            ('private-user-A', 'notification.created', {'id': 10}),
+        ])
+
+    def test_large_burst_omits_ids(self):
+        events = [('private-user-A', 'notification.updated', {'id': i, 'status': 'READ'}) for i in range(600)]
+
+        (_, name, data), = coalesce(events)
+
+        self.assertEqual((name, data), ('notifications.bulk_updated', {'count': 600, 'status': 'READ'}))
+
+
+class SendEventsTests(SimpleTestCase):
+    """Test the batch trigger path against a local stub"""
+
+    def test_events_go_out_ten_per_call(self):
+        events = [(f'private-user-{i}', 'notification.created', {'id': i}) for i in range(23)]
+
+        with PusherStub() as stub:
+            self.assertTrue(send_events(events, client=stub.client()))
+
+        self.assertEqual(len(stub.requests), 3)
+        self.assertTrue(all(path.endswith('/batch_events') for path in stub.paths))
+        self.assertEqual(stub.events(), events)
+
+    def test_rejected_batch(self):
+        with PusherStub(status=500) as stub:
+            self.assertFalse(send_events([('private-user-1', 'x', {})], client=stub.client()))
+
+
+class EventDispatcherTests(TestCase):
+    """Test per-request queuing and commit handling"""
+
+    def test_request_events_flush_together_after_commit(self):
+        with PusherStub() as stub:
+            dispatcher = EventDispatcher(client=stub.client())
+            dispatcher.begin()
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(4):
+                    dispatcher.queue('private-user-A', 'notification.updated', {'id': i, 'status': 'READ'})
+            self.assertEqual(stub.requests, [])
+
+            dispatcher.end()
+            dispatcher.wait(timeout=5)
+
+        self.assertEqual(len(stub.requests), 1)
+        self.assertEqual(stub.events(), [
+            ('private-user-A', 'notifications.bulk_updated', {'count': 4, 'ids': [0, 1, 2, 3], 'status': 'READ'})
+        ])
+
+    def test_rolled_back_events_are_dropped(self):
+        dispatcher = EventDispatcher(client=mock.Mock())
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                dispatcher.queue('private-user-A', 'notification.created', {'id': 1})
+                raise RuntimeError('rolled back')
+
+        self.assertEqual(callbacks, [])
+
+
+class MarkAllAsReadTests(TransactionTestCase):
+    """Mark-all-read marks everything and pushes one coalesced event"""
+
+    def test_mark_all_read(self):
+        account = make_account()
+        Notification.objects.filter(recipient=account).delete()
+        Notification.objects.bulk_create([
+            Notification(recipient=account, title=f'Notice {i}', message='Hello') for i in range(5)
+        ])
+        client = APIClient()
+        client.force_authenticate(account)
+
+        with PusherStub() as stub:
+            dispatcher = EventDispatcher(client=stub.client())
+            with mock.patch('utils.pusher.dispatcher', dispatcher):
+                response = client.post('/api/notifications/mark-all-read/')
+            dispatcher.wait(timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'marked 5 notifications as read')
+        self.assertFalse(Notification.objects.filter(recipient=account, status='UNREAD').exists())
+
+        (channel, name, data), = stub.events()
+        self.assertEqual((channel, name), (user_channel(account.account_number), 'notifications.bulk_updated'))
+        self.assertEqual((data['count'], data['status'], len(data['ids'])), (5, 'READ', 5))
@@ -0,0 +1,94 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from notifications.counters import UnreadCounter
+from notifications.models import Notification, NotificationLog, NotificationOutbox
+from notifications.services import NotificationService
+from notifications.staff import StaffDirectory
+from utils.factories import make_account
+
+
+class StaffFanOutTests(TestCase):
+    """Test admin notifications reaching every active staff account"""
+
+    def setUp(self):
+        cache.clear()
+        self.client_account = make_account()
+        self.staff = [self.make_staff(i) for i in range(3)]
+        self.make_staff(9, is_active=False)
+
+    def make_staff(self, i, is_active=True):
+        account = make_account(email=f'staff{i}@claverica.com', phone=f'+25470000025{i}')
+        account.is_staff = True
+        account.is_active = is_active
+        with self.captureOnCommitCallbacks(execute=True):
+            account.save()
+        return account
+
+    def notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return NotificationService.notify_staff(
+                notification_type='ADMIN_NEW_TRANSFER',
+                title='New Transfer',
+                message='Transfer needs review',
+                priority='HIGH',
+                metadata={'admin_action_required': True},
+            )
+
+    def test_every_active_staff_member_is_notified(self):
+        notifications = self.notify()
+
+        self.assertEqual(
+            sorted(n.recipient_id for n in notifications), [account.id for account in self.staff]
+        )
+        self.assertEqual(NotificationLog.objects.filter(notification__in=notifications, action='CREATED').count(), 3)
+        self.assertEqual(NotificationOutbox.objects.filter(notification__in=notifications).count(), 6)
+        for account in self.staff:
+            self.assertEqual(
+                UnreadCounter.get(account.id),
+                Notification.objects.filter(recipient=account, status='UNREAD').count()
+            )
+
+    def test_queries_do_not_grow_with_staff(self):
+        self.notify()  # Warm the staff and preference caches
+        with CaptureQueriesContext(connection) as three:
+            self.notify()
+
+        for i in range(3, 8):
+            self.staff.append(self.make_staff(i))
+        self.notify()
+        with CaptureQueriesContext(connection) as eight:
+            self.assertEqual(len(self.notify()), 8)
+
+        self.assertEqual(len(eight), len(three))
+
+    def test_staff_changes_refresh_directory(self):
+        self.assertEqual(len(StaffDirectory.recipients()), 3)
+
+        promoted = self.make_staff(5)
+        demoted = self.staff[0]
+        demoted.is_staff = False
+        with self.captureOnCommitCallbacks(execute=True):
+            demoted.save()
+
+        self.assertEqual(
+            [account_id for account_id, _ in StaffDirectory.recipients()],
+            [self.staff[1].id, self.staff[2].id, promoted.id]
+        )
+
+    def test_admin_payment_notification_fans_out(self):
+        payment = SimpleNamespace(
+            amount=Decimal('25.00'), account=self.client_account, sender='Employer',
+            payment_code='PC-1', admin_user=None
+        )
+
+        NotificationService.send_admin_payment_notification(payment)
+
+        self.assertEqual(
+            Notification.objects.filter(notification_type='ADMIN_PAYMENT_PROCESSED').count(), len(self.staff)
+        )
@@ -0,0 +1,100 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from notifications.counters import UnreadCounter
+from notifications.models import Notification, NotificationCounter
+from notifications.services import NotificationService
+from utils.factories import make_account
+
+
+class UnreadCounterTests(TestCase):
+    """Test the per-account unread counter behind the badge"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        self.client = APIClient()
+        self.client.force_authenticate(self.account)
+
+        pusher = mock.patch('utils.pusher.dispatcher')
+        pusher.start()
+        self.addCleanup(pusher.stop)
+
+    def notify(self, count=1):
+        return [
+            Notification.objects.create(recipient=self.account, title=f'Notice {i}', message='Hello')
+            for i in range(count)
+        ]
+
+    def actual(self):
+        return Notification.objects.filter(recipient=self.account, status='UNREAD').count()
+
+    def badge(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pass
+        return self.client.get('/api/notifications/unread-count/').data['unread_count']
+
+    def test_counter_follows_create_and_read(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second, third = self.notify(3)
+        self.assertEqual(self.badge(), self.actual())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.mark_as_read()
+            first.mark_as_read()
+            second.mark_as_archived()
+
+        self.assertEqual(self.badge(), self.actual())
+        self.assertEqual(NotificationService.get_unread_count(self.account.account_number), self.actual())
+
+    def test_mark_all_read_zeroes_counter(self):
+        self.notify(4)
+        self.assertGreater(self.badge(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/notifications/mark-all-read/')
+
+        self.assertEqual(self.badge(), 0)
+
+    def test_badge_never_counts_notifications(self):
+        self.notify(2)
+        expected = self.actual()
+
+        for warm in (False, True):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.badge(), expected)
+            self.assertFalse(
+                [q['sql'] for q in queries.captured_queries if 'notifications_notification"' in q['sql']]
+            )
+            if warm:
+                self.assertFalse(
+                    [q['sql'] for q in queries.captured_queries if 'notifications_notificationcounter' in q['sql']]
+                )
+
+    def test_repair_fixes_drift(self):
+        self.notify(3)
+        # Bypasses the counter, as a queryset update or admin delete would
+        Notification.objects.filter(recipient=self.account).update(status='READ')
+        NotificationCounter.objects.filter(account=self.account).update(unread_count=7)
+
+        out = StringIO()
+        call_command('repair_unread_counters', stdout=out)
+
+        self.assertIn('repaired 1', out.getvalue())
+        self.assertEqual(self.badge(), 0)
+        self.assertEqual(UnreadCounter.repair(), {'checked': 1, 'repaired': 0})
+
+    def test_missing_counter_is_seeded(self):
+        self.notify(2)
+        NotificationCounter.objects.all().delete()
+        cache.clear()
+
+        self.assertEqual(self.badge(), self.actual())
+        self.assertEqual(NotificationCounter.objects.get(account=self.account).unread_count, self.actual())
@@ -8,6 +8,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
 
 from .models import Notification, NotificationPreference, NotificationLog
@@ -18,6 +19,7 @@ from .serializers import (
     NotificationLogSerializer
 )
 from .services import NotificationService
+from .counters import UnreadCounter
 from utils.pusher import trigger_notification  # ✅ Add backend.
 
 class IsAdminUser(permissions.BasePermission):
@@ -107,11 +109,8 @@ class UnreadCountView(APIView):
 
     def get(self, request):
         """Return count of unread notifications for current user"""
-        #  FIXED: Direct queryset instead of calling NotificationService
-        count = Notification.objects.filter(
-            recipient=request.user,
-            status='UNREAD'
-        ).count()
+        # Served from the counter cache; never counts the Notification table
+        count = UnreadCounter.get(request.user.id)
 
         return Response({'unread_count': count})
 
@@ -145,21 +144,26 @@ class MarkAllAsReadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        notifications = Notification.objects.filter(
-            recipient=request.user,
-            status='UNREAD'
-        )
-
-        count = notifications.count()
-        notifications.update(status='READ', read_at=timezone.now())
+        with transaction.atomic():
+            # Collect the ids first: once updated, the UNREAD filter matches nothing
+            notification_ids = list(Notification.objects.filter(
+                recipient=request.user,
+                status='UNREAD'
+            ).values_list('id', flat=True))
+
+            count = Notification.objects.filter(id__in=notification_ids, status='UNREAD').update(
+                status='READ', read_at=timezone.now()
+            )
+            UnreadCounter.adjust(request.user.id, -count)
 
-        #  ADDED: Trigger Pusher event for each notification
-        for notification in notifications:
+        # Queued per notification; the dispatcher coalesces the burst into
+        # one notifications.bulk_updated event after the response
+        for notification_id in notification_ids:
             trigger_notification(
-                account_number=notification.recipient.account_number,
+                account_number=request.user.account_number,
                 event_name='notification.updated',
                 data={
-                    'id': notification.id,
+                    'id': notification_id,
                     'status': 'READ'
                 }
             )
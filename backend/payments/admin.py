@@ -84,40 +84,24 @@ class PaymentAdmin(admin.ModelAdmin):
 
     def mark_as_completed(self, request, queryset):
         """Mark selected payments as completed"""
-        from transactions.models import Wallet, Transaction
+        from transactions.services import WalletService
 
         for payment in queryset.filter(status__in=['pending', 'failed']):
             try:
-                # Update wallet
-                wallet, created = Wallet.objects.get_or_create(
-                    account=payment.account,
-                    defaults={'balance': 0.00, 'currency': 'USD'}
+                # Post through the ledger so balance, Transaction and rollups stay in step
+                balance_after = WalletService.credit_wallet(
+                    account_number=payment.account.account_number,
+                    amount=payment.amount,
+                    reference=payment.reference,
+                    description=f'Payment from {payment.sender}'
                 )
 
-                old_balance = wallet.balance
-                wallet.balance += payment.amount
-                wallet.save()
-
                 # Update payment balances
-                payment.balance_before = old_balance
-                payment.balance_after = wallet.balance
+                payment.balance_before = balance_after - payment.amount
+                payment.balance_after = balance_after
                 payment.status = 'completed'
                 payment.save()
 
-                # Create transaction if doesn't exist
-                Transaction.objects.get_or_create(
-                    reference=payment.reference,
-                    defaults={
-                        'account': payment.account,
-                        'wallet': wallet,
-                        'transaction_type': 'credit',
-                        'amount': payment.amount,
-                        'description': f'Payment from {payment.sender}',
-                        'status': 'completed',
-                        'metadata': {'payment_id': payment.id}
-                    }
-                )
-
             except Exception as e:
                 self.message_user(request, f"Error updating payment {payment.reference}: {e}", messages.ERROR)
                 continue
@@ -7,6 +7,13 @@ from decimal import Decimal
 import uuid
 
 
+def generate_payment_reference():
+    """PAY-YYYYMMDD-NNNNNN from the shared payment sequence (no query per payment)"""
+    from django.utils import timezone
+    from transactions.sequences import next_value
+    return f"PAY-{timezone.now().strftime('%Y%m%d')}-{next_value('payment'):06d}"
+
+
 class PaymentCode(models.Model):
     """
     Custom payment codes that admin assigns to accounts
@@ -156,22 +163,7 @@ class Payment(models.Model):
         """
         # Generate reference if not set
         if not self.reference:
-            from django.utils import timezone
-            date_str = timezone.now().strftime('%Y%m%d')
-            last_payment = Payment.objects.filter(
-                reference__startswith=f'PAY-{date_str}'
-            ).order_by('-id').first()
-
-            if last_payment:
-                try:
-                    last_num = int(last_payment.reference.split('-')[-1])
-                    new_num = last_num + 1
-                except:
-                    new_num = 1
-            else:
-                new_num = 1
-
-            self.reference = f'PAY-{date_str}-{new_num:03d}'
+            self.reference = generate_payment_reference()
 
         # Save the payment (wallet updates handled separately by services.py)
         super().save(*args, **kwargs)
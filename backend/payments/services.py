@@ -6,11 +6,9 @@ from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.mail import send_mail
 from decimal import Decimal
-import random
-import string
 from datetime import datetime
 
-from .models import Payment, PaymentCode
+from .models import Payment, PaymentCode, generate_payment_reference
 from accounts.models import Account
 
 
@@ -27,9 +25,7 @@ class PaymentService:
     @staticmethod
     def generate_reference():
         """Generate unique payment reference"""
-        timestamp = timezone.now().strftime('%Y%m%d')
-        random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        return f"PAY-{timestamp}-{random_str}"
+        return generate_payment_reference()
 
     @staticmethod
     def get_payment_code_details(payment_code):
@@ -85,9 +81,6 @@ class PaymentService:
             # Import here to avoid circular imports
             from transactions.services import WalletService
 
-            # Get current balance
-            balance_before = account.wallet.balance
-
             # Credit the wallet
             balance_after = WalletService.credit_wallet(
                 account_number=account.account_number,
@@ -96,6 +89,9 @@ class PaymentService:
                 description=f"Payment from {sender}: {description}"
             )
 
+            # Derive from the posting rather than a separate (racy) read
+            balance_before = balance_after - amount
+
             # Create payment record
             payment = Payment.objects.create(
                 account=account,
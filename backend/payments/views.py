@@ -13,6 +13,7 @@ from .serializers import (
     ProcessPaymentSerializer, AssignPaymentCodeSerializer
 )
 from .services import PaymentService
+from transactions.idempotency import idempotent
 from accounts.models import Account
 
 
@@ -96,6 +97,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
         return super().list(request, *args, **kwargs)
 
     @action(detail=False, methods=['post'])
+    @idempotent
     def process(self, request):
         """Process a new payment (Admin only)"""
         if not request.user.is_superuser:
@@ -141,6 +141,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'backend.db_utils.DatabaseConnectionMiddleware',
+    # Imported as utils.pusher (like the views) so both share one dispatcher
+    'utils.pusher.PusherDispatchMiddleware',
 ]
 ROOT_URLCONF = 'backend.urls'
 
@@ -303,6 +305,7 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
 
 # ==============================================================================
@@ -1,10 +1,10 @@
 from django.contrib import admin
-from .models import Wallet, Bank, Transaction, UserBankAccount
+from .models import Wallet, Bank, Transaction, UserBankAccount, WalletDailyRollup, WalletBalanceSnapshot
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
     """Admin for Wallets"""
-    list_display = ('account_number', 'account_email', 'balance', 'currency', 'created_at')
+    list_display = ('account_number', 'account_email', 'balance', 'currency', 'shard_count', 'created_at')
     search_fields = ('account__email', 'account__account_number')
     list_filter = ('currency', 'created_at')
 
@@ -71,3 +71,20 @@ class UserBankAccountAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+@admin.register(WalletDailyRollup)
+class WalletDailyRollupAdmin(admin.ModelAdmin):
+    """Admin for daily ledger rollups (maintained automatically)"""
+    list_display = ('wallet', 'date', 'transaction_type', 'amount', 'count')
+    list_filter = ('transaction_type', 'date')
+    search_fields = ('wallet__account__account_number',)
+    date_hierarchy = 'date'
+    readonly_fields = ('wallet', 'date', 'transaction_type', 'amount', 'count')
+
+@admin.register(WalletBalanceSnapshot)
+class WalletBalanceSnapshotAdmin(admin.ModelAdmin):
+    """Admin for balance snapshots (maintained automatically)"""
+    list_display = ('wallet', 'as_of', 'balance', 'transaction_id', 'created_at')
+    search_fields = ('wallet__account__account_number',)
+    date_hierarchy = 'as_of'
+    readonly_fields = ('wallet', 'transaction_id', 'balance', 'as_of', 'created_at')
@@ -0,0 +1,142 @@
+# transactions/balance_cache.py
+"""
+Write-through wallet balance cache.
+
+Entries live in the default Django cache (Redis in production, locmem
+locally) keyed by account number and hold (version, balance, currency).
+Wallet.version is bumped by the same UPDATE that moves the balance, and
+the ledger posting path stores the new entry once its transaction has
+committed. A store only replaces an entry with an older version, so a
+slow writer or a read-through fill can never roll the cache back past a
+newer balance.
+
+Sharded wallets (Wallet.shard_count > 0) are never cached: their shards
+change without touching the wallet row, so a read always sums them.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Wallet, WalletBalanceShard
+
+logger = logging.getLogger(__name__)
+
+BALANCE_CACHE_TIMEOUT = getattr(settings, 'WALLET_BALANCE_CACHE_TIMEOUT', 300)
+
+# How long a store may wait for another writer of the same key
+LOCK_TIMEOUT = 5
+LOCK_ATTEMPTS = 20
+LOCK_WAIT = 0.005
+
+HITS_KEY = 'wallet:balance-stats:hits'
+MISSES_KEY = 'wallet:balance-stats:misses'
+
+
+def _key(account_number):
+    return f'wallet:balance:{account_number}'
+
+
+def _lock_key(account_number):
+    return f'wallet:balance-lock:{account_number}'
+
+
+class BalanceCache:
+    """Cached wallet balances, kept current by the ledger posting path"""
+
+    @staticmethod
+    def get(account_number):
+        """
+        Get (balance, currency) for an account, reading through on a miss.
+
+        Returns:
+            Tuple (balance, currency), or None if the account has no wallet
+        """
+        entry = cache.get(_key(account_number))
+        if entry is not None:
+            BalanceCache._count(HITS_KEY)
+            return entry[1], entry[2]
+
+        BalanceCache._count(MISSES_KEY)
+        row = Wallet.objects.filter(
+            account_id=account_number
+        ).values_list('version', 'balance', 'currency', 'id', 'shard_count').first()
+
+        if row is None:
+            return None
+
+        version, balance, currency, wallet_id, shard_count = row
+        if shard_count:
+            shards = WalletBalanceShard.objects.filter(wallet_id=wallet_id).aggregate(total=Sum('balance'))
+            return balance + (shards['total'] or 0), currency
+
+        BalanceCache.store(account_number, version, balance, currency)
+        return balance, currency
+
+    @staticmethod
+    def store(account_number, version, balance, currency='USD'):
+        """
+        Cache a balance unless a newer version is already cached.
+
+        The compare-and-set runs under a short cache lock (cache.add is
+        atomic on every backend). If the lock cannot be had the entry is
+        dropped instead, so the next read goes to the database.
+        """
+        key, lock = _key(account_number), _lock_key(account_number)
+
+        for _ in range(LOCK_ATTEMPTS):
+            if cache.add(lock, 1, LOCK_TIMEOUT):
+                try:
+                    current = cache.get(key)
+                    if current is None or current[0] < version:
+                        cache.set(key, (version, balance, currency), BALANCE_CACHE_TIMEOUT)
+                finally:
+                    cache.delete(lock)
+                return
+            time.sleep(LOCK_WAIT)
+
+        logger.warning(f"Balance cache lock busy for {account_number}; dropping entry")
+        cache.delete(key)
+
+    @staticmethod
+    def store_on_commit(account_number, version, balance, currency='USD'):
+        """Store once the surrounding database transaction commits"""
+        transaction.on_commit(
+            lambda: BalanceCache.store(account_number, version, balance, currency)
+        )
+
+    @staticmethod
+    def invalidate_on_commit(account_number):
+        """Drop the entry once the surrounding transaction commits"""
+        transaction.on_commit(lambda: BalanceCache.invalidate(account_number))
+
+    @staticmethod
+    def invalidate(account_number):
+        cache.delete(_key(account_number))
+
+    @staticmethod
+    def stats():
+        """Shared hit/miss counters since the last reset"""
+        hits = cache.get(HITS_KEY, 0)
+        misses = cache.get(MISSES_KEY, 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None,
+        }
+
+    @staticmethod
+    def reset_stats():
+        cache.delete_many([HITS_KEY, MISSES_KEY])
+
+    @staticmethod
+    def _count(key):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # First use (or evicted); a lost increment here is harmless
+            cache.add(key, 1, None)
@@ -0,0 +1,137 @@
+# transactions/idempotency.py
+"""
+Idempotency-Key support for money-moving endpoints.
+
+A client sends the same Idempotency-Key header on every retry of one
+logical request. The first request inserts an IdempotencyKey row and runs
+the view in the same database transaction; the response is stored on the
+row before commit. A duplicate arriving meanwhile blocks on the unique
+index until the first one finishes, then replays its stored response.
+Server errors (5xx) roll the key back so the client may retry for real.
+
+Completed keys are also kept in the cache for a few minutes, so the
+common "retry after timeout" case never touches the database.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction, IntegrityError, OperationalError
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+CACHE_TIMEOUT = getattr(settings, 'IDEMPOTENCY_CACHE_TIMEOUT', 300)
+MAX_KEY_LENGTH = 255
+
+
+def idempotent(view):
+    """
+    Make a DRF view (function or ViewSet method) honour Idempotency-Key.
+
+    Apply it innermost, directly above the def. Requests without the
+    header are passed straight through.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request = args[0] if isinstance(args[0], Request) else args[1]
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(*args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+        cache_key = f'idempotency:{request.user.pk}:{key}'
+
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        with transaction.atomic():
+            try:
+                record = _claim(request.user, key, fingerprint)
+            except OperationalError:
+                # Gave up waiting for a concurrent request with the same key
+                return Response(
+                    {'error': 'A request with this Idempotency-Key is still in progress'},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+            if record.response_code is None:
+                response = view(*args, **kwargs)
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                    return response
+
+                record.response_code = response.status_code
+                record.response_body = _to_json(response.data)
+                record.save(update_fields=['response_code', 'response_body'])
+
+                entry = (fingerprint, record.response_code, record.response_body)
+                transaction.on_commit(lambda: cache.set(cache_key, entry, CACHE_TIMEOUT))
+                return response
+
+            stored = (record.request_hash, record.response_code, record.response_body)
+
+        cache.set(cache_key, stored, CACHE_TIMEOUT)
+        return _replay(stored, fingerprint)
+
+    return wrapper
+
+
+def request_fingerprint(request):
+    """Hash of method, path and body; a reused key must match it"""
+    data = request.data
+    body = dict(data.lists()) if hasattr(data, 'lists') else data
+    raw = json.dumps([request.method, request.path, body], sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _claim(account, key, fingerprint):
+    """
+    Insert the key, or return the live row that already holds it.
+
+    The INSERT waits on the unique index while another transaction holds
+    the same key, which is what makes concurrent duplicates queue up.
+    """
+    expires_at = timezone.now() + timedelta(seconds=KEY_TTL)
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    account=account, key=key, request_hash=fingerprint, expires_at=expires_at
+                )
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(account=account, key=key).first()
+            if existing is not None and existing.expires_at > timezone.now():
+                return existing
+            IdempotencyKey.objects.filter(account=account, key=key, expires_at__lte=timezone.now()).delete()
+    raise OperationalError('Could not claim idempotency key')
+
+
+def _replay(stored, fingerprint):
+    request_hash, response_code, response_body = stored
+    if request_hash != fingerprint:
+        return Response(
+            {'error': 'Idempotency-Key was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(response_body, status=response_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def _to_json(data):
+    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
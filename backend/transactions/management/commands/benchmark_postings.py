@@ -0,0 +1,171 @@
+"""
+transactions/management/commands/benchmark_postings.py
+Multi-threaded throughput benchmark for WalletService.post
+
+Run against the production database engine (PostgreSQL) for meaningful
+numbers - SQLite serializes all writers on a single file lock.
+
+    python manage.py benchmark_postings --writers 8 32 128 --postings 5000
+
+Compare a single hot wallet row with a sharded one (credits only, as a
+collection account sees them):
+
+    python manage.py benchmark_postings --writers 32 128 --shards 16 --credits-only
+"""
+
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connections, DatabaseError, OperationalError
+from django.db.models import Sum
+
+from accounts.models import Account
+from transactions.models import Wallet, Transaction
+from transactions.services import WalletService, WalletShardService, InsufficientFundsError
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent wallet postings and check for balance drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers',
+            type=int,
+            nargs='+',
+            default=[8, 32, 128],
+            help='Concurrent writer counts to benchmark'
+        )
+        parser.add_argument(
+            '--postings',
+            type=int,
+            default=2000,
+            help='Total postings per run'
+        )
+        parser.add_argument(
+            '--opening-balance',
+            type=Decimal,
+            default=Decimal('1000.00'),
+            help='Balance credited before each run starts'
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=0,
+            help='Also run each writer count against a wallet with this many shards'
+        )
+        parser.add_argument(
+            '--credits-only',
+            action='store_true',
+            help='Post only credits (hot collection wallet workload)'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark accounts instead of deleting them'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('WALLET POSTING BENCHMARK'))
+        self.stdout.write(f"{'mode':>8} {'writers':>8} {'postings':>9} {'rejected':>9} {'errors':>7} "
+                          f"{'seconds':>8} {'post/s':>9} {'drift':>8}")
+
+        modes = [0, options['shards']] if options['shards'] else [0]
+        failed = False
+        for writers in options['writers']:
+            for shards in modes:
+                account = self._create_account()
+                try:
+                    if shards:
+                        WalletShardService.enable(account.account_number, shards)
+                    result = self._run(account.account_number, writers, options['postings'],
+                                       options['opening_balance'], options['credits_only'])
+                finally:
+                    if not options['keep']:
+                        self._delete_account(account)
+
+                mode = f"shard{shards}" if shards else 'single'
+                self.stdout.write(
+                    f"{mode:>8} {writers:>8} {result['posted']:>9} {result['rejected']:>9} {result['errors']:>7} "
+                    f"{result['elapsed']:>8.2f} {result['rate']:>9.1f} {result['drift']:>8}"
+                )
+                failed = failed or result['drift'] != Decimal('0.00')
+
+        if failed:
+            self.stdout.write(self.style.ERROR('Balance drift detected'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Zero balance drift across all runs'))
+
+    def _create_account(self):
+        """Create a throwaway account; signals give it a wallet"""
+        suffix = uuid.uuid4().hex[:10]
+        return Account.objects.create_user(
+            email=f'bench-{suffix}@claverica.local',
+            password=None,
+            phone=f'+999{random.randint(10**8, 10**9 - 1)}',
+            first_name='Benchmark',
+            last_name=suffix,
+        )
+
+    def _delete_account(self, account):
+        try:
+            account.delete()
+        except DatabaseError as e:
+            self.stdout.write(self.style.WARNING(
+                f"Could not delete benchmark account {account.account_number}: {e}"
+            ))
+
+    def _run(self, account_number, writers, postings, opening_balance, credits_only=False):
+        WalletService.credit_wallet(account_number, opening_balance, 'BENCH-OPEN', 'Benchmark opening balance')
+
+        per_writer = [postings // writers + (1 if i < postings % writers else 0) for i in range(writers)]
+
+        def writer(count):
+            posted, rejected, errors, net = 0, 0, 0, Decimal('0.00')
+            try:
+                for i in range(count):
+                    amount = Decimal(random.randint(1, 500)) / 100
+                    try:
+                        if i % 2 and not credits_only:
+                            WalletService.debit_wallet(account_number, amount, 'BENCH', 'Benchmark debit')
+                            net -= amount
+                        else:
+                            WalletService.credit_wallet(account_number, amount, 'BENCH', 'Benchmark credit')
+                            net += amount
+                        posted += 1
+                    except InsufficientFundsError:
+                        rejected += 1
+                    except OperationalError:
+                        errors += 1
+            finally:
+                connections.close_all()
+            return posted, rejected, errors, net
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            results = list(pool.map(writer, per_writer))
+        elapsed = time.perf_counter() - started
+
+        posted = sum(r[0] for r in results)
+        expected = opening_balance + sum((r[3] for r in results), Decimal('0.00'))
+
+        wallet = Wallet.objects.get(account_id=account_number)
+        ledger = Transaction.objects.filter(wallet=wallet)
+        credits = ledger.filter(transaction_type='credit').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        debits = ledger.filter(transaction_type='debit').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+
+        # Drift is the worst of: balance vs expected, balance vs ledger sum
+        balance = WalletShardService.total(wallet.id)
+        drift = max(abs(balance - expected), abs(balance - (credits - debits))).quantize(Decimal('0.01'))
+
+        return {
+            'posted': posted,
+            'rejected': sum(r[1] for r in results),
+            'errors': sum(r[2] for r in results),
+            'elapsed': elapsed,
+            'rate': posted / elapsed if elapsed else 0.0,
+            'drift': drift,
+        }
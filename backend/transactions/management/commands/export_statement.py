@@ -0,0 +1,60 @@
+"""
+transactions/management/commands/export_statement.py
+Stream a wallet statement to a file or stdout
+
+    python manage.py export_statement CLV-123-010190-26-01 --from 2026-01-01 --to 2026-03-31
+    python manage.py export_statement CLV-123-010190-26-01 --format ndjson --gzip -o statement.ndjson.gz
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.models import Wallet
+from transactions.statements import (
+    STATEMENT_FORMATS, parse_statement_range, render_statement, statement_filename
+)
+
+
+class Command(BaseCommand):
+    help = 'Export a wallet statement as CSV or NDJSON without loading it into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('account_number', help='CLV account number')
+        parser.add_argument('--from', dest='date_from', help='First day (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last day (YYYY-MM-DD)')
+        parser.add_argument('--format', choices=STATEMENT_FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output')
+        parser.add_argument(
+            '-o', '--output',
+            help="Output file; '-' for stdout. Defaults to statement-<account>-<range>.<format>"
+        )
+
+    def handle(self, *args, **options):
+        account_number = options['account_number']
+
+        try:
+            start, end = parse_statement_range(options['date_from'], options['date_to'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        wallet_id = Wallet.objects.filter(account_id=account_number).values_list('id', flat=True).first()
+        if wallet_id is None:
+            raise CommandError(f'Wallet not found for account {account_number}')
+
+        fmt, compress = options['format'], options['gzip']
+        output = options['output'] or statement_filename(account_number, fmt, start, end, compress)
+        chunks = render_statement(wallet_id, fmt, start, end, compress)
+
+        if output == '-':
+            stream = sys.stdout.buffer if compress else sys.stdout
+            for chunk in chunks:
+                stream.write(chunk)
+            stream.flush()
+            return
+
+        with open(output, 'wb' if compress else 'w', newline='' if not compress else None) as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'Statement written to {output}'))
@@ -0,0 +1,19 @@
+"""
+transactions/management/commands/purge_idempotency_keys.py
+Delete expired Idempotency-Key records
+
+    python manage.py purge_idempotency_keys
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from transactions.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete idempotency keys past their TTL'
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys"))
@@ -0,0 +1,49 @@
+"""
+transactions/management/commands/rebuild_wallet_rollups.py
+Backfill or rebuild WalletDailyRollup rows from the Transaction ledger
+
+    python manage.py rebuild_wallet_rollups
+    python manage.py rebuild_wallet_rollups --account CLV-123-010190-26-01
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.models import Wallet
+from transactions.services import LedgerRollupService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily income/expense rollups from transaction history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account',
+            nargs='+',
+            help='Only rebuild these account numbers'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Wallet ids fetched per query'
+        )
+
+    def handle(self, *args, **options):
+        wallets = Wallet.objects.order_by('id')
+        if options['account']:
+            wallets = wallets.filter(account_id__in=options['account'])
+            if not wallets.exists():
+                raise CommandError('No wallets found for the given accounts')
+
+        wallet_count = 0
+        row_count = 0
+        # Each wallet is rebuilt in its own transaction; no long-lived locks
+        for wallet_id in wallets.values_list('id', flat=True).iterator(chunk_size=options['chunk_size']):
+            row_count += LedgerRollupService.rebuild(wallet_id)
+            wallet_count += 1
+            if wallet_count % 1000 == 0:
+                self.stdout.write(f"  {wallet_count} wallets rebuilt...")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {row_count} rollup rows for {wallet_count} wallets")
+        )
@@ -0,0 +1,129 @@
+"""
+transactions/management/commands/reconcile_ledger.py
+Verify every wallet's balance chain and total against the Transaction ledger
+
+    python manage.py reconcile_ledger --workers 8 --report /var/log/claverica/recon.jsonl
+    python manage.py reconcile_ledger --full --account CLV-123-010190-26-01
+
+By default only rows posted since each wallet's last clean checkpoint are
+replayed. Discrepancies are written as one JSON object per line.
+"""
+
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from transactions.models import Wallet
+from transactions.reconciliation import reconcile_wallets, reconcile_chunk, save_checkpoints
+
+
+def _init_worker():
+    # Needed under the spawn start method; a no-op after fork
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Reconcile wallet balances against the transaction ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Worker processes (1 runs in this process)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Wallets per work unit'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore checkpoints and replay every ledger row'
+        )
+        parser.add_argument(
+            '--account',
+            nargs='+',
+            help='Only reconcile these account numbers'
+        )
+        parser.add_argument(
+            '--report',
+            help='Write discrepancies as JSON lines to this file (default: stdout)'
+        )
+
+    def handle(self, *args, **options):
+        wallets = Wallet.objects.order_by('id')
+        if options['account']:
+            wallets = wallets.filter(account_id__in=options['account'])
+            if not wallets.exists():
+                raise CommandError('No wallets found for the given accounts')
+
+        started = time.perf_counter()
+        totals = {'checked': 0, 'rows': 0, 'busy': [], 'discrepancies': 0}
+
+        report = open(options['report'], 'w') if options['report'] else sys.stdout
+        try:
+            for result in self._run(wallets, options):
+                totals['checked'] += result['checked']
+                totals['rows'] += result['rows']
+                totals['busy'].extend(result['busy'])
+                totals['discrepancies'] += len(result['discrepancies'])
+                save_checkpoints(result['checkpoints'])
+                for problem in result['discrepancies']:
+                    report.write(json.dumps(problem) + '\n')
+        finally:
+            if report is not sys.stdout:
+                report.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Checked {totals['checked']} wallets, {totals['rows']} ledger rows in {elapsed:.1f}s"
+        )
+        if totals['busy']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(totals['busy'])} wallets kept changing and were skipped: {', '.join(totals['busy'][:10])}"
+            ))
+        if totals['discrepancies']:
+            raise CommandError(f"{totals['discrepancies']} ledger discrepancies found")
+        self.stdout.write(self.style.SUCCESS('Ledger reconciled with no discrepancies'))
+
+    def _chunks(self, wallets, size):
+        """Walk wallet ids by keyset so no cursor stays open between chunks"""
+        last_id = None
+        while True:
+            page = wallets if last_id is None else wallets.filter(id__gt=last_id)
+            chunk = list(page.values_list('id', flat=True)[:size])
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1]
+
+    def _run(self, wallets, options):
+        chunks = self._chunks(wallets, options['chunk_size'])
+        full = options['full']
+
+        if options['workers'] <= 1:
+            for chunk in chunks:
+                yield reconcile_wallets(chunk, full, save=False)
+            return
+
+        # Forked children must not share the parent's database sockets
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            pending = set()
+            for chunk in chunks:
+                pending.add(pool.submit(reconcile_chunk, chunk, full))
+                # Bound the queue so wallet ids stream instead of piling up
+                if len(pending) >= options['workers'] * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in pending:
+                yield future.result()
@@ -0,0 +1,61 @@
+"""
+transactions/management/commands/snapshot_wallet_balances.py
+Take balance snapshots that anchor balance-as-of queries
+
+Run daily (e.g. just after midnight) to snapshot every wallet that moved:
+
+    python manage.py snapshot_wallet_balances
+
+Backfill history once, after deploying, for end-of-day snapshots:
+
+    python manage.py snapshot_wallet_balances --backfill
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.models import Wallet
+from transactions.services import BalanceSnapshotService
+
+
+class Command(BaseCommand):
+    help = 'Snapshot wallet balances for balance-as-of queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account',
+            nargs='+',
+            help='Only snapshot these account numbers'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Wallets handled per query'
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='Snapshot the end of every day in each wallet\'s history'
+        )
+
+    def handle(self, *args, **options):
+        wallets = Wallet.objects.order_by('id')
+        if options['account']:
+            wallets = wallets.filter(account_id__in=options['account'])
+            if not wallets.exists():
+                raise CommandError('No wallets found for the given accounts')
+
+        wallet_ids = list(wallets.values_list('id', flat=True))
+        size = options['chunk_size']
+        created = 0
+
+        if options['backfill']:
+            for wallet_id in wallet_ids:
+                created += BalanceSnapshotService.backfill(wallet_id)
+        else:
+            for start in range(0, len(wallet_ids), size):
+                created += BalanceSnapshotService.snapshot_latest(wallet_ids[start:start + size])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {created} balance snapshots for {len(wallet_ids)} wallets")
+        )
@@ -0,0 +1,58 @@
+"""
+transactions/management/commands/wallet_shards.py
+Manage sharded balances for hot wallets
+
+    python manage.py wallet_shards enable CLV-123-010190-26-01 --shards 16
+    python manage.py wallet_shards disable CLV-123-010190-26-01
+    python manage.py wallet_shards sweep            # every sharded wallet
+
+Sweeping folds shard balances into Wallet.balance; run it periodically so
+the wallet row stays close to the total.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.models import Wallet
+from transactions.services import WalletShardService, WalletServiceError, DEFAULT_SHARD_COUNT
+
+
+class Command(BaseCommand):
+    help = 'Enable, disable or sweep sharded wallet balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['enable', 'disable', 'sweep'])
+        parser.add_argument(
+            'accounts',
+            nargs='*',
+            help='Account numbers (sweep defaults to every sharded wallet)'
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=DEFAULT_SHARD_COUNT,
+            help='Sub-balance rows per wallet when enabling'
+        )
+
+    def handle(self, *args, **options):
+        action, accounts = options['action'], options['accounts']
+
+        if not accounts:
+            if action != 'sweep':
+                raise CommandError(f'{action} needs at least one account number')
+            accounts = list(Wallet.objects.filter(shard_count__gt=0).values_list('account_id', flat=True))
+
+        for account_number in accounts:
+            try:
+                if action == 'enable':
+                    WalletShardService.enable(account_number, options['shards'])
+                    self.stdout.write(f"  {account_number}: {options['shards']} shards")
+                elif action == 'disable':
+                    WalletShardService.disable(account_number)
+                    self.stdout.write(f"  {account_number}: sharding disabled")
+                else:
+                    moved = WalletShardService.sweep(account_number)
+                    self.stdout.write(f"  {account_number}: swept {moved}")
+            except WalletServiceError as e:
+                raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"{action.capitalize()} done for {len(accounts)} wallets"))
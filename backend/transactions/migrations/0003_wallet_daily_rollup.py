@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:21
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_alter_transaction_transaction_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('credit', 'Credit (Payment Received)'), ('debit', 'Debit (Transfer Sent)'), ('fee', 'Service Fee'), ('refund', 'Refund'), ('payment_in', 'Payment Received'), ('transfer_out', 'Transfer Sent')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='transactions.wallet')),
+            ],
+            options={
+                'db_table': 'wallet_daily_rollups',
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'transaction_type', 'date'), name='unique_wallet_type_date_rollup')],
+            },
+        ),
+    ]
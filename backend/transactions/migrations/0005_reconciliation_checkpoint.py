@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_wallet_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_id', models.BigIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('checked_at', models.DateTimeField(auto_now=True)),
+                ('wallet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_checkpoint', to='transactions.wallet')),
+            ],
+            options={
+                'db_table': 'ledger_reconciliation_checkpoints',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_reconciliation_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_id', models.BigIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('as_of', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='transactions.wallet')),
+            ],
+            options={
+                'db_table': 'wallet_balance_snapshots',
+                'ordering': ['-as_of'],
+                'indexes': [models.Index(fields=['wallet', 'as_of'], name='wallet_bala_wallet__90d317_idx')],
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'transaction_id'), name='unique_wallet_snapshot_transaction')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 import uuid
@@ -21,6 +22,10 @@ class Wallet(models.Model):
         validators=[MinValueValidator(Decimal("0.00"))]
     )
     currency = models.CharField(max_length=3, default="USD")
+    # Bumped on every balance change; lets the balance cache reject stale writes
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+    # >0 spreads credits over this many WalletBalanceShard rows (hot wallets)
+    shard_count = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -34,6 +39,26 @@ class Wallet(models.Model):
     def __str__(self):
         return f"Wallet {self.account.account_number} - {self.balance} {self.currency}"
 
+class WalletBalanceShard(models.Model):
+    """
+    Sub-balance of a sharded wallet. Credits land on a random shard so
+    they don't all queue on the wallet row; the wallet's total balance is
+    Wallet.balance plus the sum of its shards.
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='balance_shards')
+    index = models.PositiveSmallIntegerField()
+    balance = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        app_label = "transactions"
+        db_table = "wallet_balance_shards"
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'index'], name='unique_wallet_shard_index'),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id} shard {self.index}: {self.balance}"
+
 class Bank(models.Model):
     """Supported banks for transfers"""
     name = models.CharField(max_length=100)
@@ -84,6 +109,99 @@ class Transaction(models.Model):
     def __str__(self):
         return f"{self.transaction_type} - {self.amount} - {self.timestamp}"
 
+class WalletDailyRollup(models.Model):
+    """Running per-day totals of ledger postings, maintained by WalletService"""
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    amount = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal("0.00"))
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        app_label = "transactions"
+        db_table = "wallet_daily_rollups"
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['wallet', 'transaction_type', 'date'],
+                name='unique_wallet_type_date_rollup'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id} {self.date} {self.transaction_type}: {self.amount} ({self.count})"
+
+class WalletBalanceSnapshot(models.Model):
+    """Wallet balance as of a ledger row; anchors balance-at-time queries"""
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='balance_snapshots')
+    transaction_id = models.BigIntegerField()
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    as_of = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = "transactions"
+        db_table = "wallet_balance_snapshots"
+        ordering = ['-as_of']
+        indexes = [
+            models.Index(fields=['wallet', 'as_of']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['wallet', 'transaction_id'],
+                name='unique_wallet_snapshot_transaction'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id} @ {self.as_of}: {self.balance}"
+
+class ReconciliationCheckpoint(models.Model):
+    """Last ledger row of a wallet that reconcile_ledger verified clean"""
+    wallet = models.OneToOneField(Wallet, on_delete=models.CASCADE, related_name='reconciliation_checkpoint')
+    transaction_id = models.BigIntegerField()
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    checked_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = "transactions"
+        db_table = "ledger_reconciliation_checkpoints"
+
+    def __str__(self):
+        return f"{self.wallet_id} verified to #{self.transaction_id} ({self.balance})"
+
+class IdempotencyKey(models.Model):
+    """Stored response for a client supplied Idempotency-Key"""
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        app_label = "transactions"
+        db_table = "idempotency_keys"
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'key'], name='unique_account_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} {self.key} ({self.response_code})"
+
+class Sequence(models.Model):
+    """Named counter that processes reserve blocks of values from (see sequences.py)"""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    class Meta:
+        app_label = "transactions"
+        db_table = "sequences"
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
 class UserBankAccount(models.Model):
     """User's personal bank accounts for transfers"""
     account = models.ForeignKey(
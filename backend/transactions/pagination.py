@@ -0,0 +1,80 @@
+# transactions/pagination.py
+"""
+Keyset (cursor) pagination for ledger-style tables.
+
+Pages are ordered newest first on (<timestamp field>, id) and the cursor
+encodes the last row of the previous page, so fetching page N costs the
+same index range scan as page 1 - no OFFSET.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+    pass
+
+
+def encode_cursor(value, pk):
+    """Encode the position of a row as an opaque, URL-safe string"""
+    raw = json.dumps([value.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (datetime, pk)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(value), int(pk)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid pagination cursor')
+
+
+def clamp_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a client supplied page size, keeping it within 1..MAX_PAGE_SIZE"""
+    try:
+        size = int(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_paginate(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE, field='timestamp'):
+    """
+    Return one page of queryset, newest first.
+
+    Works on model querysets and on values() querysets; prefer values() so
+    list endpoints don't build model instances.
+
+    Args:
+        queryset: Unordered queryset; ordering is applied here
+        cursor: Cursor from a previous page, or None for the first page
+        limit: Page size
+        field: Datetime field to order by; id breaks ties
+
+    Returns:
+        Tuple (rows, next_cursor); next_cursor is None on the last page
+    """
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+        )
+
+    rows = list(queryset.order_by(f'-{field}', '-id')[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    if isinstance(last, dict):
+        return rows, encode_cursor(last[field], last['id'])
+    return rows, encode_cursor(getattr(last, field), last.pk)
@@ -0,0 +1,180 @@
+# transactions/reconciliation.py
+"""
+Ledger reconciliation.
+
+For every wallet the Transaction rows are replayed in id order and two
+invariants are checked:
+
+  * chain  - each row's balance_before equals the previous row's
+             balance_after, and balance_after = balance_before +/- amount
+  * total  - the sum of signed amounts, and the last balance_after,
+             equal Wallet.balance (plus its shards, for sharded wallets)
+
+Rows of sharded wallets carry the wallet total as read when they were
+posted, and credits to different shards commit in any order, so the
+chain check stops at the first shard row; arithmetic and total still
+apply.
+
+A wallet that verifies clean gets a ReconciliationCheckpoint pointing at
+its last row, so the next run only replays rows posted since then.
+reconcile_wallets() works on one chunk of wallet ids. Worker processes
+only read; checkpoints are written by whoever collects the results, so a
+parallel run holds no write locks while it scans.
+"""
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import Sum
+
+from .models import Wallet, Transaction, ReconciliationCheckpoint, WalletBalanceShard
+from .services import DEBIT_TYPES
+
+ROW_CHUNK_SIZE = 2000
+
+# Retries when a wallet is posted to while it is being verified
+MAX_ATTEMPTS = 3
+
+
+def reconcile_wallets(wallet_ids, full=False, save=True):
+    """
+    Verify a chunk of wallets.
+
+    Args:
+        wallet_ids: Wallet primary keys
+        full: Ignore checkpoints and replay every row
+        save: Write checkpoints for clean wallets (else return them)
+
+    Returns:
+        Dict with 'checked', 'rows', 'busy' (wallet ids skipped because
+        they kept moving), 'discrepancies' (list of dicts) and
+        'checkpoints' (unsaved (wallet_id, transaction_id, balance) tuples)
+    """
+    checkpoints = {} if full else {
+        wallet_id: (transaction_id, balance)
+        for wallet_id, transaction_id, balance in ReconciliationCheckpoint.objects.filter(
+            wallet_id__in=wallet_ids
+        ).values_list('wallet_id', 'transaction_id', 'balance')
+    }
+
+    result = {'checked': 0, 'rows': 0, 'busy': [], 'discrepancies': [], 'checkpoints': []}
+
+    for wallet_id in wallet_ids:
+        for _ in range(MAX_ATTEMPTS):
+            outcome = _verify_wallet(wallet_id, checkpoints.get(wallet_id))
+            if outcome is not None:
+                break
+        else:
+            result['busy'].append(str(wallet_id))
+            continue
+
+        if outcome == 'missing':
+            continue
+
+        account_number, last_id, last_balance, rows, problems = outcome
+        result['checked'] += 1
+        result['rows'] += rows
+        result['discrepancies'].extend(problems)
+        if not problems and last_id is not None:
+            result['checkpoints'].append((wallet_id, last_id, last_balance))
+
+    if save:
+        save_checkpoints(result.pop('checkpoints'))
+    return result
+
+
+def reconcile_chunk(wallet_ids, full=False):
+    """Process pool entry point: read-only reconcile, then drop connections"""
+    try:
+        return reconcile_wallets(wallet_ids, full, save=False)
+    finally:
+        connections.close_all()
+
+
+def save_checkpoints(checkpoints):
+    """Upsert (wallet_id, transaction_id, balance) checkpoints"""
+    if not checkpoints:
+        return
+    ReconciliationCheckpoint.objects.bulk_create(
+        [
+            ReconciliationCheckpoint(wallet_id=wallet_id, transaction_id=transaction_id, balance=balance)
+            for wallet_id, transaction_id, balance in checkpoints
+        ],
+        update_conflicts=True,
+        unique_fields=['wallet'],
+        update_fields=['transaction_id', 'balance', 'checked_at'],
+    )
+
+
+def _verify_wallet(wallet_id, checkpoint):
+    """
+    Replay one wallet's ledger.
+
+    Returns 'missing' if the wallet is gone, None if it was posted to
+    mid-check (caller retries), else (account_number, last_id,
+    last_balance, row_count, discrepancies).
+    """
+    wallet = Wallet.objects.filter(id=wallet_id).values_list(
+        'account_id', 'balance', 'version', 'shard_count'
+    ).first()
+    if wallet is None:
+        return 'missing'
+    account_number, balance, version, shard_count = wallet
+    shard_total = _shard_total(wallet_id) if shard_count else None
+
+    rows = Transaction.objects.filter(wallet_id=wallet_id)
+    if checkpoint:
+        last_id, running = checkpoint
+        rows = rows.filter(id__gt=last_id)
+    else:
+        last_id, running = None, Decimal('0.00')
+
+    problems = []
+
+    def report(kind, transaction_id, expected, actual):
+        problems.append({
+            'kind': kind,
+            'wallet_id': str(wallet_id),
+            'account_number': account_number,
+            'transaction_id': transaction_id,
+            'expected': str(expected),
+            'actual': str(actual),
+        })
+
+    count = 0
+    chained = not shard_count
+    last_after = None
+    for row_id, transaction_type, amount, before, after, shard in rows.order_by('id').values_list(
+        'id', 'transaction_type', 'amount', 'balance_before', 'balance_after', 'metadata__shard'
+    ).iterator(chunk_size=ROW_CHUNK_SIZE):
+        count += 1
+        chained = chained and shard is None
+        if chained and before != running:
+            report('opening_balance' if last_id is None else 'chain_break', row_id, running, before)
+
+        is_debit = transaction_type in DEBIT_TYPES
+        expected_after = before - amount if is_debit else before + amount
+        if after != expected_after:
+            report('arithmetic', row_id, expected_after, after)
+
+        last_id, last_after = row_id, after
+        running = running - amount if is_debit else running + amount
+
+    # A posting landed while we read; the balance and rows may disagree
+    if not Wallet.objects.filter(id=wallet_id, version=version).exists():
+        return None
+    if shard_count and _shard_total(wallet_id) != shard_total:
+        return None
+
+    total = balance + (shard_total or 0)
+    if running != total:
+        report('balance_mismatch', last_id, running, total)
+    elif chained and last_after is not None and last_after != balance:
+        report('balance_mismatch', last_id, last_after, balance)
+
+    return account_number, last_id, running, count, problems
+
+
+def _shard_total(wallet_id):
+    return WalletBalanceShard.objects.filter(
+        wallet_id=wallet_id
+    ).aggregate(total=Sum('balance'))['total'] or Decimal('0.00')
@@ -0,0 +1,132 @@
+# transactions/sequences.py
+"""
+Block-reserved sequence allocator for references and account numbers.
+
+Each named sequence is one row in the `sequences` table. A process
+reserves a block of values with a single statement
+
+    UPDATE sequences SET next_value = next_value + <block> WHERE name = ?
+    RETURNING next_value
+
+and hands them out from memory, so generating a reference costs no query
+for all but one value per block, and never needs a uniqueness retry.
+
+A reservation must commit before its values are handed to anyone else,
+otherwise a rollback would return the block to the pool while this
+process keeps using it. So:
+
+  * outside a transaction the reservation autocommits on the default
+    connection;
+  * inside a transaction it goes through a separate autocommit connection
+    (one per thread);
+  * on SQLite, where a second connection would wait on the first one's
+    write lock, a value needed inside a transaction is reserved on its
+    own in that transaction. A rollback then also undoes the rows that
+    used it.
+
+Blocks are dropped after fork, so worker processes never share one.
+Values are unique but not gap-free: a process that exits loses the rest
+of its block.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from .models import Sequence
+
+DEFAULT_BLOCK_SIZE = getattr(settings, 'SEQUENCE_BLOCK_SIZE', 100)
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+_side_connections = threading.local()
+
+
+class SequenceAllocator:
+    """Hands out values of one named sequence, a reserved block at a time"""
+
+    def __init__(self, name, block_size=DEFAULT_BLOCK_SIZE, using=DEFAULT_DB_ALIAS):
+        self.name = name
+        self.block_size = block_size
+        self.using = using
+        self._lock = threading.Lock()
+        self._pid = None
+        self._next = self._end = 0
+
+    def next(self):
+        """Return the next value of the sequence"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked (or first use): never reuse the parent's block
+                self._pid = os.getpid()
+                self._next = self._end = 0
+
+            if self._next >= self._end:
+                connection = connections[self.using]
+                if connection.in_atomic_block and connection.vendor == 'sqlite':
+                    return _reserve(connection, self.name, 1)
+                if connection.in_atomic_block:
+                    connection = _side_connection(self.using)
+
+                self._next = _reserve(connection, self.name, self.block_size)
+                self._end = self._next + self.block_size
+
+            value = self._next
+            self._next += 1
+            return value
+
+
+def next_value(name, block_size=None):
+    """Next value of the named sequence, from this process's current block"""
+    allocator = _allocators.get(name)
+    if allocator is None:
+        with _allocators_lock:
+            allocator = _allocators.setdefault(
+                name, SequenceAllocator(name, block_size or DEFAULT_BLOCK_SIZE)
+            )
+    return allocator.next()
+
+
+def to_base36(value, width=0):
+    """Compact upper-case base 36 rendering, zero-padded to width"""
+    digits = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    encoded = ''
+    while True:
+        value, remainder = divmod(value, 36)
+        encoded = digits[remainder] + encoded
+        if not value:
+            return encoded.rjust(width, '0')
+
+
+def _reserve(connection, name, count):
+    """Reserve count values; returns the first one"""
+    table = connection.ops.quote_name(Sequence._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET next_value = next_value + %s WHERE name = %s RETURNING next_value",
+            [count, name]
+        )
+        row = cursor.fetchone()
+        if row is None:
+            # First use of this sequence anywhere
+            cursor.execute(
+                f"INSERT INTO {table} (name, next_value) VALUES (%s, 1) ON CONFLICT (name) DO NOTHING",
+                [name]
+            )
+            cursor.execute(
+                f"UPDATE {table} SET next_value = next_value + %s WHERE name = %s RETURNING next_value",
+                [count, name]
+            )
+            row = cursor.fetchone()
+    return row[0] - count
+
+
+def _side_connection(alias):
+    """Per-thread autocommit connection for reservations made inside a transaction"""
+    connection = getattr(_side_connections, alias, None)
+    if connection is None:
+        connection = connections.create_connection(alias)
+        setattr(_side_connections, alias, connection)
+    connection.close_if_unusable_or_obsolete()
+    return connection
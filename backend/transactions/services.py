@@ -3,9 +3,44 @@ transactions/services.py - Wallet service for balance operations
 """
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from decimal import Decimal
+from django.db import transaction, DatabaseError, IntegrityError
+from django.db.models import F, Case, When, Value, DecimalField, Sum, Count, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from decimal import Decimal, InvalidOperation
+import random
 import time
-from .models import Wallet, Transaction
+from .models import Wallet, Transaction, WalletDailyRollup, WalletBalanceSnapshot, WalletBalanceShard
+from .pagination import keyset_paginate, DEFAULT_PAGE_SIZE
+from .balance_cache import BalanceCache
+
+# Ledger entry types that take money out of a wallet
+DEBIT_TYPES = ('debit', 'fee', 'transfer_out')
+
+# Columns returned by history endpoints; avoids building model instances
+HISTORY_FIELDS = (
+    'id', 'transaction_type', 'amount', 'reference', 'description',
+    'balance_before', 'balance_after', 'metadata', 'timestamp',
+)
+
+# Entries posted per database transaction by WalletService.post_batch
+BATCH_CHUNK_SIZE = getattr(settings, 'WALLET_BATCH_CHUNK_SIZE', 500)
+
+# Take a balance snapshot every N balance updates of a wallet (0 disables)
+SNAPSHOT_EVERY = getattr(settings, 'WALLET_SNAPSHOT_EVERY', 1000)
+
+# Sub-balance rows given to a wallet when sharding is enabled
+DEFAULT_SHARD_COUNT = getattr(settings, 'WALLET_DEFAULT_SHARD_COUNT', 8)
+
+
+def _signed_total(rows):
+    """Sum of a Transaction queryset's amounts, debits negative"""
+    total = rows.aggregate(total=Sum(Case(
+        When(transaction_type__in=DEBIT_TYPES, then=-F('amount')),
+        default=F('amount'),
+        output_field=DecimalField(max_digits=15, decimal_places=2)
+    )))['total']
+    return total or Decimal('0.00')
 
 
 class WalletServiceError(Exception):
@@ -35,55 +70,157 @@ class WalletService:
 
     @staticmethod
     def get_balance(account_number):
-        """Get current wallet balance"""
-        wallet = WalletService.get_wallet(account_number)
-        return wallet.balance
+        """Get current wallet balance (served from the balance cache)"""
+        cached = BalanceCache.get(account_number)
+        if cached is None:
+            WalletService._raise_missing_wallet(account_number)
+        return cached[0]
 
     @staticmethod
-    def credit_wallet(account_number, amount, reference="", description=""):
+    def get_transaction_history(account_number, limit=DEFAULT_PAGE_SIZE, cursor=None):
         """
-        Credit (add money to) wallet
+        Get one page of a wallet's ledger, newest first
 
         Args:
             account_number: CLV account number
-            amount: Decimal amount to add
-            reference: Payment reference
-            description: Transaction description
+            limit: Page size
+            cursor: Cursor returned with the previous page
 
         Returns:
-            New balance after credit
+            Tuple (rows, next_cursor); rows are dicts of HISTORY_FIELDS
         """
+        wallet_id = Wallet.objects.filter(
+            account_id=account_number
+        ).values_list('id', flat=True).first()
+
+        if wallet_id is None:
+            raise WalletServiceError(f"Account {account_number} has no wallet")
+
+        rows = Transaction.objects.filter(wallet_id=wallet_id).values(*HISTORY_FIELDS)
+        return keyset_paginate(rows, cursor, limit)
+
+    @staticmethod
+    def _clean_amount(amount):
+        """Coerce amount to a positive Decimal"""
         try:
             amount = Decimal(str(amount))
-            if amount <= Decimal('0.00'):
-                raise WalletServiceError("Amount must be positive")
-        except:
+        except (InvalidOperation, TypeError, ValueError):
             raise WalletServiceError("Invalid amount format")
 
-        wallet = WalletService.get_wallet(account_number)
+        if not amount.is_finite() or amount <= Decimal('0.00'):
+            raise WalletServiceError("Amount must be positive")
 
-        # Check if Transaction model exists
-        try:
-            # Create transaction record if Transaction model exists
-            Transaction.objects.create(
-                wallet=wallet,
-                transaction_type='credit',
+        return amount
+
+    @staticmethod
+    def post(account_number, amount, transaction_type, reference="", description="", metadata=None):
+        """
+        Post a single ledger entry against a wallet.
+
+        The balance is changed by one conditional UPDATE using F() arithmetic,
+        so the database serializes concurrent writers on the wallet row instead
+        of Python doing read-modify-write. The Transaction row is written in the
+        same database transaction, which keeps the ledger and the balance in step.
+        Sharded (hot) wallets are handed to WalletShardService.post.
+
+        Args:
+            account_number: CLV account number
+            amount: Positive amount; the sign comes from transaction_type
+            transaction_type: One of Transaction.TRANSACTION_TYPES
+            reference: Payment/transfer reference
+            description: Transaction description
+            metadata: Extra data stored on the ledger row
+
+        Returns:
+            New balance after the posting
+        """
+        amount = WalletService._clean_amount(amount)
+        delta = -amount if transaction_type in DEBIT_TYPES else amount
+
+        with transaction.atomic():
+            wallets = Wallet.objects.filter(account_id=account_number, shard_count=0)
+            if delta < 0:
+                # Never let the balance go negative, even under concurrent debits
+                wallets = wallets.filter(balance__gte=amount)
+
+            updated = wallets.update(
+                balance=F('balance') + delta,
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+
+            if not updated:
+                sharded = Wallet.objects.filter(
+                    account_id=account_number, shard_count__gt=0
+                ).values_list('id', 'shard_count').first()
+                if sharded:
+                    return WalletShardService.post(
+                        account_number, *sharded, amount, transaction_type, reference, description,
+                        metadata if metadata is not None else {'reference': reference}
+                    )
+                WalletService._raise_posting_failure(account_number, amount)
+
+            # The row is now locked by our UPDATE, so this read is stable
+            wallet_id, balance_after, version, currency = Wallet.objects.filter(
+                account_id=account_number
+            ).values_list('id', 'balance', 'version', 'currency').get()
+
+            entry = Transaction.objects.create(
+                wallet_id=wallet_id,
+                transaction_type=transaction_type,
                 amount=amount,
                 reference=reference,
                 description=description,
-                balance_before=wallet.balance,
-                balance_after=wallet.balance + amount,
-                metadata={'source': 'payment', 'reference': reference}
+                balance_before=balance_after - delta,
+                balance_after=balance_after,
+                metadata=metadata if metadata is not None else {'reference': reference}
             )
-        except:
-            # If Transaction model doesn't exist yet, just log
-            print(f"Credit: {amount} to {account_number}. Reference: {reference}")
+            LedgerRollupService.record_many([entry])
+            BalanceSnapshotService.record_periodic(wallet_id, version, entry, balance_after)
+            BalanceCache.store_on_commit(account_number, version, balance_after, currency)
+
+        return balance_after
+
+    @staticmethod
+    def _raise_posting_failure(account_number, amount):
+        """Work out why a conditional balance UPDATE matched no rows"""
+        balance = Wallet.objects.filter(
+            account_id=account_number
+        ).values_list('balance', flat=True).first()
+
+        if balance is not None:
+            raise InsufficientFundsError(
+                f"Insufficient funds. Available: {balance}, Requested: {amount}"
+            )
+
+        WalletService._raise_missing_wallet(account_number)
+
+    @staticmethod
+    def _raise_missing_wallet(account_number):
+        """Raise the right error for an account number without a wallet"""
+        from accounts.models import Account
+        if not Account.objects.filter(account_number=account_number).exists():
+            raise WalletServiceError(f"Account {account_number} not found")
+        raise WalletServiceError(f"Account {account_number} has no wallet")
+
+    @staticmethod
+    def credit_wallet(account_number, amount, reference="", description=""):
+        """
+        Credit (add money to) wallet
 
-        # Update balance
-        wallet.balance += amount
-        wallet.save()
+        Args:
+            account_number: CLV account number
+            amount: Decimal amount to add
+            reference: Payment reference
+            description: Transaction description
 
-        return wallet.balance
+        Returns:
+            New balance after credit
+        """
+        return WalletService.post(
+            account_number, amount, 'credit', reference, description,
+            metadata={'source': 'payment', 'reference': reference}
+        )
 
     @staticmethod
     def debit_wallet(account_number, amount, reference="", description=""):
@@ -98,44 +235,182 @@ class WalletService:
 
         Returns:
             New balance after debit
+
+        Raises:
+            InsufficientFundsError: if the wallet cannot cover the amount
         """
-        try:
-            amount = Decimal(str(amount))
-            if amount <= Decimal('0.00'):
-                raise WalletServiceError("Amount must be positive")
-        except:
-            raise WalletServiceError("Invalid amount format")
+        return WalletService.post(
+            account_number, amount, 'debit', reference, description,
+            metadata={'source': 'transfer', 'reference': reference}
+        )
 
-        wallet = WalletService.get_wallet(account_number)
+    @staticmethod
+    def post_batch(entries, transaction_type='credit', description="", chunk_size=BATCH_CHUNK_SIZE):
+        """
+        Post many ledger entries with a handful of set-based queries.
 
-        # Check sufficient funds
-        if wallet.balance < amount:
-            raise InsufficientFundsError(
-                f"Insufficient funds. Available: {wallet.balance}, Requested: {amount}"
-            )
+        Wallets are resolved in one query. Each chunk is then posted in its own
+        database transaction: the touched wallet rows are locked in id order,
+        the Transaction rows are bulk-inserted and every balance in the chunk is
+        moved by a single UPDATE ... CASE. Sharded wallets have their shards
+        swept into the locked wallet row first. A bad entry (unknown account, bad
+        amount, insufficient funds) is reported and skipped; a database error
+        fails only the chunk it happened in.
 
-        # Check if Transaction model exists
-        try:
-            # Create transaction record if Transaction model exists
-            Transaction.objects.create(
-                wallet=wallet,
-                transaction_type='debit',
-                amount=amount,
-                reference=reference,
-                description=description,
-                balance_before=wallet.balance,
-                balance_after=wallet.balance - amount,
-                metadata={'source': 'transfer', 'reference': reference}
-            )
-        except:
-            # If Transaction model doesn't exist yet, just log
-            print(f"Debit: {amount} from {account_number}. Reference: {reference}")
+        Args:
+            entries: Iterable of (account_number, amount, reference) tuples or
+                dicts with account_number/amount/reference/description keys
+            transaction_type: Type applied to every entry (credit, debit, ...)
+            description: Default description for entries without one
+            chunk_size: Entries per database transaction
 
-        # Update balance
-        wallet.balance -= amount
-        wallet.save()
+        Returns:
+            Dict with 'posted' count, per-entry 'failed' list and the new
+            'balances' keyed by account number
+        """
+        result = {'posted': 0, 'failed': [], 'balances': {}}
+        is_debit = transaction_type in DEBIT_TYPES
 
-        return wallet.balance
+        def fail(index, entry, error):
+            result['failed'].append({
+                'index': index,
+                'account_number': entry.get('account_number'),
+                'reference': entry.get('reference', ''),
+                'error': str(error),
+            })
+
+        # Normalise and validate amounts up front
+        pending = []
+        for index, raw in enumerate(entries):
+            entry = WalletService._normalise_entry(raw)
+            try:
+                entry['amount'] = WalletService._clean_amount(entry.get('amount'))
+            except WalletServiceError as e:
+                fail(index, entry, e)
+                continue
+            pending.append((index, entry))
+
+        # One query for every wallet in the batch
+        wallet_ids = dict(Wallet.objects.filter(
+            account_id__in={entry['account_number'] for _, entry in pending}
+        ).values_list('account_id', 'id'))
+
+        resolved = []
+        for index, entry in pending:
+            if entry['account_number'] not in wallet_ids:
+                fail(index, entry, f"Account {entry['account_number']} has no wallet")
+            else:
+                resolved.append((index, entry))
+
+        for start in range(0, len(resolved), chunk_size):
+            chunk = resolved[start:start + chunk_size]
+            try:
+                posted, rejected, balances = WalletService._post_chunk(
+                    chunk, wallet_ids, transaction_type, is_debit, description
+                )
+            except DatabaseError as e:
+                for index, entry in chunk:
+                    fail(index, entry, e)
+                continue
+
+            for index, entry, error in rejected:
+                fail(index, entry, error)
+            result['posted'] += posted
+            result['balances'].update(balances)
+
+        result['failed'].sort(key=lambda f: f['index'])
+        return result
+
+    @staticmethod
+    def _normalise_entry(raw):
+        """Turn a batch entry tuple/dict into a dict"""
+        if isinstance(raw, dict):
+            return dict(raw)
+        keys = ('account_number', 'amount', 'reference', 'description')
+        return dict(zip(keys, raw))
+
+    @staticmethod
+    def _post_chunk(chunk, wallet_ids, transaction_type, is_debit, description):
+        """Post one chunk of a batch inside a single database transaction"""
+        account_by_id = {wallet_id: account for account, wallet_id in wallet_ids.items()}
+
+        with transaction.atomic():
+            ids = sorted({wallet_ids[entry['account_number']] for _, entry in chunk})
+            # Lock in a stable order so overlapping batches cannot deadlock
+            balances, sharded = {}, set()
+            for wallet_id, balance, shard_count in (
+                Wallet.objects.select_for_update().filter(id__in=ids)
+                .order_by('id').values_list('id', 'balance', 'shard_count')
+            ):
+                balances[wallet_id] = balance
+                if shard_count:
+                    sharded.add(wallet_id)
+            # A sharded wallet's money may sit in its shards: fold them into the
+            # (locked) row first, so funds checks and balances see the real total
+            for wallet_id in sorted(sharded):
+                balances[wallet_id] += WalletShardService._sweep(wallet_id)
+            opening = dict(balances)
+
+            rows, rejected = [], []
+            for index, entry in chunk:
+                wallet_id = wallet_ids[entry['account_number']]
+                amount = entry['amount']
+                before = balances[wallet_id]
+
+                if is_debit and before < amount:
+                    rejected.append((index, entry, InsufficientFundsError(
+                        f"Insufficient funds. Available: {before}, Requested: {amount}"
+                    )))
+                    continue
+
+                after = before - amount if is_debit else before + amount
+                balances[wallet_id] = after
+                reference = entry.get('reference') or ''
+                rows.append(Transaction(
+                    wallet_id=wallet_id,
+                    transaction_type=transaction_type,
+                    amount=amount,
+                    reference=reference,
+                    description=entry.get('description') or description,
+                    balance_before=before,
+                    balance_after=after,
+                    metadata={'source': 'batch', 'reference': reference}
+                ))
+
+            deltas = {
+                wallet_id: balances[wallet_id] - opening[wallet_id]
+                for wallet_id in ids if balances[wallet_id] != opening[wallet_id]
+            }
+            versions = {}
+            if deltas:
+                Wallet.objects.filter(id__in=deltas).update(
+                    balance=F('balance') + Case(
+                        *[When(id=wallet_id, then=Value(delta)) for wallet_id, delta in deltas.items()],
+                        output_field=DecimalField(max_digits=15, decimal_places=2)
+                    ),
+                    version=F('version') + 1,
+                    updated_at=timezone.now()
+                )
+                for wallet_id, version, currency in Wallet.objects.filter(
+                    id__in=deltas
+                ).values_list('id', 'version', 'currency'):
+                    # Sharded wallets' totals include their shards; never cache those
+                    if wallet_id in sharded:
+                        BalanceCache.invalidate_on_commit(account_by_id[wallet_id])
+                    else:
+                        versions[wallet_id] = version
+                        BalanceCache.store_on_commit(
+                            account_by_id[wallet_id], version, balances[wallet_id], currency
+                        )
+            Transaction.objects.bulk_create(rows)
+            LedgerRollupService.record_many(rows)
+            last_rows = {row.wallet_id: row for row in rows}
+            for wallet_id, version in versions.items():
+                BalanceSnapshotService.record_periodic(
+                    wallet_id, version, last_rows[wallet_id], balances[wallet_id]
+                )
+
+        return len(rows), rejected, {account_by_id[wallet_id]: balances[wallet_id] for wallet_id in deltas}
 
     @staticmethod
     def transfer(source_account, target_account, amount, reference="", description=""):
@@ -152,14 +427,387 @@ class WalletService:
         Returns:
             Tuple (new_source_balance, new_target_balance)
         """
-        # Debit from source
-        new_source_balance = WalletService.debit_wallet(
-            source_account, amount, reference, f"Transfer to {target_account}: {description}"
+        with transaction.atomic():
+            # Debit from source
+            new_source_balance = WalletService.debit_wallet(
+                source_account, amount, reference, f"Transfer to {target_account}: {description}"
+            )
+
+            # Credit to target
+            new_target_balance = WalletService.credit_wallet(
+                target_account, amount, reference, f"Transfer from {source_account}: {description}"
+            )
+
+        return new_source_balance, new_target_balance
+
+
+class LedgerRollupService:
+    """Per-wallet, per-day, per-type totals kept in step with the ledger"""
+
+    @staticmethod
+    def record_many(entries):
+        """
+        Add posted Transaction rows to their daily rollups.
+
+        Must run inside the posting's database transaction so the rollup
+        can never disagree with the ledger.
+        """
+        buckets = {}
+        for entry in entries:
+            key = (entry.wallet_id, entry.transaction_type, timezone.localdate(entry.timestamp))
+            amount, count = buckets.get(key, (Decimal('0.00'), 0))
+            buckets[key] = (amount + entry.amount, count + 1)
+
+        for (wallet_id, transaction_type, date), (amount, count) in buckets.items():
+            LedgerRollupService._add(wallet_id, transaction_type, date, amount, count)
+
+    @staticmethod
+    def _add(wallet_id, transaction_type, date, amount, count):
+        """Increment one rollup row, creating it on first use"""
+        rollups = WalletDailyRollup.objects.filter(
+            wallet_id=wallet_id, transaction_type=transaction_type, date=date
         )
+        increment = {'amount': F('amount') + amount, 'count': F('count') + count}
+
+        if rollups.update(**increment):
+            return
+
+        try:
+            with transaction.atomic():
+                WalletDailyRollup.objects.create(
+                    wallet_id=wallet_id, transaction_type=transaction_type,
+                    date=date, amount=amount, count=count
+                )
+        except IntegrityError:
+            # Another writer created the row between our UPDATE and INSERT
+            rollups.update(**increment)
+
+    @staticmethod
+    def get_totals(wallet_id, since=None):
+        """
+        Totals per transaction type for a wallet.
+
+        Reads the rollup table only, so the cost depends on the number of
+        active days rather than the number of transactions.
+        """
+        rollups = WalletDailyRollup.objects.filter(wallet_id=wallet_id)
+        if since:
+            rollups = rollups.filter(date__gte=since)
+
+        return {
+            row['transaction_type']: row['total']
+            for row in rollups.order_by().values('transaction_type').annotate(total=Sum('amount'))
+        }
+
+    @staticmethod
+    def rebuild(wallet_id):
+        """
+        Recompute a wallet's rollups from its Transaction history.
+
+        The wallet row is locked first, so postings for this wallet wait
+        until the rebuild has committed.
+
+        Returns:
+            Number of rollup rows written
+        """
+        with transaction.atomic():
+            list(Wallet.objects.select_for_update().filter(id=wallet_id).values_list('id', flat=True))
+            WalletDailyRollup.objects.filter(wallet_id=wallet_id).delete()
+
+            totals = (
+                Transaction.objects.filter(wallet_id=wallet_id)
+                .annotate(day=TruncDate('timestamp'))
+                .order_by()
+                .values('day', 'transaction_type')
+                .annotate(total=Sum('amount'), entries=Count('id'))
+            )
+
+            rows = WalletDailyRollup.objects.bulk_create([
+                WalletDailyRollup(
+                    wallet_id=wallet_id,
+                    transaction_type=row['transaction_type'],
+                    date=row['day'],
+                    amount=row['total'],
+                    count=row['entries'],
+                )
+                for row in totals
+            ])
+
+        return len(rows)
 
-        # Credit to target
-        new_target_balance = WalletService.credit_wallet(
-            target_account, amount, reference, f"Transfer from {source_account}: {description}"
+
+class BalanceSnapshotService:
+    """
+    Periodic wallet balance snapshots.
+
+    A snapshot records a wallet's total balance as of one ledger row.
+    balance_as_of() starts from the newest snapshot at or before the
+    requested time and sums only the ledger rows posted after it, so its
+    cost is bounded by the snapshot cadence rather than the age of the
+    wallet. Balances are always derived from signed amounts, never from
+    balance_after, which for sharded wallets may miss concurrent credits
+    to other shards.
+    """
+
+    @staticmethod
+    def record_periodic(wallet_id, version, entry, balance):
+        """
+        Snapshot a just-posted row on every SNAPSHOT_EVERY-th wallet version.
+
+        balance is the wallet's balance after the posting, as the caller's
+        balance UPDATE left it (not the row's balance_after).
+        """
+        if SNAPSHOT_EVERY and version % SNAPSHOT_EVERY == 0:
+            WalletBalanceSnapshot.objects.create(
+                wallet_id=wallet_id,
+                transaction_id=entry.id,
+                balance=balance,
+                as_of=entry.timestamp,
+            )
+
+    @staticmethod
+    def snapshot_latest(wallet_ids):
+        """
+        Snapshot the latest ledger row of each wallet, skipping wallets
+        with nothing new since their last snapshot (daily cadence).
+
+        Returns:
+            Number of snapshots written
+        """
+        latest = dict(
+            Transaction.objects.filter(wallet_id__in=wallet_ids)
+            .order_by().values('wallet_id').annotate(last=Max('id'))
+            .values_list('wallet_id', 'last')
+        )
+        covered = dict(
+            WalletBalanceSnapshot.objects.filter(wallet_id__in=latest)
+            .order_by().values('wallet_id').annotate(last=Max('transaction_id'))
+            .values_list('wallet_id', 'last')
         )
+        pending = [last for wallet_id, last in latest.items() if covered.get(wallet_id) != last]
 
-        return new_source_balance, new_target_balance
+        snapshots = []
+        for wallet_id, row_id, timestamp in Transaction.objects.filter(
+            id__in=pending
+        ).values_list('wallet_id', 'id', 'timestamp'):
+            # Start from the previous snapshot and add the rows since
+            previous = WalletBalanceSnapshot.objects.filter(
+                wallet_id=wallet_id, transaction_id=covered.get(wallet_id)
+            ).values_list('balance', flat=True).first() or Decimal('0.00')
+            tail = Transaction.objects.filter(wallet_id=wallet_id, id__lte=row_id)
+            if wallet_id in covered:
+                tail = tail.filter(id__gt=covered[wallet_id])
+            snapshots.append(WalletBalanceSnapshot(
+                wallet_id=wallet_id, transaction_id=row_id,
+                balance=previous + _signed_total(tail), as_of=timestamp
+            ))
+
+        return len(WalletBalanceSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True))
+
+    @staticmethod
+    def backfill(wallet_id, every=SNAPSHOT_EVERY):
+        """
+        Snapshot a wallet's history: the last row of every day, plus every
+        Nth row when every is set.
+
+        Returns:
+            Number of snapshots written
+        """
+        rows = Transaction.objects.filter(wallet_id=wallet_id).order_by('id').values_list(
+            'id', 'transaction_type', 'amount', 'timestamp'
+        ).iterator(chunk_size=2000)
+
+        snapshots, previous, balance = [], None, Decimal('0.00')
+        for count, (row_id, transaction_type, amount, timestamp) in enumerate(rows, start=1):
+            if previous and timezone.localdate(previous[2]) != timezone.localdate(timestamp):
+                snapshots.append(previous)
+            balance = balance - amount if transaction_type in DEBIT_TYPES else balance + amount
+            previous = (row_id, balance, timestamp)
+            if every and count % every == 0:
+                snapshots.append(previous)
+        if previous:
+            snapshots.append(previous)
+
+        created = WalletBalanceSnapshot.objects.bulk_create([
+            WalletBalanceSnapshot(wallet_id=wallet_id, transaction_id=row_id, balance=balance, as_of=timestamp)
+            for row_id, balance, timestamp in dict.fromkeys(snapshots)
+        ], ignore_conflicts=True)
+        return len(created)
+
+    @staticmethod
+    def balance_as_of(account_number, at):
+        """
+        Wallet balance at a point in time.
+
+        Args:
+            account_number: CLV account number
+            at: Aware datetime; postings stamped at or before it count
+
+        Returns:
+            Tuple (balance, currency)
+        """
+        wallet = Wallet.objects.filter(account_id=account_number).values_list('id', 'currency').first()
+        if wallet is None:
+            WalletService._raise_missing_wallet(account_number)
+        wallet_id, currency = wallet
+
+        snapshot = WalletBalanceSnapshot.objects.filter(
+            wallet_id=wallet_id, as_of__lte=at
+        ).order_by('-as_of', '-transaction_id').values_list('transaction_id', 'balance').first()
+
+        tail = Transaction.objects.filter(wallet_id=wallet_id, timestamp__lte=at)
+        balance = Decimal('0.00')
+        if snapshot:
+            tail = tail.filter(id__gt=snapshot[0])
+            balance = snapshot[1]
+
+        return balance + _signed_total(tail), currency
+
+
+class WalletShardService:
+    """
+    Opt-in sharded balances for hot wallets (merchant/collection accounts).
+
+    Credits to a sharded wallet update one of its WalletBalanceShard rows
+    at random, so concurrent credits contend on N rows instead of one.
+    Debits go against the wallet row and sweep the shards into it when it
+    runs short. Locks are always taken wallet row first, then shards.
+    Ledger rows record the wallet total (row plus shards) as read right
+    after the posting; credits landing on other shards at the same moment
+    may or may not be included.
+    """
+
+    @staticmethod
+    def enable(account_number, shards=DEFAULT_SHARD_COUNT):
+        """Turn on sharding (or change the shard count) for a wallet"""
+        if shards < 1:
+            raise WalletServiceError("Shard count must be at least 1")
+
+        with transaction.atomic():
+            wallet_id = WalletShardService._lock_wallet(account_number)
+            WalletBalanceShard.objects.bulk_create(
+                [WalletBalanceShard(wallet_id=wallet_id, index=i) for i in range(shards)],
+                ignore_conflicts=True
+            )
+            # Shrinking: fold the dropped shards into the wallet row first
+            WalletShardService._sweep(wallet_id, index__gte=shards)
+            WalletBalanceShard.objects.filter(wallet_id=wallet_id, index__gte=shards).delete()
+            Wallet.objects.filter(id=wallet_id).update(shard_count=shards, version=F('version') + 1)
+            BalanceCache.invalidate_on_commit(account_number)
+
+    @staticmethod
+    def disable(account_number):
+        """Fold every shard back into the wallet row and stop sharding"""
+        with transaction.atomic():
+            wallet_id = WalletShardService._lock_wallet(account_number)
+            WalletShardService._sweep(wallet_id)
+            WalletBalanceShard.objects.filter(wallet_id=wallet_id).delete()
+            Wallet.objects.filter(id=wallet_id).update(shard_count=0, version=F('version') + 1)
+            BalanceCache.invalidate_on_commit(account_number)
+
+    @staticmethod
+    def sweep(account_number):
+        """
+        Move shard balances into the wallet row, so Wallet.balance (as shown
+        in the admin) catches up with the total.
+
+        Returns:
+            Amount moved
+        """
+        with transaction.atomic():
+            wallet_id = WalletShardService._lock_wallet(account_number)
+            return WalletShardService._sweep(wallet_id)
+
+    @staticmethod
+    def total(wallet_id):
+        """Wallet row balance plus all of its shards"""
+        balance = Wallet.objects.filter(id=wallet_id).values_list('balance', flat=True).get()
+        return balance + WalletShardService._shard_total(wallet_id)
+
+    @staticmethod
+    def post(account_number, wallet_id, shard_count, amount, transaction_type, reference, description, metadata):
+        """
+        Post a cleaned amount to a sharded wallet (called by WalletService.post,
+        inside its transaction).
+
+        Returns:
+            New total balance
+        """
+        metadata = dict(metadata)
+        if transaction_type in DEBIT_TYPES:
+            WalletShardService._debit(wallet_id, amount)
+            delta = -amount
+        else:
+            index = random.randrange(shard_count)
+            shards = WalletBalanceShard.objects.filter(wallet_id=wallet_id, index=index)
+            if shards.update(balance=F('balance') + amount):
+                metadata['shard'] = index
+            else:
+                # Sharding was switched off under us; credit the wallet row
+                Wallet.objects.filter(id=wallet_id).update(
+                    balance=F('balance') + amount, version=F('version') + 1, updated_at=timezone.now()
+                )
+            delta = amount
+
+        # The ledger shows the wallet's total, never a single shard's balance
+        after = WalletShardService.total(wallet_id)
+        before = after - delta
+
+        entry = Transaction.objects.create(
+            wallet_id=wallet_id,
+            transaction_type=transaction_type,
+            amount=amount,
+            reference=reference,
+            description=description,
+            balance_before=before,
+            balance_after=after,
+            metadata=metadata
+        )
+        LedgerRollupService.record_many([entry])
+        # Clears any entry a reader cached just before sharding was enabled
+        BalanceCache.invalidate_on_commit(account_number)
+        return after
+
+    @staticmethod
+    def _debit(wallet_id, amount):
+        """Debit the wallet row, sweeping shards in first if it is short"""
+        balance = Wallet.objects.select_for_update().filter(id=wallet_id).values_list('balance', flat=True).get()
+        if balance < amount:
+            balance += WalletShardService._sweep(wallet_id)
+        if balance < amount:
+            raise InsufficientFundsError(
+                f"Insufficient funds. Available: {balance}, Requested: {amount}"
+            )
+
+        Wallet.objects.filter(id=wallet_id).update(
+            balance=F('balance') - amount, version=F('version') + 1, updated_at=timezone.now()
+        )
+        return balance, balance - amount
+
+    @staticmethod
+    def _sweep(wallet_id, **shard_filter):
+        """Move shard balances into the (already locked) wallet row"""
+        shards = WalletBalanceShard.objects.filter(wallet_id=wallet_id, balance__gt=0, **shard_filter)
+        locked = list(shards.select_for_update().order_by('index').values_list('id', 'balance'))
+        moved = sum((balance for _, balance in locked), Decimal('0.00'))
+        if moved:
+            WalletBalanceShard.objects.filter(id__in=[pk for pk, _ in locked]).update(balance=Decimal('0.00'))
+            Wallet.objects.filter(id=wallet_id).update(
+                balance=F('balance') + moved, version=F('version') + 1, updated_at=timezone.now()
+            )
+        return moved
+
+    @staticmethod
+    def _shard_total(wallet_id):
+        return WalletBalanceShard.objects.filter(
+            wallet_id=wallet_id
+        ).aggregate(total=Sum('balance'))['total'] or Decimal('0.00')
+
+    @staticmethod
+    def _lock_wallet(account_number):
+        wallet_id = Wallet.objects.select_for_update().filter(
+            account_id=account_number
+        ).values_list('id', flat=True).first()
+        if wallet_id is None:
+            WalletService._raise_missing_wallet(account_number)
+        return wallet_id
@@ -3,10 +3,12 @@ transactions/signals.py
 Signals for auto-creating wallet when Account is created
 """
 
+from django.db.models import F
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from accounts.models import Account
 from .models import Wallet
+from .balance_cache import BalanceCache
 
 @receiver(post_save, sender=Account)
 def create_wallet_for_new_account(sender, instance, created, **kwargs):
@@ -56,3 +58,21 @@ def delete_wallet_when_account_deleted(sender, instance, **kwargs):
         pass
     except Exception as e:
         print(f'[TRANSACTIONS SIGNAL] Error deleting wallet: {e}')
+
+
+@receiver(post_save, sender=Wallet)
+def expire_cached_balance_on_wallet_save(sender, instance, created, **kwargs):
+    """
+    Keep the balance cache honest when a wallet is saved outside the
+    ledger posting path (admin edits, scripts). The saved instance may
+    carry a stale version, so bump it and drop the cached entry.
+    """
+    if created:
+        return
+    Wallet.objects.filter(pk=instance.pk).update(version=F('version') + 1)
+    BalanceCache.invalidate_on_commit(instance.account_id)
+
+
+@receiver(post_delete, sender=Wallet)
+def expire_cached_balance_on_wallet_delete(sender, instance, **kwargs):
+    BalanceCache.invalidate_on_commit(instance.account_id)
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from transactions.balance_cache import BalanceCache
+from transactions.models import Wallet
+from transactions.services import WalletService
+from utils.factories import make_account
+
+
+class BalanceCacheTests(TestCase):
+    """Test the write-through wallet balance cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.account_number = make_account().account_number
+
+    def test_postings_write_through(self):
+        self.assertEqual(WalletService.get_balance(self.account_number), Decimal('0.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.credit_wallet(self.account_number, '25.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.post_batch([(self.account_number, '5.00', 'B-1')])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(WalletService.get_balance(self.account_number), Decimal('30.00'))
+
+    def test_stale_store_is_ignored(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.credit_wallet(self.account_number, '10.00')
+        version = Wallet.objects.get(account_id=self.account_number).version
+
+        BalanceCache.store(self.account_number, version - 1, Decimal('0.00'))
+        self.assertEqual(BalanceCache.get(self.account_number)[0], Decimal('10.00'))
+
+    def test_wallet_save_expires_entry(self):
+        BalanceCache.get(self.account_number)
+        wallet = Wallet.objects.get(account_id=self.account_number)
+        wallet.balance = Decimal('7.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            wallet.save()
+
+        self.assertEqual(WalletService.get_balance(self.account_number), Decimal('7.00'))
+
+    def test_hit_rate(self):
+        BalanceCache.reset_stats()
+        for _ in range(4):
+            BalanceCache.get(self.account_number)
+
+        self.assertEqual(BalanceCache.stats(), {'hits': 3, 'misses': 1, 'hit_rate': 0.75})
+
+    def test_stats_endpoint_resets_only_on_delete(self):
+        staff = make_account('cache-staff@claverica.com', '+254700000003')
+        staff.is_staff = True
+        staff.save()
+        client = APIClient()
+        client.force_authenticate(staff)
+        BalanceCache.reset_stats()
+        BalanceCache.get(self.account_number)
+
+        response = client.get('/api/transactions/balance-cache/stats/', {'reset': '1'})
+        self.assertEqual(response.data['misses'], 1)
+        self.assertEqual(BalanceCache.stats()['misses'], 1)
+
+        response = client.delete('/api/transactions/balance-cache/stats/')
+        self.assertEqual(response.data, {'hits': 0, 'misses': 0, 'hit_rate': None})
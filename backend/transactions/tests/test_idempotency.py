@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from transactions.models import Transaction, IdempotencyKey
+from transactions.services import WalletService
+from utils.factories import make_account
+
+
+class IdempotencyKeyTests(TestCase):
+    """Test Idempotency-Key handling on the credit/debit endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        self.client = APIClient()
+        self.client.force_authenticate(self.account)
+        self.payload = {'account_number': self.account.account_number, 'amount': '25.00', 'reference': 'RETRY-1'}
+
+    def credit(self, key, payload=None):
+        return self.client.post(
+            '/api/transactions/credit/', payload or self.payload, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_stored_response(self):
+        first = self.credit('key-1')
+        cache.clear()  # force the database path on the first retry
+        second = self.credit('key-1')
+        third = self.credit('key-1')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(third.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Transaction.objects.filter(reference='RETRY-1').count(), 1)
+        self.assertEqual(WalletService.get_balance(self.account.account_number), Decimal('25.00'))
+
+    def test_key_reused_with_different_body(self):
+        self.credit('key-2')
+        response = self.credit('key-2', dict(self.payload, amount='30.00'))
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.client.post('/api/transactions/credit/', self.payload, format='json')
+        self.client.post('/api/transactions/credit/', self.payload, format='json')
+
+        self.assertEqual(Transaction.objects.filter(reference='RETRY-1').count(), 2)
@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from transactions.models import Wallet, Transaction, ReconciliationCheckpoint
+from transactions.reconciliation import reconcile_wallets
+from transactions.services import WalletService
+from utils.factories import make_account
+
+
+class LedgerReconciliationTests(TestCase):
+    """Test chain and total verification of the ledger"""
+
+    def setUp(self):
+        cache.clear()
+        self.account_number = make_account().account_number
+        self.wallet_id = Wallet.objects.get(account_id=self.account_number).id
+        WalletService.credit_wallet(self.account_number, '100.00')
+        WalletService.debit_wallet(self.account_number, '40.00')
+
+    def test_clean_ledger_sets_checkpoint_and_runs_incrementally(self):
+        result = reconcile_wallets([self.wallet_id])
+        self.assertEqual((result['checked'], result['rows'], result['discrepancies']), (1, 2, []))
+
+        checkpoint = ReconciliationCheckpoint.objects.get(wallet_id=self.wallet_id)
+        self.assertEqual(checkpoint.balance, Decimal('60.00'))
+
+        WalletService.credit_wallet(self.account_number, '5.00')
+        result = reconcile_wallets([self.wallet_id])
+        self.assertEqual((result['rows'], result['discrepancies']), (1, []))
+        self.assertEqual(reconcile_wallets([self.wallet_id], full=True)['rows'], 3)
+
+    def test_detects_chain_break_and_balance_mismatch(self):
+        last = Transaction.objects.filter(wallet_id=self.wallet_id).latest('id')
+        Transaction.objects.filter(id=last.id).update(balance_before=Decimal('90.00'), balance_after=Decimal('50.00'))
+
+        kinds = {p['kind'] for p in reconcile_wallets([self.wallet_id])['discrepancies']}
+        self.assertEqual(kinds, {'chain_break', 'balance_mismatch'})
+        self.assertFalse(ReconciliationCheckpoint.objects.exists())
+
+    def test_detects_bad_arithmetic(self):
+        Transaction.objects.filter(wallet_id=self.wallet_id, transaction_type='debit').update(amount=Decimal('30.00'))
+
+        problems = reconcile_wallets([self.wallet_id])['discrepancies']
+        self.assertEqual([p['kind'] for p in problems], ['arithmetic', 'balance_mismatch'])
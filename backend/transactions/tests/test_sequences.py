@@ -0,0 +1,104 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from transactions.models import Sequence
+from transactions.sequences import SequenceAllocator, next_value, to_base36
+
+
+CHILD_SCRIPT = """
+import json
+import django
+django.setup()
+
+from django.db import transaction
+from transactions.sequences import SequenceAllocator
+
+allocator = SequenceAllocator('shared', block_size=7)
+values = [allocator.next() for _ in range(20)]
+with transaction.atomic():
+    values += [allocator.next() for _ in range(20)]
+print(json.dumps(values))
+"""
+
+
+class SequenceAllocatorTests(TransactionTestCase):
+    """Test block-reserved sequence allocation (outside a test transaction, as in production)"""
+
+    def test_values_are_consecutive_within_a_block(self):
+        allocator = SequenceAllocator('test-block', block_size=5)
+
+        self.assertEqual([allocator.next() for _ in range(7)], [1, 2, 3, 4, 5, 6, 7])
+        # Two blocks reserved, so the row is already past the second one
+        self.assertEqual(Sequence.objects.get(name='test-block').next_value, 11)
+
+    def test_allocators_in_one_process_never_overlap(self):
+        first = SequenceAllocator('test-overlap', block_size=3)
+        second = SequenceAllocator('test-overlap', block_size=3)
+
+        values = [allocator.next() for _ in range(5) for allocator in (first, second)]
+
+        self.assertEqual(len(values), len(set(values)))
+
+    def test_block_is_dropped_after_fork(self):
+        allocator = SequenceAllocator('test-fork', block_size=10)
+        self.assertEqual(allocator.next(), 1)
+
+        with mock.patch('transactions.sequences.os.getpid', return_value=-1):
+            self.assertEqual(allocator.next(), 11)
+
+    def test_inside_transaction(self):
+        with transaction.atomic():
+            value = next_value('test-atomic')
+
+        self.assertNotEqual(value, next_value('test-atomic'))
+
+    def test_to_base36(self):
+        self.assertEqual(to_base36(0), '0')
+        self.assertEqual(to_base36(35), 'Z')
+        self.assertEqual(to_base36(36 * 36, 8), '00000100')
+
+    def test_references_use_sequences(self):
+        from compliance.models import generate_transfer_request_reference
+        from payments.models import generate_payment_reference
+        from transfers.services import generate_transfer_reference
+
+        self.assertRegex(generate_payment_reference(), r'^PAY-\d{8}-\d{6}$')
+        self.assertRegex(generate_transfer_reference(), r'^TF-[0-9A-Z]{8}$')
+        self.assertRegex(generate_transfer_request_reference(), r'^TR-[0-9A-Z]{8}$')
+        self.assertNotEqual(generate_transfer_reference(), generate_transfer_reference())
+
+
+class SequenceAcrossProcessesTests(TestCase):
+    """Processes sharing one database never hand out the same value"""
+
+    def test_unique_across_processes(self):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with sqlite3.connect(path) as db:
+            db.execute(
+                f'CREATE TABLE "{Sequence._meta.db_table}" '
+                '("name" varchar(50) NOT NULL PRIMARY KEY, "next_value" bigint NOT NULL)'
+            )
+
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}', PYTHONPATH=os.pathsep.join(sys.path))
+        children = [
+            subprocess.Popen([sys.executable, '-c', CHILD_SCRIPT], env=env, stdout=subprocess.PIPE, text=True)
+            for _ in range(4)
+        ]
+
+        values = []
+        for child in children:
+            output, _ = child.communicate(timeout=120)
+            self.assertEqual(child.returncode, 0)
+            values += json.loads(output.strip().splitlines()[-1])
+        self.assertEqual(len(values), 160)
+        self.assertEqual(len(set(values)), 160)
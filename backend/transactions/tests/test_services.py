@@ -0,0 +1,155 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from transactions.models import Wallet, Transaction, WalletDailyRollup
+from transactions.pagination import InvalidCursor
+from transactions.services import (
+    WalletService, WalletServiceError, InsufficientFundsError, LedgerRollupService
+)
+from utils.factories import make_account
+
+
+class WalletPostingTests(TestCase):
+    """Test the ledger posting engine behind credit/debit"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        self.account_number = self.account.account_number
+
+    def test_credit_and_debit_update_balance_and_ledger(self):
+        WalletService.credit_wallet(self.account_number, '100.00', 'REF-1')
+        balance = WalletService.debit_wallet(self.account_number, Decimal('30.50'), 'REF-2')
+
+        self.assertEqual(balance, Decimal('69.50'))
+        self.assertEqual(Wallet.objects.get(account=self.account).balance, Decimal('69.50'))
+
+        credit, debit = Transaction.objects.filter(wallet__account=self.account).order_by('id')
+        self.assertEqual((credit.balance_before, credit.balance_after), (Decimal('0.00'), Decimal('100.00')))
+        self.assertEqual((debit.balance_before, debit.balance_after), (Decimal('100.00'), Decimal('69.50')))
+
+    def test_insufficient_funds_leaves_no_trace(self):
+        WalletService.credit_wallet(self.account_number, '10.00')
+
+        with self.assertRaises(InsufficientFundsError):
+            WalletService.debit_wallet(self.account_number, '10.01')
+
+        self.assertEqual(WalletService.get_balance(self.account_number), Decimal('10.00'))
+        self.assertEqual(Transaction.objects.filter(wallet__account=self.account).count(), 1)
+
+    def test_invalid_amounts_rejected(self):
+        for amount in ('0', '-5', 'abc', None):
+            with self.assertRaises(WalletServiceError):
+                WalletService.credit_wallet(self.account_number, amount)
+
+    def test_unknown_account(self):
+        with self.assertRaisesMessage(WalletServiceError, 'not found'):
+            WalletService.credit_wallet('CLV-NOPE', '1.00')
+
+    def test_transfer_rolls_back_debit_when_credit_fails(self):
+        WalletService.credit_wallet(self.account_number, '50.00')
+
+        with self.assertRaises(WalletServiceError):
+            WalletService.transfer(self.account_number, 'CLV-NOPE', '20.00')
+
+        self.assertEqual(WalletService.get_balance(self.account_number), Decimal('50.00'))
+
+
+class WalletBatchPostingTests(TestCase):
+    """Test WalletService.post_batch"""
+
+    def setUp(self):
+        cache.clear()
+        self.first = make_account().account_number
+        self.second = make_account('batch@claverica.com', '+254700000002').account_number
+
+    def test_batch_credits_and_per_entry_failures(self):
+        result = WalletService.post_batch([
+            (self.first, '10.00', 'PAY-1'),
+            (self.second, '5.00', 'PAY-2'),
+            (self.first, '2.50', 'PAY-3'),
+            ('CLV-NOPE', '1.00', 'PAY-4'),
+            (self.second, '-1', 'PAY-5'),
+        ], chunk_size=2)
+
+        self.assertEqual(result['posted'], 3)
+        self.assertEqual([f['index'] for f in result['failed']], [3, 4])
+        self.assertEqual(WalletService.get_balance(self.first), Decimal('12.50'))
+        self.assertEqual(result['balances'][self.first], Decimal('12.50'))
+
+        chain = list(Transaction.objects.filter(
+            wallet__account_id=self.first
+        ).order_by('id').values_list('balance_before', 'balance_after'))
+        self.assertEqual(chain, [(Decimal('0.00'), Decimal('10.00')), (Decimal('10.00'), Decimal('12.50'))])
+
+    def test_batch_debit_rejects_overdraft_only(self):
+        WalletService.credit_wallet(self.first, '10.00')
+
+        result = WalletService.post_batch([
+            {'account_number': self.first, 'amount': '6.00', 'reference': 'D-1'},
+            {'account_number': self.first, 'amount': '6.00', 'reference': 'D-2'},
+        ], transaction_type='debit')
+
+        self.assertEqual(result['posted'], 1)
+        self.assertEqual(result['failed'][0]['reference'], 'D-2')
+        self.assertEqual(WalletService.get_balance(self.first), Decimal('4.00'))
+
+
+class LedgerRollupTests(TestCase):
+    """Test the daily income/expense rollups"""
+
+    def setUp(self):
+        cache.clear()
+        self.account_number = make_account().account_number
+        self.wallet_id = Wallet.objects.get(account_id=self.account_number).id
+
+    def test_postings_maintain_rollups(self):
+        WalletService.credit_wallet(self.account_number, '100.00')
+        WalletService.credit_wallet(self.account_number, '20.00')
+        WalletService.debit_wallet(self.account_number, '15.00')
+        WalletService.post_batch([(self.account_number, '5.00', 'B-1'), (self.account_number, '5.00', 'B-2')])
+
+        totals = LedgerRollupService.get_totals(self.wallet_id)
+        self.assertEqual(totals, {'credit': Decimal('130.00'), 'debit': Decimal('15.00')})
+        self.assertEqual(WalletDailyRollup.objects.get(
+            wallet_id=self.wallet_id, transaction_type='credit'
+        ).count, 4)
+
+    def test_rebuild_matches_incremental_totals(self):
+        WalletService.credit_wallet(self.account_number, '40.00')
+        WalletService.debit_wallet(self.account_number, '10.00')
+        before = LedgerRollupService.get_totals(self.wallet_id)
+
+        WalletDailyRollup.objects.all().delete()
+        self.assertEqual(LedgerRollupService.rebuild(self.wallet_id), 2)
+        self.assertEqual(LedgerRollupService.get_totals(self.wallet_id), before)
+
+
+class TransactionHistoryPaginationTests(TestCase):
+    """Test keyset pagination of WalletService.get_transaction_history"""
+
+    def setUp(self):
+        cache.clear()
+        self.account_number = make_account().account_number
+        for i in range(7):
+            WalletService.credit_wallet(self.account_number, '1.00', f'REF-{i}')
+
+    def test_pages_cover_history_once_even_with_equal_timestamps(self):
+        # Ties on timestamp must be broken by id, not dropped or repeated
+        Transaction.objects.update(timestamp=timezone.now())
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = WalletService.get_transaction_history(self.account_number, 3, cursor)
+            seen.extend(row['reference'] for row in rows)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, [f'REF-{i}' for i in reversed(range(7))])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            WalletService.get_transaction_history(self.account_number, 3, 'not-a-cursor')
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from transactions.models import Transaction, Wallet, WalletBalanceShard
+from transactions.reconciliation import reconcile_wallets
+from transactions.services import (
+    WalletService, WalletShardService, InsufficientFundsError, BalanceSnapshotService
+)
+from utils.factories import make_account
+
+
+class WalletShardTests(TestCase):
+    """Test sharded sub-balances for hot wallets"""
+
+    def setUp(self):
+        cache.clear()
+        self.account_number = make_account().account_number
+        self.wallet_id = Wallet.objects.get(account_id=self.account_number).id
+        WalletService.credit_wallet(self.account_number, '10.00')
+        WalletShardService.enable(self.account_number, 4)
+
+    def test_credits_land_on_shards(self):
+        for _ in range(8):
+            balance = WalletService.credit_wallet(self.account_number, '5.00')
+
+        self.assertEqual(balance, Decimal('50.00'))
+        self.assertEqual(Wallet.objects.get(id=self.wallet_id).balance, Decimal('10.00'))
+        self.assertEqual(WalletService.get_balance(self.account_number), Decimal('50.00'))
+        self.assertEqual(WalletBalanceShard.objects.filter(wallet_id=self.wallet_id).count(), 4)
+
+    def test_ledger_rows_show_the_wallet_total(self):
+        WalletService.credit_wallet(self.account_number, '5.00', reference='SHARD-1')
+        WalletService.credit_wallet(self.account_number, '7.00', reference='SHARD-2')
+        WalletService.debit_wallet(self.account_number, '2.00', reference='SHARD-3')
+
+        rows = Transaction.objects.filter(reference__startswith='SHARD-').order_by('id')
+        self.assertEqual(
+            [(row.balance_before, row.balance_after) for row in rows],
+            [(Decimal('10.00'), Decimal('15.00')), (Decimal('15.00'), Decimal('22.00')),
+             (Decimal('22.00'), Decimal('20.00'))]
+        )
+
+    def test_debit_sweeps_shards_when_wallet_row_is_short(self):
+        WalletService.credit_wallet(self.account_number, '30.00')
+
+        self.assertEqual(WalletService.debit_wallet(self.account_number, '35.00'), Decimal('5.00'))
+        with self.assertRaises(InsufficientFundsError):
+            WalletService.debit_wallet(self.account_number, '5.01')
+
+    def test_disable_folds_shards_back(self):
+        WalletService.credit_wallet(self.account_number, '7.50')
+        WalletShardService.disable(self.account_number)
+
+        wallet = Wallet.objects.get(id=self.wallet_id)
+        self.assertEqual((wallet.balance, wallet.shard_count), (Decimal('17.50'), 0))
+        self.assertFalse(WalletBalanceShard.objects.exists())
+
+    def test_ledger_tools_see_the_total(self):
+        WalletService.credit_wallet(self.account_number, '2.00')
+        WalletService.credit_wallet(self.account_number, '3.00')
+        WalletService.debit_wallet(self.account_number, '1.00')
+
+        self.assertEqual(reconcile_wallets([self.wallet_id])['discrepancies'], [])
+        BalanceSnapshotService.snapshot_latest([self.wallet_id])
+        as_of = timezone.now() + timedelta(minutes=1)
+        self.assertEqual(BalanceSnapshotService.balance_as_of(self.account_number, as_of)[0], Decimal('14.00'))
+
+    def test_post_batch_debits_against_the_total(self):
+        WalletService.credit_wallet(self.account_number, '30.00')
+
+        result = WalletService.post_batch([
+            (self.account_number, '25.00', 'BATCH-1'),
+            (self.account_number, '10.00', 'BATCH-2'),
+            (self.account_number, '5.01', 'BATCH-3'),
+        ], transaction_type='debit')
+
+        self.assertEqual(result['posted'], 2)
+        self.assertEqual([f['reference'] for f in result['failed']], ['BATCH-3'])
+        self.assertEqual(result['balances'], {self.account_number: Decimal('5.00')})
+        first = Transaction.objects.get(reference='BATCH-1')
+        self.assertEqual((first.balance_before, first.balance_after), (Decimal('40.00'), Decimal('15.00')))
+        self.assertEqual(WalletService.get_balance(self.account_number), Decimal('5.00'))
+        self.assertEqual(reconcile_wallets([self.wallet_id])['discrepancies'], [])
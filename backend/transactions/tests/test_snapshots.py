@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from transactions.models import Wallet, Transaction, WalletBalanceSnapshot
+from transactions.services import WalletService, BalanceSnapshotService
+from utils.factories import make_account
+
+
+class BalanceSnapshotTests(TestCase):
+    """Test balance snapshots and balance-as-of queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        self.account_number = self.account.account_number
+        self.wallet_id = Wallet.objects.get(account_id=self.account_number).id
+
+        # One posting per day: +100, -30, +5
+        self.day = timezone.make_aware(datetime(2026, 3, 29, 12, 0))
+        WalletService.credit_wallet(self.account_number, '100.00')
+        WalletService.debit_wallet(self.account_number, '30.00')
+        WalletService.credit_wallet(self.account_number, '5.00')
+        for offset, row_id in enumerate(Transaction.objects.order_by('id').values_list('id', flat=True)):
+            Transaction.objects.filter(id=row_id).update(timestamp=self.day + timedelta(days=offset))
+
+    def as_of(self, days):
+        return BalanceSnapshotService.balance_as_of(self.account_number, self.day + timedelta(days=days))[0]
+
+    def test_balance_as_of_with_and_without_snapshots(self):
+        expected = [Decimal('0.00'), Decimal('100.00'), Decimal('70.00'), Decimal('75.00')]
+        without = [self.as_of(days) for days in (-1, 0, 1, 2)]
+
+        self.assertEqual(BalanceSnapshotService.backfill(self.wallet_id), 3)
+        with_snapshots = [self.as_of(days) for days in (-1, 0, 1, 2)]
+
+        self.assertEqual(without, expected)
+        self.assertEqual(with_snapshots, expected)
+
+    def test_tail_after_snapshot_is_replayed(self):
+        BalanceSnapshotService.snapshot_latest([self.wallet_id])
+        WalletService.debit_wallet(self.account_number, '15.00')
+
+        self.assertEqual(self.as_of(3650), Decimal('60.00'))
+        self.assertEqual(BalanceSnapshotService.snapshot_latest([self.wallet_id]), 1)
+        self.assertEqual(BalanceSnapshotService.snapshot_latest([self.wallet_id]), 0)
+
+    def test_periodic_snapshots_follow_cadence(self):
+        with mock.patch('transactions.services.SNAPSHOT_EVERY', 2):
+            for _ in range(4):
+                WalletService.credit_wallet(self.account_number, '1.00')
+
+        # Versions 4 and 6 were hit by the four new postings
+        self.assertEqual(
+            list(WalletBalanceSnapshot.objects.order_by('transaction_id').values_list('balance', flat=True)),
+            [Decimal('76.00'), Decimal('78.00')]
+        )
+
+    def test_batch_snapshot_holds_the_wallet_balance(self):
+        with mock.patch('transactions.services.SNAPSHOT_EVERY', 1):
+            WalletService.post_batch([(self.account_number, '2.00', 'SNAP-1'), (self.account_number, '3.00', 'SNAP-2')])
+
+        snapshot = WalletBalanceSnapshot.objects.get()
+        self.assertEqual(snapshot.transaction_id, Transaction.objects.get(reference='SNAP-2').id)
+        self.assertEqual(snapshot.balance, Wallet.objects.get(id=self.wallet_id).balance)
+
+    def test_balance_as_of_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.account)
+
+        response = client.get('/api/transactions/wallet/balance/as-of/', {'at': '2026-03-30'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['balance'], 70.0)
+
+        response = client.get('/api/transactions/wallet/balance/as-of/', {'at': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
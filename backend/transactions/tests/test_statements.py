@@ -0,0 +1,52 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from transactions.services import WalletService
+from utils.factories import make_account
+
+
+class StatementExportTests(TestCase):
+    """Test the streaming statement endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        WalletService.credit_wallet(self.account.account_number, '25.00', 'PAY-1', 'Salary')
+        WalletService.debit_wallet(self.account.account_number, '5.00', 'TF-1', 'Rent, March')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.account)
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv_statement(self):
+        response = self.client.get('/api/transactions/statement/')
+
+        self.assertEqual(response.status_code, 200)
+        lines = self.read(response).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'timestamp', 'transaction_type'])
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"Rent, March"', lines[2])
+
+    def test_gzipped_ndjson_statement(self):
+        response = self.client.get('/api/transactions/statement/', {'file_format': 'ndjson', 'gzip': '1'})
+
+        rows = [json.loads(line) for line in gzip.decompress(self.read(response)).splitlines()]
+        self.assertEqual([row['reference'] for row in rows], ['PAY-1', 'TF-1'])
+        self.assertEqual(rows[1]['balance_after'], '20.00')
+        self.assertIn('.ndjson.gz', response['Content-Disposition'])
+
+    def test_date_range_and_permissions(self):
+        response = self.client.get('/api/transactions/statement/', {'date_from': '2000-01-01', 'date_to': '2000-01-31'})
+        self.assertEqual(len(self.read(response).splitlines()), 1)
+
+        response = self.client.get('/api/transactions/statement/', {'date_from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/api/transactions/statement/', {'account_number': 'CLV-OTHER'})
+        self.assertEqual(response.status_code, 403)
@@ -4,8 +4,11 @@ from . import views
 urlpatterns = [
     # Existing endpoints for frontend
     path('wallet/balance/', views.get_wallet_balance_for_current_user, name='wallet_balance'),
+    path('wallet/balance/as-of/', views.get_balance_as_of, name='wallet_balance_as_of'),
     path('recent/', views.get_recent_transactions, name='recent_transactions'),
     path('dashboard/stats/', views.dashboard_stats, name='dashboard_stats'),
+    path('statement/', views.download_statement, name='download_statement'),
+    path('balance-cache/stats/', views.balance_cache_stats, name='balance_cache_stats'),
     
     # ADDED: Critical endpoints for Payments/Transfers apps
     path('credit/', views.credit_wallet, name='credit-wallet'),
@@ -1,15 +1,23 @@
 from django.shortcuts import render
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.core.paginator import Paginator
 from django.db.models import Sum, Q, Count
 from datetime import datetime, timedelta
 from decimal import Decimal
 from transactions.models import Wallet, Transaction
-from transactions.services import WalletService, InsufficientFundsError
+from transactions.services import (
+    WalletService, WalletServiceError, InsufficientFundsError, LedgerRollupService, BalanceSnapshotService
+)
+from transactions.balance_cache import BalanceCache
+from transactions.idempotency import idempotent
+from transactions.pagination import keyset_paginate, clamp_page_size, InvalidCursor
+from transactions.statements import (
+    STATEMENT_FORMATS, parse_statement_range, parse_as_of, render_statement, statement_filename
+)
 from utils.pusher import trigger_notification  #  ADDED
 
 def index(request):
@@ -48,6 +56,7 @@ def get_wallet_balance(request, account_number):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])  # ADDED: Security
+@idempotent
 def credit_wallet(request):
     """
     Credit wallet (add money) - used by Payments app
@@ -101,6 +110,7 @@ def credit_wallet(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])  # ADDED: Security
+@idempotent
 def debit_wallet(request):
     """
     Debit wallet (remove money) - used by Transfers app
@@ -171,30 +181,44 @@ def get_transaction_history(request, account_number):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        limit = int(request.GET.get('limit', 50))
-        transactions = WalletService.get_transaction_history(account_number, limit)
+        limit = clamp_page_size(request.GET.get('limit'), default=50)
+        transactions, next_cursor = WalletService.get_transaction_history(
+            account_number, limit, request.GET.get('cursor')
+        )
 
         # Convert to serializable format
         transaction_list = []
         for tx in transactions:
             transaction_list.append({
-                'id': str(tx.id),
-                'transaction_type': tx.transaction_type,
-                'amount': str(tx.amount),
-                'reference': tx.reference,
-                'description': tx.description,
-                'balance_before': str(tx.balance_before),
-                'balance_after': str(tx.balance_after),
-                'timestamp': tx.timestamp.isoformat(),
-                'metadata': tx.metadata
+                'id': str(tx['id']),
+                'transaction_type': tx['transaction_type'],
+                'amount': str(tx['amount']),
+                'reference': tx['reference'],
+                'description': tx['description'],
+                'balance_before': str(tx['balance_before']),
+                'balance_after': str(tx['balance_after']),
+                'timestamp': tx['timestamp'].isoformat(),
+                'metadata': tx['metadata']
             })
 
         return Response({
             'account_number': account_number,
             'transactions': transaction_list,
-            'count': len(transaction_list)
+            'count': len(transaction_list),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         })
 
+    except InvalidCursor as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except WalletServiceError:
+        return Response(
+            {'error': f'Wallet not found for account {account_number}'},
+            status=status.HTTP_404_NOT_FOUND
+        )
     except Wallet.DoesNotExist:
         return Response(
             {'error': f'Wallet not found for account {account_number}'},
@@ -225,19 +249,20 @@ def get_wallet_balance_for_current_user(request):
     """Get wallet balance for the current user (authenticated)"""
     try:
         user = request.user
-        wallet = Wallet.objects.get(account=user)
+        cached = BalanceCache.get(user.account_number)
+        if cached is None:
+            return Response({
+                "balance": 0,
+                "currency": "USD",
+                "account_number": user.account_number,
+                "message": "No wallet found"
+            })
+        balance, currency = cached
         return Response({
-            "balance": float(wallet.balance),
-            "currency": wallet.currency,
+            "balance": float(balance),
+            "currency": currency,
             "account_number": user.account_number
         })
-    except Wallet.DoesNotExist:
-        return Response({
-            "balance": 0,
-            "currency": "USD",
-            "account_number": user.account_number,
-            "message": "No wallet found"
-        })
     except Exception as e:
         return Response({
             "error": str(e)
@@ -249,32 +274,45 @@ def get_recent_transactions(request):
     """Get recent transactions for the current user"""
     try:
         user = request.user
-        wallet = Wallet.objects.get(account=user)
-        limit = int(request.GET.get("limit", 10))
-
-        transactions = Transaction.objects.filter(
-            wallet=wallet
-        ).order_by("-timestamp")[:limit]
+        wallet_id, currency = Wallet.objects.filter(
+            account=user
+        ).values_list("id", "currency").get()
+        limit = clamp_page_size(request.GET.get("limit"), default=10)
+
+        transactions, next_cursor = keyset_paginate(
+            Transaction.objects.filter(wallet_id=wallet_id).values(
+                "id", "transaction_type", "amount", "timestamp", "description", "reference"
+            ),
+            request.GET.get("cursor"),
+            limit
+        )
 
         transaction_list = []
         for tx in transactions:
             transaction_list.append({
-                "id": tx.id,
-                "transaction_type": tx.transaction_type,
-                "amount": float(tx.amount),
-                "currency": wallet.currency,
-                "created_at": tx.timestamp.isoformat(),
-                "description": tx.description,
+                "id": tx["id"],
+                "transaction_type": tx["transaction_type"],
+                "amount": float(tx["amount"]),
+                "currency": currency,
+                "created_at": tx["timestamp"].isoformat(),
+                "description": tx["description"],
                 "status": "completed",
-                "reference": tx.reference or f"TX-{tx.id}",
+                "reference": tx["reference"] or f"TX-{tx['id']}",
             })
 
         return Response({
             "account_number": user.account_number,
             "transactions": transaction_list,
             "count": len(transaction_list),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
         })
 
+    except InvalidCursor as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Wallet.DoesNotExist:
         return Response({
             "account_number": user.account_number,
@@ -288,6 +326,96 @@ def get_recent_transactions(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_statement(request):
+    """
+    Stream an account statement as CSV or NDJSON
+
+    Query params: date_from, date_to (YYYY-MM-DD, inclusive),
+    file_format (csv|ndjson), gzip (1 to compress), account_number (staff only)
+    """
+    user = request.user
+    account_number = request.GET.get("account_number") or user.account_number
+
+    if account_number != user.account_number and not user.is_staff:
+        return Response(
+            {"error": "Unauthorized access"},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    # "format" is reserved by DRF for renderer negotiation
+    fmt = request.GET.get("file_format", "csv")
+    if fmt not in STATEMENT_FORMATS:
+        return Response(
+            {"error": f"file_format must be one of {', '.join(STATEMENT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        start, end = parse_statement_range(request.GET.get("date_from"), request.GET.get("date_to"))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    wallet_id = Wallet.objects.filter(account_id=account_number).values_list("id", flat=True).first()
+    if wallet_id is None:
+        return Response(
+            {"error": f"Wallet not found for account {account_number}"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    compress = request.GET.get("gzip") in ("1", "true")
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+
+    response = StreamingHttpResponse(
+        render_statement(wallet_id, fmt, start, end, compress),
+        content_type="application/gzip" if compress else content_type
+    )
+    filename = statement_filename(account_number, fmt, start, end, compress)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_balance_as_of(request):
+    """
+    Wallet balance at a point in time
+
+    Query params: at (YYYY-MM-DD for end of day, or ISO datetime),
+    account_number (staff only)
+    """
+    user = request.user
+    account_number = request.GET.get("account_number") or user.account_number
+
+    if account_number != user.account_number and not user.is_staff:
+        return Response(
+            {"error": "Unauthorized access"},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    at = request.GET.get("at")
+    if not at:
+        return Response({"error": "at is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        moment = parse_as_of(at)
+    except ValueError:
+        return Response(
+            {"error": "at must be YYYY-MM-DD or an ISO 8601 datetime"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        balance, currency = BalanceSnapshotService.balance_as_of(account_number, moment)
+    except WalletServiceError as e:
+        return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        "account_number": account_number,
+        "as_of": moment.isoformat(),
+        "balance": float(balance),
+        "currency": currency
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
@@ -296,17 +424,10 @@ def dashboard_stats(request):
         user = request.user
         wallet = Wallet.objects.get(account=user)
 
-        # Get ALL transactions (not sliced)
-        all_txs = Transaction.objects.filter(wallet=wallet)
-
-        # FIXED: Now matches new transaction types ('credit', 'debit')
-        income = all_txs.filter(
-            transaction_type="credit"
-        ).aggregate(total=Sum("amount"))["total"] or Decimal("0")
-
-        expenses = all_txs.filter(
-            transaction_type="debit"
-        ).aggregate(total=Sum("amount"))["total"] or Decimal("0")
+        # Read the maintained rollups instead of summing every transaction
+        totals = LedgerRollupService.get_totals(wallet.id)
+        income = totals.get("credit") or Decimal("0")
+        expenses = totals.get("debit") or Decimal("0")
 
         return Response({
             "total_balance": float(wallet.balance),
@@ -328,3 +449,12 @@ def dashboard_stats(request):
             {"error": str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def balance_cache_stats(request):
+    """Hit/miss counters for the wallet balance cache (staff only); DELETE resets them"""
+    if request.method == 'DELETE':
+        BalanceCache.reset_stats()
+    return Response(BalanceCache.stats())
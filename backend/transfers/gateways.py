@@ -0,0 +1,140 @@
+"""
+Settlement Gateways - where the settlement worker sends transfers to be paid out
+
+A gateway takes one Transfer (with its account already loaded) and either
+returns the external reference the bank/processor assigned, or raises
+SettlementError. settle() runs on worker threads, so it must not touch the
+database; transfer.reference is stable and should be passed on as the
+idempotency key, because a transfer whose worker died mid-call is sent
+again once its claim times out.
+
+The gateway is chosen by settings:
+
+    SETTLEMENT_GATEWAY = 'transfers.gateways.HttpSettlementGateway'
+    SETTLEMENT_GATEWAY_OPTIONS = {'url': 'https://...', 'timeout': 10}
+"""
+
+import json
+import threading
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class SettlementError(Exception):
+    """The gateway did not settle the transfer; it may be retried"""
+    pass
+
+
+class SettlementGateway:
+    """Interface every settlement gateway implements"""
+
+    def settle(self, transfer):
+        """
+        Pay out one transfer.
+
+        Returns:
+            External reference for the payout
+
+        Raises:
+            SettlementError: if the payout did not happen
+        """
+        raise NotImplementedError
+
+
+class FileSettlementGateway(SettlementGateway):
+    """Local stub: appends each payout instruction to a JSON-lines file"""
+
+    def __init__(self, path='settlements.jsonl'):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def settle(self, transfer):
+        external_reference = f"FILE-{transfer.reference}"
+        line = json.dumps({
+            'reference': transfer.reference,
+            'external_reference': external_reference,
+            'account_number': transfer.account.account_number,
+            'amount': str(transfer.amount),
+            'recipient_name': transfer.recipient_name,
+            'destination_type': transfer.destination_type,
+            'destination_details': transfer.destination_details,
+            'settled_at': timezone.now().isoformat(),
+        })
+
+        try:
+            with self._lock, open(self.path, 'a') as f:
+                f.write(line + '\n')
+        except OSError as e:
+            raise SettlementError(f"Could not write settlement file: {e}")
+
+        return external_reference
+
+
+class HttpSettlementGateway(SettlementGateway):
+    """
+    POSTs each payout as JSON and expects {"external_reference": ...} back.
+
+    The transfer reference goes in the Idempotency-Key header.
+    """
+
+    def __init__(self, url, timeout=10, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._local = threading.local()
+
+    def _session(self):
+        # requests.Session is not thread-safe; keep one per worker thread
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+            self._local.session.headers.update(self.headers)
+        return self._local.session
+
+    def settle(self, transfer):
+        payload = {
+            'reference': transfer.reference,
+            'amount': str(transfer.amount),
+            'recipient_name': transfer.recipient_name,
+            'destination_type': transfer.destination_type,
+            'destination_details': transfer.destination_details,
+        }
+
+        try:
+            response = self._session().post(
+                self.url,
+                json=payload,
+                headers={'Idempotency-Key': transfer.reference},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            external_reference = response.json().get('external_reference')
+        except (requests.RequestException, ValueError) as e:
+            raise SettlementError(f"Settlement request failed: {e}")
+
+        if not external_reference:
+            raise SettlementError("Settlement response had no external_reference")
+        return external_reference
+
+
+def get_settlement_gateway(path=None, **options):
+    """
+    Build the configured gateway (or the one named by path).
+
+    SETTLEMENT_GATEWAY_OPTIONS belong to SETTLEMENT_GATEWAY, so they are
+    only applied when path is not given; a gateway named by path gets just
+    the options passed here.
+
+    Raises:
+        ImproperlyConfigured: if no gateway is configured
+    """
+    if path is None:
+        path = getattr(settings, 'SETTLEMENT_GATEWAY', None)
+        if not path:
+            raise ImproperlyConfigured("No settlement gateway configured (set SETTLEMENT_GATEWAY)")
+        options = options or getattr(settings, 'SETTLEMENT_GATEWAY_OPTIONS', {})
+
+    return import_string(path)(**options)
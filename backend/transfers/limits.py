@@ -0,0 +1,153 @@
+"""
+Transfer Limits - rolling-window limit checks backed by running counters
+
+Every transfer that moves money (Transfer reaching funds_deducted, or a
+compliance TransferRequest reaching tac_verified) adds its amount to a
+per-account, per-day TransferLimitUsage row. Cancelling or failing such a
+transfer takes it back off. Windows are rolling:
+
+    daily   - today
+    weekly  - today and the 6 days before
+    monthly - today and the 29 days before
+
+so a limit check is one indexed range read of at most 30 usage rows.
+Configured limits (TransferLimit rows and the compliance daily/weekly/
+monthly settings; the stricter wins) are cached until either changes.
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TransferLimit, TransferLimitUsage
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 30}
+LIMITS_CACHE_KEY = 'transfers:limits'
+LIMITS_CACHE_TIMEOUT = 3600
+
+# ComplianceSetting types that map onto TransferLimit periods
+COMPLIANCE_LIMIT_SETTINGS = {
+    'daily_limit': 'daily',
+    'weekly_limit': 'weekly',
+    'monthly_limit': 'monthly',
+}
+
+
+class TransferLimitService:
+    """Unified limits engine for transfers and compliance transfer requests"""
+
+    @staticmethod
+    def get_limits():
+        """Active limits keyed by TransferLimit.PERIOD_CHOICES value"""
+        limits = cache.get(LIMITS_CACHE_KEY)
+        if limits is None:
+            limits = TransferLimitService._load_limits()
+            cache.set(LIMITS_CACHE_KEY, limits, LIMITS_CACHE_TIMEOUT)
+        return limits
+
+    @staticmethod
+    def invalidate_limits():
+        cache.delete(LIMITS_CACHE_KEY)
+
+    @staticmethod
+    def _load_limits():
+        from compliance.models import ComplianceSetting
+
+        limits = {}
+
+        def tighten(period, amount):
+            if period not in limits or amount < limits[period]:
+                limits[period] = amount
+
+        for period, amount in TransferLimit.objects.filter(is_active=True).values_list('limit_type', 'amount'):
+            tighten(period, amount)
+
+        for setting_type, value in ComplianceSetting.objects.filter(
+            setting_type__in=COMPLIANCE_LIMIT_SETTINGS, is_active=True
+        ).values_list('setting_type', 'value'):
+            try:
+                tighten(COMPLIANCE_LIMIT_SETTINGS[setting_type], Decimal(value))
+            except ArithmeticError:
+                logger.warning(f"Ignoring non-numeric compliance setting {setting_type}={value!r}")
+
+        return limits
+
+    @staticmethod
+    def get_usage(account_number, today=None):
+        """Amount used in each rolling window (one indexed range read)"""
+        today = today or timezone.localdate()
+        usage = {period: Decimal('0.00') for period in WINDOW_DAYS}
+
+        for date, amount in TransferLimitUsage.objects.filter(
+            account_id=account_number,
+            date__gt=today - timedelta(days=max(WINDOW_DAYS.values())),
+            date__lte=today
+        ).values_list('date', 'amount'):
+            age = (today - date).days
+            for period, days in WINDOW_DAYS.items():
+                if age < days:
+                    usage[period] += amount
+
+        return usage
+
+    @staticmethod
+    def check(account_number, amount):
+        """
+        Check a proposed transfer against every active limit.
+
+        Returns:
+            List of error messages (empty if the transfer is allowed)
+        """
+        amount = Decimal(str(amount))
+        limits = TransferLimitService.get_limits()
+        errors = []
+
+        per_transaction = limits.get('per_transaction')
+        if per_transaction is not None and amount > per_transaction:
+            errors.append(f"Maximum per transaction: ${per_transaction}")
+
+        if not any(period in limits for period in WINDOW_DAYS):
+            return errors
+
+        usage = TransferLimitService.get_usage(account_number)
+        for period in WINDOW_DAYS:
+            limit = limits.get(period)
+            if limit is not None and usage[period] + amount > limit:
+                errors.append(
+                    f"{period.capitalize()} limit exceeded. Remaining: ${max(limit - usage[period], Decimal('0.00'))}"
+                )
+
+        return errors
+
+    @staticmethod
+    def record(account_number, amount, when=None):
+        """Count a transfer towards the limits of the day it happened"""
+        TransferLimitService._add(account_number, Decimal(str(amount)), 1, when)
+
+    @staticmethod
+    def release(account_number, amount, when=None):
+        """Take a cancelled/failed transfer back off the day it was counted on"""
+        TransferLimitService._add(account_number, -Decimal(str(amount)), -1, when)
+
+    @staticmethod
+    def _add(account_number, amount, count, when):
+        date = timezone.localdate(when) if when else timezone.localdate()
+        usage = TransferLimitUsage.objects.filter(account_id=account_number, date=date)
+        increment = {'amount': F('amount') + amount, 'count': F('count') + count}
+
+        if usage.update(**increment) or count < 0:
+            return
+
+        try:
+            with transaction.atomic():
+                TransferLimitUsage.objects.create(account_id=account_number, date=date, amount=amount, count=count)
+        except IntegrityError:
+            # Another writer created the row between our UPDATE and INSERT
+            usage.update(**increment)
@@ -0,0 +1,156 @@
+"""
+transfers/management/commands/benchmark_transfer_list.py
+Query count, payload size and time of the transfer list endpoints
+
+Compares the old list (full TransferSerializer rows with destination
+details, logs prefetched) with the slim cursor-paginated projection
+served by TransferViewSet.list/history.
+
+    python manage.py benchmark_transfer_list --transfers 1000 5000 --logs 4
+"""
+
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, DatabaseError
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import Account
+from transfers.models import Transfer, TransferLog
+from transfers.serializers import TransferSerializer, TransferListSerializer
+from transfers.services import TransferService
+
+
+class Command(BaseCommand):
+    help = 'Benchmark transfer list projections (queries, payload bytes, time)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--transfers',
+            type=int,
+            nargs='+',
+            default=[1000],
+            help='Transfers on the benchmark account'
+        )
+        parser.add_argument(
+            '--logs',
+            type=int,
+            default=4,
+            help='Log rows per transfer'
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=50,
+            help='Rows per page'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark accounts instead of deleting them'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('TRANSFER LIST BENCHMARK'))
+        self.stdout.write(f"{'transfers':>9} {'mode':>16} {'rows':>6} {'queries':>8} {'bytes':>10} {'ms':>9}")
+
+        page_size = options['page_size']
+        for count in options['transfers']:
+            account = self._create_account(count, options['logs'])
+            try:
+                runs = [
+                    ('legacy-all', lambda: self._legacy(account, None)),
+                    ('legacy-history', lambda: self._legacy(account, page_size)),
+                    ('slim-page', lambda: self._slim(account, page_size, pages=1)),
+                    ('slim-all-pages', lambda: self._slim(account, page_size)),
+                ]
+                for mode, run in runs:
+                    rows, queries, size, elapsed = self._measure(run)
+                    self.stdout.write(
+                        f"{count:>9} {mode:>16} {rows:>6} {queries:>8} {size:>10} {elapsed * 1000:>9.1f}"
+                    )
+            finally:
+                if not options['keep']:
+                    self._delete_account(account)
+
+    def _legacy(self, account, limit):
+        """What the list endpoints served before: full rows, logs prefetched"""
+        transfers = Transfer.objects.filter(
+            account=account
+        ).select_related('tac').prefetch_related('logs').order_by('-created_at')
+        if limit:
+            transfers = transfers[:limit]
+        return TransferSerializer(transfers, many=True).data
+
+    def _slim(self, account, limit, pages=None):
+        """The current list endpoints, following next_cursor for up to pages pages"""
+        data, cursor = [], None
+        while True:
+            transfers, cursor = TransferService.get_transfer_history(account.account_number, limit, cursor)
+            data.extend(TransferListSerializer(transfers, many=True).data)
+            pages = pages - 1 if pages else None
+            if cursor is None or pages == 0:
+                return data
+
+    def _measure(self, run):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            data = run()
+            payload = JSONRenderer().render(data)
+            elapsed = time.perf_counter() - started
+        return len(data), len(queries), len(payload), elapsed
+
+    def _create_account(self, transfers, logs):
+        """Throwaway account with transfers and logs, bulk inserted"""
+        suffix = uuid.uuid4().hex[:10]
+        account = Account.objects.create_user(
+            email=f'bench-{suffix}@claverica.local',
+            password=None,
+            phone=f'+999{random.randint(10**8, 10**9 - 1)}',
+            first_name='Benchmark',
+            last_name=suffix,
+        )
+
+        created = Transfer.objects.bulk_create([
+            Transfer(
+                reference=f'BENCH-{suffix}-{i}',
+                account=account,
+                amount=Decimal(random.randint(100, 100000)) / 100,
+                recipient_name=f'Recipient {i}',
+                destination_type='bank',
+                destination_details={
+                    'bank_name': 'Benchmark Bank',
+                    'account_number': f'{random.randint(10**9, 10**10 - 1)}',
+                    'account_type': 'checking',
+                    'swift_code': 'BENCHXXX',
+                    'branch': 'Head Office',
+                    'address': '1 Benchmark Street, Nairobi',
+                },
+                status=random.choice(['pending', 'tac_sent', 'funds_deducted', 'completed']),
+                narration='Benchmark transfer',
+            )
+            for i in range(transfers)
+        ], batch_size=1000)
+
+        TransferLog.objects.bulk_create([
+            TransferLog(
+                transfer=transfer,
+                log_type='status_change',
+                message=f'Benchmark log {n}',
+                metadata={'step': n},
+            )
+            for transfer in created for n in range(logs)
+        ], batch_size=1000)
+        return account
+
+    def _delete_account(self, account):
+        try:
+            account.delete()
+        except DatabaseError as e:
+            self.stdout.write(self.style.WARNING(
+                f"Could not delete benchmark account {account.account_number}: {e}"
+            ))
@@ -0,0 +1,38 @@
+"""
+transfers/management/commands/expire_tacs.py
+Expire TAC codes past their expiry time
+
+    python manage.py expire_tacs [--batch-size 1000]
+
+Covers transfer TACs (marked expired) and compliance transfer requests
+(sent back to pending_tac for a new code). Meant to run from cron every
+few minutes; each run reports how many codes it expired.
+"""
+
+from django.core.management.base import BaseCommand
+
+from compliance.services import TransferService as ComplianceTransferService
+from transfers.services import TransferService, TAC_EXPIRY_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Expire TAC codes past their expiry time, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TAC_EXPIRY_BATCH_SIZE,
+            help=f'Rows updated per transaction (default {TAC_EXPIRY_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        transfer_tacs = TransferService.expire_tacs(batch_size)
+        request_tacs = ComplianceTransferService.expire_tacs(batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {transfer_tacs + request_tacs} TAC codes "
+            f"({transfer_tacs} transfers, {request_tacs} transfer requests)"
+        ))
@@ -0,0 +1,55 @@
+"""
+transfers/management/commands/settle_transfers.py
+Settle funds_deducted transfers from a bank settlement CSV
+
+    python manage.py settle_transfers settlements.csv [--output results.csv] [--chunk-size 1000]
+
+The CSV needs a header with reference, external_reference and optionally
+notes. A per-row result file is written to --output (default: stdout).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transfers.settlement import (
+    parse_settlement_csv, settle_transfers, render_results_csv, summarize, SETTLEMENT_CHUNK_SIZE
+)
+
+
+class Command(BaseCommand):
+    help = 'Bulk-settle transfers from a settlement CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Settlement CSV file')
+        parser.add_argument('--output', help='Write per-row results here instead of stdout')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=SETTLEMENT_CHUNK_SIZE,
+            help=f'Rows per transaction (default {SETTLEMENT_CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+                rows = parse_settlement_csv(stream)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        results = settle_transfers(rows, chunk_size=options['chunk_size'])
+        report = render_results_csv(results)
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.write(report)
+        else:
+            self.stdout.write(report, ending='')
+
+        summary = summarize(results)
+        self.stderr.write(self.style.SUCCESS(
+            f"{len(rows)} rows in {time.perf_counter() - started:.2f}s: "
+            f"{summary['settled']} settled, {summary['already_settled']} already settled, {summary['error']} errors"
+        ))
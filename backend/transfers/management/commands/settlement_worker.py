@@ -0,0 +1,66 @@
+"""
+transfers/management/commands/settlement_worker.py
+Pay out funds_deducted transfers through the configured settlement gateway
+
+    python manage.py settlement_worker [--threads 4] [--batch-size 50] [--once]
+    python manage.py settlement_worker --gateway transfers.gateways.FileSettlementGateway --once
+
+Run as many workers as needed; they claim disjoint batches with
+SELECT ... FOR UPDATE SKIP LOCKED, so no transfer is settled twice.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+
+from transfers.gateways import get_settlement_gateway
+from transfers.settlement import (
+    SettlementWorker, SETTLEMENT_BATCH_SIZE, SETTLEMENT_THREADS, SETTLEMENT_CLAIM_TIMEOUT
+)
+from utils.workers import ClaimWorkerCommand
+
+
+class Command(ClaimWorkerCommand):
+    help = 'Settle funds_deducted transfers through the settlement gateway'
+
+    default_threads = SETTLEMENT_THREADS
+    default_batch_size = SETTLEMENT_BATCH_SIZE
+    default_claim_timeout = SETTLEMENT_CLAIM_TIMEOUT
+    default_poll_interval = SettlementWorker.poll_interval
+    batch_help = 'Transfers claimed per batch'
+    threads_help = 'Concurrent gateway calls'
+
+    def add_worker_arguments(self, parser):
+        parser.add_argument('--gateway', help='Dotted path of the gateway class (default: SETTLEMENT_GATEWAY setting)')
+
+    def make_worker(self, options):
+        try:
+            gateway = get_settlement_gateway(options['gateway'])
+        except (ImproperlyConfigured, ImportError, TypeError, ValueError) as e:
+            # A bad path, or options the gateway class does not accept
+            raise CommandError(f"Cannot build settlement gateway: {e}")
+
+        return SettlementWorker(
+            gateway,
+            threads=options['threads'],
+            batch_size=options['batch_size'],
+            claim_timeout=options['claim_timeout'],
+        )
+
+    def header_line(self, worker, options):
+        return (
+            f"Settlement worker: {worker.gateway_name}, {worker.threads} threads, "
+            f"batches of {worker.batch_size}"
+        )
+
+    def batch_line(self, counts):
+        return (
+            f"claimed {counts['claimed']}: {counts['settled']} settled, "
+            f"{counts['failed']} failed, {counts['lost']} lost, {counts['unknown']} unknown"
+        )
+
+    def summary_line(self, totals, elapsed):
+        rate = totals['settled'] / elapsed if elapsed else 0
+        return (
+            f"Settled {totals['settled']} of {totals['claimed']} claimed transfers in {elapsed:.2f}s "
+            f"({rate:.0f}/s); {totals['failed']} failed, {totals['lost']} lost, {totals['unknown']} unknown"
+        )
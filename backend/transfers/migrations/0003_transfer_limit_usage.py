@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfers', '0002_tac_used_at_transfer_admin_notes_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransferLimitUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('account', models.ForeignKey(db_column='account_number', on_delete=django.db.models.deletion.CASCADE, related_name='transfer_limit_usage', to=settings.AUTH_USER_MODEL, to_field='account_number')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'date'), name='unique_account_limit_usage_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfers', '0003_transfer_limit_usage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tac',
+            index=models.Index(fields=['transfer', 'status', 'expires_at'], name='transfers_t_transfe_4ec912_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tac',
+            index=models.Index(fields=['status', 'expires_at'], name='transfers_t_status_a7abf1_idx'),
+        ),
+    ]
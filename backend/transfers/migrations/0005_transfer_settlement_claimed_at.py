@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfers', '0004_tac_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transfer',
+            name='settlement_claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transfer',
+            index=models.Index(fields=['status', 'settlement_claimed_at'], name='transfers_t_status_e4327b_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfers', '0005_transfer_settlement_claimed_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transfer',
+            index=models.Index(fields=['account', 'created_at', 'id'], name='transfers_t_account_ae2f4e_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfers', '0006_transfer_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transfer',
+            name='settlement_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='transfer',
+            name='settlement_next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transfer',
+            index=models.Index(fields=['status', 'settlement_next_attempt_at'], name='transfers_t_status_06d845_idx'),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.utils import timezone
 import uuid
 
+from .state_machine import StateMachine
+
 class Transfer(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending TAC'),
@@ -35,6 +37,9 @@ class Transfer(models.Model):
     tac_sent_at = models.DateTimeField(null=True, blank=True)
     tac_verified_at = models.DateTimeField(null=True, blank=True)
     deducted_at = models.DateTimeField(null=True, blank=True)
+    settlement_claimed_at = models.DateTimeField(null=True, blank=True)  # Set while a settlement worker holds it
+    settlement_attempts = models.PositiveIntegerField(default=0)  # Failed gateway payouts
+    settlement_next_attempt_at = models.DateTimeField(null=True, blank=True)  # Backoff after a failed payout
     settled_at = models.DateTimeField(null=True, blank=True)
     
     # ADDED: Missing reference fields
@@ -43,6 +48,16 @@ class Transfer(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Settlement worker claim: funds_deducted, or stale pending_settlement claims
+            models.Index(fields=['status', 'settlement_claimed_at']),
+            # Settlement worker claim: funds_deducted transfers whose retry is due
+            models.Index(fields=['status', 'settlement_next_attempt_at']),
+            # Transfer history: keyset pages newest first per account
+            models.Index(fields=['account', 'created_at', 'id']),
+        ]
+
     def __str__(self):
         return f"Transfer {self.reference}"
 
@@ -61,6 +76,14 @@ class TAC(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     used_at = models.DateTimeField(null=True, blank=True)  # ADDED: Missing field
 
+    class Meta:
+        indexes = [
+            # Verification: one probe for (transfer, pending, not yet expired)
+            models.Index(fields=['transfer', 'status', 'expires_at']),
+            # Expiry sweep: pending codes past their expiry
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
     def __str__(self):
         return f"TAC {self.code}"
     
@@ -109,4 +132,35 @@ class TransferLimit(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)  # ADDED: Missing field
 
     def __str__(self):
-        return f"{self.limit_type} limit"
\ No newline at end of file
+        return f"{self.limit_type} limit"
+
+class TransferLimitUsage(models.Model):
+    """Per-account, per-day total of transfers that count towards limits"""
+    account = models.ForeignKey(
+        'accounts.Account',
+        on_delete=models.CASCADE,
+        related_name='transfer_limit_usage',
+        to_field='account_number',
+        db_column='account_number'
+    )
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'date'], name='unique_account_limit_usage_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} {self.date}: {self.amount} ({self.count})"
+
+
+# Allowed Transfer status transitions (see transfers/state_machine.py)
+TRANSFER_STATES = StateMachine(Transfer, TransferLog, {
+    'pending': ('tac_sent', 'cancelled'),
+    'tac_sent': ('tac_verified', 'cancelled', 'failed'),
+    'tac_verified': ('funds_deducted', 'failed'),
+    'funds_deducted': ('pending_settlement', 'completed', 'failed'),
+    'pending_settlement': ('completed', 'funds_deducted', 'failed'),
+})
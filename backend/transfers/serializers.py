@@ -148,6 +148,20 @@ class TransferSerializer(serializers.ModelSerializer):
         return None
 
 
+class TransferListSerializer(serializers.Serializer):
+    """Serializer for list rows (dicts from TransferService.get_transfer_history)"""
+
+    id = serializers.IntegerField()
+    reference = serializers.CharField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    recipient_name = serializers.CharField()
+    destination_type = serializers.CharField()
+    status = serializers.CharField()
+    narration = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    settled_at = serializers.DateTimeField(allow_null=True)
+
+
 class TransferDetailSerializer(TransferSerializer):
     """Serializer for detailed transfer view"""
 
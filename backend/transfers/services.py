@@ -5,21 +5,82 @@ Transfer Services - Core business logic for transfer operations
 import logging
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import Sum
+from django.core.cache import cache
+from django.db.models import Sum, Count, Q
 from datetime import timedelta
 import uuid
 
 from transactions.services import WalletService
-from .models import Transfer, TAC, TransferLog, TransferLimit
+from transactions.sequences import next_value, to_base36
+from transactions.pagination import keyset_paginate
+from .models import Transfer, TAC, TransferLog, TransferLimit, TRANSFER_STATES
+from .state_machine import InvalidTransition
+from .limits import TransferLimitService
 
 logger = logging.getLogger(__name__)
 
+# Rows updated per transaction by the TAC expiry sweep
+TAC_EXPIRY_BATCH_SIZE = 1000
+
+# Aggregates are cached until a transfer is created or changes status;
+# the timeout only bounds how stale a missed invalidation can get
+STATS_CACHE_TIMEOUT = 300
+DASHBOARD_STATS_CACHE_KEY = 'transfers:dashboard-stats'
+
+# Funds taken, payout not yet confirmed: waiting for, or claimed by, the settlement worker
+SETTLING_STATUSES = ('funds_deducted', 'pending_settlement')
+
+# Columns the transfer list screens show
+TRANSFER_LIST_FIELDS = (
+    'id', 'reference', 'amount', 'recipient_name', 'destination_type',
+    'status', 'narration', 'created_at', 'settled_at',
+)
+
+
+def _summary_cache_key(account_number):
+    return f'transfers:summary:{account_number}'
+
+
+def _cached_stats(key, compute):
+    """
+    Cache compute(today) for the current day.
+
+    The day is stored with the value, so "today" buckets roll over at
+    midnight without waiting for an invalidation.
+    """
+    today = timezone.now().date()
+    entry = cache.get(key)
+    if entry is not None and entry[0] == today:
+        return entry[1]
+
+    value = compute(today)
+    cache.set(key, (today, value), STATS_CACHE_TIMEOUT)
+    return value
+
 
 class TransferValidationError(Exception):
     """Custom exception for transfer validation errors"""
     pass
 
 
+def generate_transfer_reference():
+    """TF-XXXXXXXX (base 36) from the shared transfer sequence"""
+    return f"TF-{to_base36(next_value('transfer'), 8)}"
+
+
+def _transition(transfer, target, fields=None, **log):
+    """
+    Apply a TRANSFER_STATES transition, raising TransferValidationError
+    if it is not allowed or another request changed the transfer first.
+    """
+    try:
+        won = TRANSFER_STATES.transition(transfer, target, fields, log)
+    except InvalidTransition:
+        raise TransferValidationError(f"Transfer cannot move from {transfer.status} to {target}")
+    if not won:
+        raise TransferValidationError("Transfer was updated by another request, please retry")
+
+
 class TransferService:
     """Core service for transfer operations"""
 
@@ -35,7 +96,7 @@ class TransferService:
                 account = Account.objects.get(account_number=account_number)
                 
                 # Generate reference
-                reference = f"TF-{uuid.uuid4().hex[:8].upper()}"
+                reference = generate_transfer_reference()
                 
                 # Create transfer record
                 transfer = Transfer.objects.create(
@@ -79,35 +140,8 @@ class TransferService:
             if current_balance < amount:
                 errors.append(f"Insufficient funds. Available: ${current_balance}")
 
-            # 2. Check daily limit
-            today = timezone.now().date()
-            
-            # Get account object for filtering
-            from accounts.models import Account
-            account = Account.objects.get(account_number=account_number)
-            
-            daily_total = Transfer.objects.filter(
-                account=account,  # FIXED: Use account object
-                created_at__date=today,
-                status__in=['completed', 'funds_deducted']
-            ).aggregate(Sum('amount'))['amount__sum'] or 0
-
-            daily_limit = TransferLimit.objects.filter(
-                limit_type='daily',
-                is_active=True
-            ).first()
-
-            if daily_limit and (daily_total + amount) > daily_limit.amount:
-                errors.append(f"Daily limit exceeded. Remaining: ${daily_limit.amount - daily_total}")
-
-            # 3. Check per-transaction limit
-            tx_limit = TransferLimit.objects.filter(
-                limit_type='per_transaction',
-                is_active=True
-            ).first()
-
-            if tx_limit and amount > tx_limit.amount:
-                errors.append(f"Maximum per transaction: ${tx_limit.amount}")
+            # 2. Check per-transaction and daily/weekly/monthly limits
+            errors.extend(TransferLimitService.check(account_number, amount))
 
             return errors
 
@@ -125,25 +159,21 @@ class TransferService:
             # Generate 6-digit TAC
             tac_code = str(uuid.uuid4().int)[:6].zfill(6)
 
-            # Create TAC record (24-hour expiry)
-            tac = TAC.objects.create(
-                transfer=transfer,
-                code=tac_code,
-                expires_at=timezone.now() + timedelta(hours=24)
-            )
+            with transaction.atomic():
+                # Update transfer status (fails if another admin got there first)
+                _transition(
+                    transfer, 'tac_sent', {'tac_sent_at': timezone.now()},
+                    log_type='tac_sent',
+                    message=f'TAC generated for transfer',
+                    metadata={'tac_code': tac_code}
+                )
 
-            # Update transfer status
-            transfer.status = 'tac_sent'
-            transfer.tac_sent_at = timezone.now()
-            transfer.save()
-
-            # Create audit log
-            TransferLog.objects.create(
-                transfer=transfer,
-                log_type='tac_sent',
-                message=f'TAC generated for transfer',
-                metadata={'tac_code': tac_code}
-            )
+                # Create TAC record (24-hour expiry)
+                tac = TAC.objects.create(
+                    transfer=transfer,
+                    code=tac_code,
+                    expires_at=timezone.now() + timedelta(hours=24)
+                )
 
             logger.info(f"TAC generated for transfer {transfer.reference}: {tac_code}")
 
@@ -166,54 +196,45 @@ class TransferService:
         """Verify TAC code entered by client"""
         try:
             transfer = Transfer.objects.get(id=transfer_id)
-            tac = TAC.objects.get(transfer=transfer, code=tac_code)
-
-            # Validate TAC
-            if not tac.is_valid():  # FIXED: Now this method exists
-                raise TransferValidationError("TAC is invalid or expired")
-
-            if tac.status != 'pending':
-                raise TransferValidationError("TAC already used")
-
-            # Mark TAC as used
-            tac.status = 'used'
-            tac.used_at = timezone.now()
-            tac.save()
-
-            # Update transfer status
-            transfer.status = 'tac_verified'
-            transfer.tac_verified_at = timezone.now()
-            transfer.save()
-
-            # Create audit log
-            TransferLog.objects.create(
-                transfer=transfer,
-                log_type='tac_verified',
-                message=f'TAC verified successfully',
-                metadata={'tac_code': tac_code}
-            )
 
-            # Deduct funds from wallet
-            try:
-                new_balance = WalletService.debit_wallet(
-                    account_number=transfer.account.account_number,  # FIXED: Get account number from account object
-                    amount=transfer.amount,
-                    reference=transfer.reference,
-                    description=f"Transfer to {transfer.recipient_name}"
+            with transaction.atomic():
+                # Claim the TAC: one probe of the (transfer, status, expires_at)
+                # index, and only one of two concurrent verifies can win it
+                now = timezone.now()
+                claimed = TAC.objects.filter(
+                    transfer=transfer, status='pending', expires_at__gt=now, code=tac_code
+                ).update(status='used', used_at=now)
+
+                if not claimed:
+                    tac = TAC.objects.get(transfer=transfer, code=tac_code)
+                    if tac.status == 'used':
+                        raise TransferValidationError("TAC already used")
+                    raise TransferValidationError("TAC is invalid or expired")
+
+                _transition(
+                    transfer, 'tac_verified', {'tac_verified_at': timezone.now()},
+                    log_type='tac_verified',
+                    message=f'TAC verified successfully',
+                    metadata={'tac_code': tac_code}
                 )
 
-                # Update transfer status
-                transfer.status = 'funds_deducted'
-                transfer.deducted_at = timezone.now()
-                transfer.save()
-
-                # Create audit log
-                TransferLog.objects.create(
-                    transfer=transfer,
-                    log_type='funds_deducted',
-                    message=f'Funds deducted from wallet. New balance: ${new_balance}',
-                    metadata={'new_balance': str(new_balance)}
-                )
+            # Deduct funds from wallet; the debit and the status change
+            # commit together, so a lost race cannot leave a stray debit
+            try:
+                with transaction.atomic():
+                    new_balance = WalletService.debit_wallet(
+                        account_number=transfer.account.account_number,  # FIXED: Get account number from account object
+                        amount=transfer.amount,
+                        reference=transfer.reference,
+                        description=f"Transfer to {transfer.recipient_name}"
+                    )
+
+                    _transition(
+                        transfer, 'funds_deducted', {'deducted_at': timezone.now()},
+                        log_type='funds_deducted',
+                        message=f'Funds deducted from wallet. New balance: ${new_balance}',
+                        metadata={'new_balance': str(new_balance)}
+                    )
 
                 logger.info(f"Funds deducted for transfer {transfer.reference}. New balance: {new_balance}")
 
@@ -247,16 +268,13 @@ class TransferService:
         try:
             transfer = Transfer.objects.get(id=transfer_id)
 
-            # Update transfer
-            transfer.status = 'completed'
-            transfer.settled_at = timezone.now()
-            transfer.external_reference = external_reference
-            transfer.admin_notes = admin_notes
-            transfer.save()
-
-            # Create audit log
-            TransferLog.objects.create(
-                transfer=transfer,
+            _transition(
+                transfer, 'completed',
+                {
+                    'settled_at': timezone.now(),
+                    'external_reference': external_reference,
+                    'admin_notes': admin_notes,
+                },
                 log_type='settlement_completed',
                 message=f'Transfer marked as settled. External reference: {external_reference}',
                 metadata={
@@ -273,45 +291,85 @@ class TransferService:
             logger.error(f"Error marking transfer as settled: {str(e)}")
             raise
 
+    @staticmethod
+    def expire_tacs(batch_size=TAC_EXPIRY_BATCH_SIZE):
+        """
+        Mark pending TACs past their expiry as expired, batch_size rows
+        per transaction.
+
+        Returns:
+            Number of TACs expired
+        """
+        expired = 0
+        while True:
+            now = timezone.now()
+            with transaction.atomic():
+                ids = list(
+                    TAC.objects.select_for_update(skip_locked=True).filter(
+                        status='pending', expires_at__lte=now
+                    ).values_list('id', flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                expired += TAC.objects.filter(id__in=ids, status='pending').update(status='expired')
+
+        if expired:
+            logger.info(f"Expired {expired} transfer TACs")
+        return expired
+
     @staticmethod
     def get_pending_settlements():
-        """Get all transfers pending manual settlement"""
+        """Get all transfers awaiting settlement, including those a settlement worker has claimed"""
         return Transfer.objects.filter(
-            status='funds_deducted'
+            status__in=SETTLING_STATUSES
         ).select_related('account').order_by('created_at')
 
     @staticmethod
-    def get_transfer_history(account_number, limit=50):
-        """Get transfer history for an account"""
-        from accounts.models import Account
-        account = Account.objects.get(account_number=account_number)
-        
-        return Transfer.objects.filter(
-            account=account  # FIXED: Use account object
-        ).select_related('tac').prefetch_related('logs').order_by('-created_at')[:limit]
+    def get_transfer_history(account_number, limit=50, cursor=None, statuses=None):
+        """
+        Get one page of transfer history for an account, newest first.
+
+        Rows are dicts of TRANSFER_LIST_FIELDS only: no destination_details,
+        logs or TAC, which the detail endpoint fetches for one transfer.
+
+        Returns:
+            Tuple (rows, next_cursor); next_cursor is None on the last page
+
+        Raises:
+            InvalidCursor: if cursor was not issued by us
+        """
+        transfers = Transfer.objects.filter(account__account_number=account_number)
+        if statuses:
+            transfers = transfers.filter(status__in=statuses)
+
+        return keyset_paginate(
+            transfers.values(*TRANSFER_LIST_FIELDS), cursor, limit, field='created_at'
+        )
 
     @staticmethod
     def get_transfer_summary(account_number):
-        """Get transfer summary statistics"""
-        from accounts.models import Account
-        account = Account.objects.get(account_number=account_number)
-        
-        today = timezone.now().date()
+        """Get transfer summary statistics (one aggregate query, cached)"""
+        def compute(today):
+            buckets = {
+                'total': Q(),
+                'today': Q(created_at__date=today),
+                'pending': Q(status='pending'),
+                'completed': Q(status='completed'),
+            }
+            aggregates = {}
+            for name, condition in buckets.items():
+                aggregates[f'{name}_count'] = Count('id', filter=condition)
+                aggregates[f'{name}_amount'] = Sum('amount', filter=condition)
 
-        transfers = Transfer.objects.filter(account=account)  # FIXED: Use account object
+            summary = Transfer.objects.filter(account__account_number=account_number).aggregate(**aggregates)
+            return {key: value or 0 for key, value in summary.items()}
 
-        summary = {
-            'total_count': transfers.count(),
-            'total_amount': transfers.aggregate(Sum('amount'))['amount__sum'] or 0,
-            'today_count': transfers.filter(created_at__date=today).count(),
-            'today_amount': transfers.filter(created_at__date=today).aggregate(Sum('amount'))['amount__sum'] or 0,
-            'pending_count': transfers.filter(status='pending').count(),
-            'pending_amount': transfers.filter(status='pending').aggregate(Sum('amount'))['amount__sum'] or 0,
-            'completed_count': transfers.filter(status='completed').count(),
-            'completed_amount': transfers.filter(status='completed').aggregate(Sum('amount'))['amount__sum'] or 0,
-        }
+        return _cached_stats(_summary_cache_key(account_number), compute)
 
-        return summary
+    @staticmethod
+    def invalidate_summary(account_number):
+        """Drop an account's cached summary once the current transaction commits"""
+        transaction.on_commit(lambda: cache.delete(_summary_cache_key(account_number)))
 
 
 class AdminTransferService:
@@ -333,11 +391,8 @@ class AdminTransferService:
             if transfer.status not in ['pending', 'tac_sent']:
                 raise TransferValidationError("Cannot cancel transfer in current status")
 
-            transfer.status = 'cancelled'
-            transfer.save()
-
-            TransferLog.objects.create(
-                transfer=transfer,
+            _transition(
+                transfer, 'cancelled',
                 log_type='status_change',
                 message=f'Transfer cancelled: {reason}',
                 metadata={'reason': reason}
@@ -353,21 +408,24 @@ class AdminTransferService:
 
     @staticmethod
     def get_dashboard_stats():
-        """Get admin dashboard statistics"""
-        today = timezone.now().date()
-
-        stats = {
-            'total_transfers': Transfer.objects.count(),
-            'today_transfers': Transfer.objects.filter(created_at__date=today).count(),
-            'pending_tac': Transfer.objects.filter(status='pending').count(),
-            'pending_settlement': Transfer.objects.filter(status='funds_deducted').count(),
-            'total_amount_today': Transfer.objects.filter(
-                created_at__date=today,
-                status__in=['completed', 'funds_deducted']
-            ).aggregate(Sum('amount'))['amount__sum'] or 0,
-            'total_amount_all': Transfer.objects.filter(
-                status__in=['completed', 'funds_deducted']
-            ).aggregate(Sum('amount'))['amount__sum'] or 0,
-        }
-
-        return stats
+        """Get admin dashboard statistics (one aggregate query, cached)"""
+        def compute(today):
+            moved = Q(status__in=['completed', *SETTLING_STATUSES])
+            is_today = Q(created_at__date=today)
+
+            stats = Transfer.objects.aggregate(
+                total_transfers=Count('id'),
+                today_transfers=Count('id', filter=is_today),
+                pending_tac=Count('id', filter=Q(status='pending')),
+                pending_settlement=Count('id', filter=Q(status__in=SETTLING_STATUSES)),
+                total_amount_today=Sum('amount', filter=moved & is_today),
+                total_amount_all=Sum('amount', filter=moved),
+            )
+            return {key: value or 0 for key, value in stats.items()}
+
+        return _cached_stats(DASHBOARD_STATS_CACHE_KEY, compute)
+
+    @staticmethod
+    def invalidate_dashboard_stats():
+        """Drop the cached dashboard stats once the current transaction commits"""
+        transaction.on_commit(lambda: cache.delete(DASHBOARD_STATS_CACHE_KEY))
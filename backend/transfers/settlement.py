@@ -0,0 +1,377 @@
+"""
+Transfer settlement - bulk import of bank settlement files, and the
+settlement worker that pays transfers out through a gateway
+
+Bulk import
+-----------
+
+The file is a CSV with a header row and the columns
+
+    reference, external_reference, notes (optional)
+
+Rows are processed in chunks. Each chunk is one transaction: one
+SELECT ... FOR UPDATE resolves and locks all of its transfers, one UPDATE
+sets their status and settled_at, one bulk_update writes the per-row
+references and notes, and one bulk_create writes their TransferLog rows.
+Locking the rows makes the state check and the write atomic with respect
+to the single-transfer endpoints (see transfers/state_machine.py).
+
+Every input row gets a result: settled, already_settled or error.
+
+Settlement worker
+-----------------
+claim_for_settlement() locks a batch of funds_deducted transfers with
+SELECT ... FOR UPDATE SKIP LOCKED and moves them to pending_settlement,
+stamped with settlement_claimed_at, in one short transaction. Concurrent
+workers skip each other's rows, so no transfer is claimed twice. The
+gateway calls then run on a thread pool outside any transaction, and each
+outcome is recorded with a state machine transition (SettlementWorker is a
+ClaimWorker, see utils/workers.py):
+
+    success          -> completed (settlement_completed log)
+    SettlementError  -> back to funds_deducted for a later retry (error log)
+    anything else    -> left claimed; picked up again after claim_timeout
+
+A released transfer is not claimed again until settlement_next_attempt_at:
+the delay doubles with each failed attempt (SETTLEMENT_BACKOFF_BASE * 2 **
+(attempts - 1) seconds, capped at SETTLEMENT_BACKOFF_MAX), so a gateway
+that keeps failing cannot keep the batches full and spin the worker.
+
+A claim older than claim_timeout (a worker that died) can be claimed again.
+Both transitions are guarded on the settlement_claimed_at stamped by this
+worker's claim, so a slow worker whose claim was taken over records
+nothing (it counts the transfer as lost) and the new claimant's outcome
+stands.
+"""
+
+import csv
+import io
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.workers import ClaimWorker, backoff_delay
+
+from .gateways import SettlementError
+from .models import Transfer, TransferLog, TRANSFER_STATES
+from .services import TransferService, AdminTransferService
+
+logger = logging.getLogger(__name__)
+
+SETTLEMENT_CHUNK_SIZE = 1000
+REQUIRED_COLUMNS = ('reference', 'external_reference')
+RESULT_FIELDS = ('line', 'reference', 'external_reference', 'result', 'message')
+
+SETTLEMENT_BATCH_SIZE = 50
+SETTLEMENT_THREADS = 4
+SETTLEMENT_CLAIM_TIMEOUT = 15 * 60  # seconds
+SETTLEMENT_BACKOFF_BASE = 60  # seconds
+SETTLEMENT_BACKOFF_MAX = 60 * 60  # seconds
+
+
+def parse_settlement_csv(stream):
+    """
+    Read settlement rows from a text stream.
+
+    Returns:
+        List of (line_number, reference, external_reference, notes)
+
+    Raises:
+        ValueError: if the header lacks a required column
+    """
+    reader = csv.DictReader(stream)
+    columns = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Settlement file is missing column(s): {', '.join(missing)}")
+    reader.fieldnames = columns
+
+    return [
+        (
+            reader.line_num,
+            (row.get('reference') or '').strip(),
+            (row.get('external_reference') or '').strip(),
+            (row.get('notes') or '').strip(),
+        )
+        for row in reader
+    ]
+
+
+def settle_transfers(rows, chunk_size=SETTLEMENT_CHUNK_SIZE, settled_by=None):
+    """
+    Settle transfers from parsed settlement rows.
+
+    Args:
+        rows: Output of parse_settlement_csv()
+        chunk_size: Rows per transaction
+        settled_by: Admin user recorded on the log rows, if any
+
+    Returns:
+        List of result dicts with RESULT_FIELDS keys, in input order
+    """
+    results = []
+    seen = set()
+    pending = []
+
+    for line, reference, external_reference, notes in rows:
+        if not reference or not external_reference:
+            results.append(_result(line, reference, external_reference, 'error', 'reference and external_reference are required'))
+        elif reference in seen:
+            results.append(_result(line, reference, external_reference, 'error', 'Duplicate reference in file'))
+        else:
+            seen.add(reference)
+            pending.append((line, reference, external_reference, notes))
+            results.append(None)
+
+    chunk_results = []
+    for start in range(0, len(pending), chunk_size):
+        chunk_results.extend(_settle_chunk(pending[start:start + chunk_size], settled_by))
+
+    # Slot the chunk results back into input order
+    chunk_results = iter(chunk_results)
+    results = [result if result is not None else next(chunk_results) for result in results]
+
+    if any(result['result'] == 'settled' for result in results):
+        AdminTransferService.invalidate_dashboard_stats()
+    return results
+
+
+def _settle_chunk(rows, settled_by):
+    now = timezone.now()
+    results = []
+
+    with transaction.atomic():
+        transfers = {
+            transfer.reference: transfer
+            for transfer in Transfer.objects.select_for_update(of=('self',)).select_related('account').filter(
+                reference__in=[reference for _, reference, _, _ in rows]
+            )
+        }
+
+        settled, logs = [], []
+        for line, reference, external_reference, notes in rows:
+            transfer = transfers.get(reference)
+            if transfer is None:
+                results.append(_result(line, reference, external_reference, 'error', 'Transfer not found'))
+                continue
+
+            if transfer.status == 'completed' and transfer.external_reference == external_reference:
+                results.append(_result(line, reference, external_reference, 'already_settled', ''))
+                continue
+
+            if transfer.settlement_claimed_at is not None and transfer.status == 'pending_settlement':
+                results.append(_result(
+                    line, reference, external_reference, 'error', 'Transfer is being settled by the settlement worker'
+                ))
+                continue
+
+            if not TRANSFER_STATES.can_transition(transfer.status, 'completed'):
+                results.append(_result(
+                    line, reference, external_reference, 'error', f'Cannot settle transfer in status {transfer.status}'
+                ))
+                continue
+
+            transfer.status = 'completed'
+            transfer.settled_at = now
+            transfer.external_reference = external_reference
+            transfer.admin_notes = notes
+            settled.append(transfer)
+            logs.append(TransferLog(
+                transfer=transfer,
+                log_type='settlement_completed',
+                message=f'Transfer marked as settled. External reference: {external_reference}',
+                metadata={
+                    'external_reference': external_reference,
+                    'admin_notes': notes,
+                    'bulk_import': True,
+                    'admin_email': getattr(settled_by, 'email', None),
+                }
+            ))
+            results.append(_result(line, reference, external_reference, 'settled', ''))
+
+        if settled:
+            # Status and timestamp are the same for the whole chunk, so only
+            # the per-row columns need bulk_update's (slow to build) CASE
+            Transfer.objects.filter(id__in=[transfer.id for transfer in settled]).update(
+                status='completed', settled_at=now
+            )
+            Transfer.objects.bulk_update(settled, ['external_reference', 'admin_notes'])
+            TransferLog.objects.bulk_create(logs)
+
+            # bulk_update bypasses the post_save receivers that drop cached summaries
+            for account_number in {transfer.account.account_number for transfer in settled}:
+                TransferService.invalidate_summary(account_number)
+
+    logger.info(f"Bulk settlement chunk: {len(settled)} of {len(rows)} rows settled")
+    return results
+
+
+def claim_for_settlement(batch_size=SETTLEMENT_BATCH_SIZE, claim_timeout=SETTLEMENT_CLAIM_TIMEOUT):
+    """
+    Claim up to batch_size transfers for this worker.
+
+    Returns:
+        List of claimed Transfers (status pending_settlement, account loaded)
+    """
+    now = timezone.now()
+    claimable = Q(status='funds_deducted') & (
+        Q(settlement_next_attempt_at__isnull=True) | Q(settlement_next_attempt_at__lte=now)
+    ) | Q(status='pending_settlement', settlement_claimed_at__lt=now - timedelta(seconds=claim_timeout))
+
+    with transaction.atomic():
+        transfers = list(
+            Transfer.objects.select_for_update(skip_locked=True, of=('self',)).select_related('account').filter(
+                claimable
+            ).order_by('deducted_at', 'id')[:batch_size]
+        )
+        if not transfers:
+            return []
+
+        Transfer.objects.filter(id__in=[transfer.id for transfer in transfers]).update(
+            status='pending_settlement', settlement_claimed_at=now
+        )
+        TransferLog.objects.bulk_create([
+            TransferLog(
+                transfer=transfer,
+                log_type='status_change',
+                message='Claimed by settlement worker',
+                metadata={'previous_status': transfer.status}
+            )
+            for transfer in transfers
+        ])
+
+        for transfer in transfers:
+            transfer.status = 'pending_settlement'
+            transfer.settlement_claimed_at = now
+
+        # The bulk UPDATE bypasses the post_save receivers that drop cached stats
+        for account_number in {transfer.account.account_number for transfer in transfers}:
+            TransferService.invalidate_summary(account_number)
+        AdminTransferService.invalidate_dashboard_stats()
+
+    return transfers
+
+
+def complete_settlement(transfer, external_reference, gateway_name=''):
+    """
+    Record a successful payout; False if the transfer changed meanwhile,
+    including a stale claim having been taken over by another worker
+    """
+    return TRANSFER_STATES.transition(
+        transfer, 'completed',
+        {
+            'settled_at': timezone.now(),
+            'external_reference': external_reference,
+            'settlement_claimed_at': None,
+            'settlement_next_attempt_at': None,
+        },
+        {
+            'log_type': 'settlement_completed',
+            'message': f'Transfer settled by gateway. External reference: {external_reference}',
+            'metadata': {'external_reference': external_reference, 'gateway': gateway_name},
+        },
+        expect={'settlement_claimed_at': transfer.settlement_claimed_at}
+    )
+
+
+def release_settlement(transfer, error):
+    """
+    Hand a failed payout back to funds_deducted, to be retried after a
+    backoff; False if the transfer changed meanwhile (as complete_settlement)
+    """
+    attempts = transfer.settlement_attempts + 1
+    retry_at = timezone.now() + timedelta(
+        seconds=backoff_delay(attempts, SETTLEMENT_BACKOFF_BASE, SETTLEMENT_BACKOFF_MAX)
+    )
+    return TRANSFER_STATES.transition(
+        transfer, 'funds_deducted',
+        {'settlement_claimed_at': None, 'settlement_attempts': attempts, 'settlement_next_attempt_at': retry_at},
+        {
+            'log_type': 'error',
+            'message': f'Settlement failed: {error}',
+            'metadata': {'error': str(error), 'attempt': attempts, 'retry_at': retry_at.isoformat()},
+        },
+        expect={'settlement_claimed_at': transfer.settlement_claimed_at}
+    )
+
+
+class SettlementWorker(ClaimWorker):
+    """Claims transfers in batches and settles them through a gateway on a thread pool"""
+
+    COUNTS = ('claimed', 'settled', 'failed', 'lost', 'unknown')
+    thread_name_prefix = 'settlement'
+    poll_interval = 5  # seconds
+
+    def __init__(self, gateway, threads=SETTLEMENT_THREADS, batch_size=SETTLEMENT_BATCH_SIZE,
+                 claim_timeout=SETTLEMENT_CLAIM_TIMEOUT):
+        super().__init__(threads, batch_size, claim_timeout)
+        self.gateway = gateway
+        self.gateway_name = type(gateway).__name__
+
+    def claim(self):
+        return claim_for_settlement(self.batch_size, self.claim_timeout)
+
+    def process(self, transfer):
+        return self.gateway.settle(transfer)
+
+    def record(self, outcomes):
+        """
+        Returns:
+            Dict of counts: settled, failed, lost (the transfer changed under
+            us, e.g. our claim was taken over, before the outcome was
+            recorded), unknown (left claimed after an unexpected error)
+        """
+        counts = {'settled': 0, 'failed': 0, 'lost': 0, 'unknown': 0}
+
+        for transfer, external_reference, error in outcomes:
+            if isinstance(error, SettlementError):
+                logger.warning(f"Settlement of {transfer.reference} failed: {error}")
+                if release_settlement(transfer, error):
+                    counts['failed'] += 1
+                else:
+                    logger.error(f"Transfer {transfer.reference} changed before its failed settlement was recorded")
+                    counts['lost'] += 1
+            elif error is not None:
+                # Outcome unknown; the claim times out and the gateway sees the same reference again
+                logger.error(f"Unexpected error settling {transfer.reference}", exc_info=error)
+                counts['unknown'] += 1
+            elif complete_settlement(transfer, external_reference, self.gateway_name):
+                counts['settled'] += 1
+            else:
+                logger.error(
+                    f"Transfer {transfer.reference} was paid out ({external_reference}) "
+                    f"but changed before the settlement was recorded"
+                )
+                counts['lost'] += 1
+
+        return counts
+
+
+def render_results_csv(results):
+    """Per-row results as CSV text"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=RESULT_FIELDS)
+    writer.writeheader()
+    writer.writerows(results)
+    return output.getvalue()
+
+
+def summarize(results):
+    """Count results by outcome"""
+    summary = {'settled': 0, 'already_settled': 0, 'error': 0}
+    for result in results:
+        summary[result['result']] += 1
+    return summary
+
+
+def _result(line, reference, external_reference, result, message):
+    return {
+        'line': line,
+        'reference': reference,
+        'external_reference': external_reference,
+        'result': result,
+        'message': message,
+    }
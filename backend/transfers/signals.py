@@ -1,55 +1,95 @@
 """
-transfers/signals.py - Signal wallet deductions ONLY
+transfers/signals.py - Limit usage counters and cached stats invalidation
 """
 
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import Transfer
-from transactions.models import Wallet
-from transactions.services import WalletService
 import logging
 
+from django.db.models.signals import post_save, post_init, post_delete
+from django.dispatch import receiver
+
+from compliance.models import TransferRequest, ComplianceSetting
+from .limits import TransferLimitService
+from .models import Transfer, TransferLimit
+from .services import TransferService, AdminTransferService
+
 logger = logging.getLogger(__name__)
 
+# Wallet deduction for a verified transfer happens in
+# TransferService.verify_tac, in the same database transaction as the
+# tac_verified -> funds_deducted transition. (A post_save receiver used to
+# debit here as well, charging the client twice.)
+
+# ---------------------------------------------------------------------------
+# Transfer limit usage: count a transfer once it moves money, and take it
+# back off if it is later cancelled or fails. Covers both transfer flows.
+# ---------------------------------------------------------------------------
+
+TRANSFER_COUNTED_STATUSES = ('funds_deducted', 'pending_settlement', 'completed')
+TRANSFER_REQUEST_COUNTED_STATUSES = ('tac_verified', 'pending_settlement', 'completed')
+
+
+def _sync_limit_usage(instance, counted_statuses, when):
+    counted = instance.status in counted_statuses
+    if counted == getattr(instance, '_limit_counted', False):
+        return
+
+    account_number = instance.account.account_number
+    if counted:
+        TransferLimitService.record(account_number, instance.amount)
+    else:
+        TransferLimitService.release(account_number, instance.amount, when)
+    instance._limit_counted = counted
+
+
+@receiver(post_init, sender=Transfer)
+def remember_transfer_limit_state(sender, instance, **kwargs):
+    instance._limit_counted = instance.status in TRANSFER_COUNTED_STATUSES
+
+
 @receiver(post_save, sender=Transfer)
-def deduct_wallet_on_verified_transfer(sender, instance, created, **kwargs):
-    """
-    When a transfer is verified (TAC verified), deduct from wallet
-    This is the ONLY signal needed in transfers app
-    """
-    # Check if this is a status update to 'tac_verified'
-    if not created and instance.status == 'tac_verified':
-        try:
-            # Get the previous state to avoid double deduction
-            if hasattr(instance, '_original_status'):
-                if instance._original_status == instance.status:
-                    return
-            
-            print(f'\n[TRANSFERS SIGNAL] Deducting ${instance.amount} from wallet')
-            print(f'   Account: {instance.account.account_number}')
-            
-            # Use Transactions app service to deduct funds
-            new_balance = WalletService.debit_wallet(
-                account_number=instance.account.account_number,
-                amount=instance.amount,
-                reference=instance.reference,
-                description=f"Transfer to {instance.recipient_name}"
-            )
-            
-            print(f'    Funds deducted. New balance: ${new_balance}')
-            
-            # Update transfer status to funds_deducted
-            instance.status = 'funds_deducted'
-            instance.save(update_fields=['status'])
-            
-        except Exception as e:
-            print(f'    Error deducting funds: {e}')
-            logger.error(f"Failed to deduct wallet for transfer {instance.reference}: {e}")
-
-# Store original status on model init
-from django.db.models.signals import post_init
+def update_transfer_limit_usage(sender, instance, **kwargs):
+    _sync_limit_usage(instance, TRANSFER_COUNTED_STATUSES, instance.deducted_at)
+
+
+@receiver(post_init, sender=TransferRequest)
+def remember_transfer_request_limit_state(sender, instance, **kwargs):
+    instance._limit_counted = instance.status in TRANSFER_REQUEST_COUNTED_STATUSES
+
+
+@receiver(post_save, sender=TransferRequest)
+def update_transfer_request_limit_usage(sender, instance, **kwargs):
+    _sync_limit_usage(instance, TRANSFER_REQUEST_COUNTED_STATUSES, instance.tac_verified_at)
+
+
+@receiver([post_save, post_delete], sender=TransferLimit)
+@receiver([post_save, post_delete], sender=ComplianceSetting)
+def invalidate_cached_transfer_limits(sender, **kwargs):
+    TransferLimitService.invalidate_limits()
+
+
+# ---------------------------------------------------------------------------
+# Cached transfer summaries and dashboard stats: drop them whenever a
+# transfer is created, deleted or changes status.
+# ---------------------------------------------------------------------------
+
+
+def _invalidate_transfer_stats(instance):
+    TransferService.invalidate_summary(instance.account.account_number)
+    AdminTransferService.invalidate_dashboard_stats()
+
 
 @receiver(post_init, sender=Transfer)
-def store_original_status(sender, instance, **kwargs):
-    """Store original status to detect changes"""
-    instance._original_status = instance.status
+def remember_transfer_stats_status(sender, instance, **kwargs):
+    instance._stats_status = instance.status
+
+
+@receiver(post_save, sender=Transfer)
+def invalidate_transfer_stats_on_save(sender, instance, created, **kwargs):
+    if created or instance.status != instance._stats_status:
+        _invalidate_transfer_stats(instance)
+        instance._stats_status = instance.status
+
+
+@receiver(post_delete, sender=Transfer)
+def invalidate_transfer_stats_on_delete(sender, instance, **kwargs):
+    _invalidate_transfer_stats(instance)
@@ -0,0 +1,97 @@
+"""
+Transfer State Machine - declarative status transitions with optimistic concurrency
+
+Each model with a status field declares which statuses may follow which:
+
+    TRANSFER_STATES = StateMachine(Transfer, TransferLog, {
+        'pending': ('tac_sent', 'cancelled'),
+        ...
+    })
+
+A transition is one conditional UPDATE ... WHERE id = ? AND status = ?
+(plus any expected column values the caller passes) touching only the status and the fields passed in, plus its log row, in
+one database transaction. Illegal transitions are rejected before any
+query runs; a transition that loses a race to another writer changes
+nothing and returns False.
+
+Because QuerySet.update() bypasses model signals, a successful transition
+sends post_save itself (with update_fields), so the limit counters, cached
+stats and other receivers see it like any other save.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+
+class InvalidTransition(ValueError):
+    """The requested status does not follow the object's current status"""
+    pass
+
+
+class StateMachine:
+    """Allowed status transitions for one model, and the code to apply them"""
+
+    def __init__(self, model, log_model, transitions, field='status'):
+        self.model = model
+        self.log_model = log_model
+        self.field = field
+        self.transitions = {source: frozenset(targets) for source, targets in transitions.items()}
+
+    def can_transition(self, source, target):
+        return target in self.transitions.get(source, ())
+
+    def transition(self, instance, target, fields=None, log=None, expect=None):
+        """
+        Move instance to target if it is still in the status it was loaded with.
+
+        Args:
+            instance: Model instance; updated in place when the transition wins
+            target: New status
+            fields: Other columns to set in the same UPDATE
+            log: Keyword arguments for the log row (log_type, message, ...)
+            expect: Extra column values the row must still have (e.g. a
+                claim stamp), added to the UPDATE's WHERE clause
+
+        Returns:
+            True if this call made the change, False if another writer
+            changed the row (its status or an expected column) first
+
+        Raises:
+            InvalidTransition: if target may not follow the current status
+        """
+        source = getattr(instance, self.field)
+        if not self.can_transition(source, target):
+            raise InvalidTransition(
+                f"Cannot move {self.model.__name__} {instance.pk} from '{source}' to '{target}'"
+            )
+
+        values = dict(fields or {})
+        values[self.field] = target
+        for model_field in self.model._meta.concrete_fields:
+            if getattr(model_field, 'auto_now', False):
+                values.setdefault(model_field.name, timezone.now())
+
+        with transaction.atomic():
+            updated = self.model.objects.filter(
+                pk=instance.pk, **{self.field: source}, **(expect or {})
+            ).update(**values)
+            if not updated:
+                return False
+
+            for name, value in values.items():
+                setattr(instance, name, value)
+
+            if log:
+                self.log_model.objects.create(transfer=instance, **log)
+
+            post_save.send(
+                sender=self.model,
+                instance=instance,
+                created=False,
+                update_fields=frozenset(values),
+                raw=False,
+                using=instance._state.db,
+            )
+
+        return True
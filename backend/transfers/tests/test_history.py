@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from transfers.models import TransferLog
+from transfers.services import TransferService
+from utils.factories import make_account, make_transfer
+
+
+class TransferHistoryTests(TestCase):
+    """Test slim, cursor-paginated transfer lists"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        self.transfers = [
+            make_transfer(self.account, '10.00', status='pending' if i % 2 else 'completed', reference=f'TRF-HIST-{i}')
+            for i in range(7)
+        ]
+        for transfer in self.transfers:
+            TransferLog.objects.create(transfer=transfer, log_type='created', message='Transfer created')
+        self.client = APIClient()
+        self.client.force_authenticate(self.account)
+
+    def test_pages_cover_every_transfer_once_newest_first(self):
+        references, cursor = [], None
+        while True:
+            rows, cursor = TransferService.get_transfer_history(self.account.account_number, 3, cursor)
+            references += [row['reference'] for row in rows]
+            if cursor is None:
+                break
+
+        self.assertEqual(references, [f'TRF-HIST-{i}' for i in reversed(range(7))])
+
+    def test_list_is_one_query_without_details(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows, _ = TransferService.get_transfer_history(self.account.account_number, 50)
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('destination_details', rows[0])
+
+    def test_list_endpoint(self):
+        response = self.client.get('/api/transfers/', {'limit': 5})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        self.assertTrue(response.data['has_more'])
+        self.assertNotIn('destination_details', response.data['transfers'][0])
+
+        response = self.client.get('/api/transfers/', {'limit': 5, 'cursor': response.data['next_cursor']})
+        self.assertEqual(response.data['count'], 2)
+        self.assertFalse(response.data['has_more'])
+
+    def test_pending_endpoint_filters_status(self):
+        response = self.client.get('/api/transfers/pending/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row['status'] for row in response.data['transfers']}, {'pending'})
+        self.assertEqual(response.data['count'], 3)
+
+    def test_invalid_cursor_rejected(self):
+        response = self.client.get('/api/transfers/history/', {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_and_logs_endpoints(self):
+        transfer = self.transfers[0]
+
+        response = self.client.get(f'/api/transfers/{transfer.id}/')
+        self.assertEqual(response.data['destination_details'], {'account_number': 'CLV-TEST'})
+        self.assertEqual(len(response.data['logs']), 1)
+
+        response = self.client.get(f'/api/transfers/{transfer.id}/logs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([log['log_type'] for log in response.data['logs']], ['created'])
+
+    def test_other_accounts_transfers_hidden(self):
+        other = make_account(email='history-other@claverica.com', phone='+254700000013')
+        self.client.force_authenticate(other)
+
+        self.assertEqual(self.client.get('/api/transfers/').data['count'], 0)
+        self.assertEqual(self.client.get(f'/api/transfers/{self.transfers[0].id}/logs/').status_code, 404)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_transfer_list', '--transfers', '20', '--logs', '1', '--page-size', '5', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        slim_page = next(line for line in lines if 'slim-page' in line).split()
+        self.assertEqual(slim_page[2:4], ['5', '1'])
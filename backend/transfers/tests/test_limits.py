@@ -0,0 +1,124 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.utils import timezone
+
+from compliance.models import TransferRequest, ComplianceSetting
+from compliance.services import TransferService as ComplianceTransferService
+from transfers.limits import TransferLimitService
+from transfers.models import TransferLimit, TransferLimitUsage
+from utils.factories import make_account, make_transfer
+
+
+class TransferLimitServiceTests(TestCase):
+    """Test the rolling-window limits engine"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        self.account_number = self.account.account_number
+        TransferLimit.objects.create(limit_type='per_transaction', amount=Decimal('500.00'))
+        TransferLimit.objects.create(limit_type='daily', amount=Decimal('1000.00'))
+        TransferLimit.objects.create(limit_type='weekly', amount=Decimal('3000.00'))
+        TransferLimit.objects.create(limit_type='monthly', amount=Decimal('5000.00'))
+
+    def usage_on(self, days_ago, amount):
+        TransferLimitUsage.objects.create(
+            account=self.account,
+            date=timezone.localdate() - timedelta(days=days_ago),
+            amount=Decimal(amount),
+            count=1,
+        )
+
+    def test_per_transaction_limit(self):
+        self.assertEqual(TransferLimitService.check(self.account_number, '500.00'), [])
+        self.assertEqual(
+            TransferLimitService.check(self.account_number, '500.01'),
+            ['Maximum per transaction: $500.00'],
+        )
+
+    def test_rolling_windows(self):
+        self.usage_on(0, '900.00')
+        self.usage_on(6, '2000.00')
+        self.usage_on(29, '1900.00')
+        self.usage_on(30, '5000.00')  # outside every window
+
+        self.assertEqual(TransferLimitService.get_usage(self.account_number), {
+            'daily': Decimal('900.00'),
+            'weekly': Decimal('2900.00'),
+            'monthly': Decimal('4800.00'),
+        })
+        self.assertEqual(TransferLimitService.check(self.account_number, '100.00'), [])
+        self.assertEqual(TransferLimitService.check(self.account_number, '200.00'), [
+            'Daily limit exceeded. Remaining: $100.00',
+            'Weekly limit exceeded. Remaining: $100.00',
+        ])
+
+    def test_stricter_compliance_setting_wins(self):
+        ComplianceSetting.objects.create(setting_type='daily_limit', value='250', is_active=True)
+
+        self.assertEqual(TransferLimitService.get_limits()['daily'], Decimal('250'))
+        self.assertEqual(
+            TransferLimitService.check(self.account_number, '300.00'),
+            ['Daily limit exceeded. Remaining: $250.00'],
+        )
+
+    def test_limits_cache_invalidated_on_change(self):
+        self.assertEqual(TransferLimitService.get_limits()['daily'], Decimal('1000.00'))
+
+        TransferLimit.objects.filter(limit_type='daily').update(amount=Decimal('10.00'))
+        self.assertEqual(TransferLimitService.get_limits()['daily'], Decimal('1000.00'))
+
+        limit = TransferLimit.objects.get(limit_type='daily')
+        limit.save()
+        self.assertEqual(TransferLimitService.get_limits()['daily'], Decimal('10.00'))
+
+    def test_transfer_counted_once_funds_move_and_released_on_failure(self):
+        transfer = make_transfer(self.account, '300.00')
+        self.assertFalse(TransferLimitUsage.objects.exists())
+
+        transfer.status = 'funds_deducted'
+        transfer.deducted_at = timezone.now()
+        transfer.save()
+        transfer.status = 'pending_settlement'
+        transfer.save()
+
+        usage = TransferLimitUsage.objects.get(account=self.account)
+        self.assertEqual((usage.amount, usage.count), (Decimal('300.00'), 1))
+
+        transfer.status = 'failed'
+        transfer.save()
+
+        usage.refresh_from_db()
+        self.assertEqual((usage.amount, usage.count), (Decimal('0.00'), 0))
+
+    def test_transfer_request_counted_at_tac_verified(self):
+        request = TransferRequest.objects.create(
+            account=self.account,
+            amount=Decimal('400.00'),
+            recipient_name='Recipient',
+            destination_type='bank',
+            destination_details={},
+        )
+        self.assertEqual(TransferLimitService.get_usage(self.account_number)['daily'], Decimal('0.00'))
+
+        request.status = 'tac_verified'
+        request.tac_verified_at = timezone.now()
+        request.save()
+
+        self.assertEqual(TransferLimitService.get_usage(self.account_number)['daily'], Decimal('400.00'))
+
+    def test_compliance_transfer_request_enforces_limits(self):
+        self.usage_on(0, '900.00')
+
+        with self.assertRaisesMessage(ValidationError, 'Daily limit exceeded. Remaining: $100.00'):
+            ComplianceTransferService.create_transfer_request(
+                account=self.account,
+                amount=Decimal('200.00'),
+                recipient_name='Recipient',
+                destination_type='bank',
+                destination_details={},
+            )
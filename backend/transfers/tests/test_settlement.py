@@ -0,0 +1,108 @@
+import csv
+import io
+import os
+import tempfile
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from transfers.models import Transfer, TransferLog
+from transfers.settlement import parse_settlement_csv, settle_transfers
+from utils.factories import make_account, make_transfer
+
+
+SETTLEMENT_FILE = """reference,external_reference,notes
+TRF-SET-1,BANK-001,first batch
+TRF-SET-2,BANK-002,
+TRF-SET-PENDING,BANK-003,
+TRF-SET-MISSING,BANK-004,
+TRF-SET-1,BANK-005,
+TRF-SET-DONE,BANK-006,
+"""
+
+
+class BulkSettlementTests(TestCase):
+    """Test settling transfers from a bank settlement file"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        make_transfer(self.account, '10.00', status='funds_deducted', reference='TRF-SET-1')
+        make_transfer(self.account, '20.00', status='pending_settlement', reference='TRF-SET-2')
+        make_transfer(self.account, '30.00', status='pending', reference='TRF-SET-PENDING')
+        done = make_transfer(self.account, '40.00', status='funds_deducted', reference='TRF-SET-DONE')
+        Transfer.objects.filter(id=done.id).update(status='completed', external_reference='BANK-006')
+
+    def settle(self, chunk_size=2):
+        return settle_transfers(parse_settlement_csv(io.StringIO(SETTLEMENT_FILE)), chunk_size=chunk_size)
+
+    def test_results_per_row_in_input_order(self):
+        results = self.settle()
+
+        self.assertEqual(
+            [(r['line'], r['reference'], r['result']) for r in results],
+            [
+                (2, 'TRF-SET-1', 'settled'),
+                (3, 'TRF-SET-2', 'settled'),
+                (4, 'TRF-SET-PENDING', 'error'),
+                (5, 'TRF-SET-MISSING', 'error'),
+                (6, 'TRF-SET-1', 'error'),
+                (7, 'TRF-SET-DONE', 'already_settled'),
+            ]
+        )
+        self.assertEqual(results[2]['message'], 'Cannot settle transfer in status pending')
+        self.assertEqual(results[4]['message'], 'Duplicate reference in file')
+
+    def test_settles_transfers_and_writes_logs(self):
+        self.settle()
+
+        first = Transfer.objects.get(reference='TRF-SET-1')
+        self.assertEqual((first.status, first.external_reference, first.admin_notes), ('completed', 'BANK-001', 'first batch'))
+        self.assertIsNotNone(first.settled_at)
+        self.assertEqual(Transfer.objects.get(reference='TRF-SET-PENDING').status, 'pending')
+        self.assertEqual(TransferLog.objects.filter(log_type='settlement_completed').count(), 2)
+
+        # Importing the same file again settles nothing new
+        results = self.settle()
+        self.assertEqual([r['result'] for r in results[:2]], ['already_settled', 'already_settled'])
+        self.assertEqual(TransferLog.objects.filter(log_type='settlement_completed').count(), 2)
+
+    def test_missing_column_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_settlement_csv(io.StringIO("reference,notes\nTRF-SET-1,x\n"))
+
+    def test_admin_endpoint_returns_result_file(self):
+        admin = make_account(email='settle-admin@claverica.com', phone='+254700000012')
+        admin.is_staff = True
+        admin.save()
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.post(
+            '/api/transfers/admin/transfers/settle-bulk/',
+            {'file': SimpleUploadedFile('settlement.csv', SETTLEMENT_FILE.encode(), content_type='text/csv')},
+            format='multipart'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Settlement-Settled'], '2')
+        rows = list(csv.DictReader(io.StringIO(response.content.decode())))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['result'], 'settled')
+
+    def test_command(self):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write(SETTLEMENT_FILE)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('settle_transfers', path, stdout=out, stderr=err)
+
+        self.assertIn('TRF-SET-2,BANK-002,settled', out.getvalue())
+        self.assertIn('2 settled, 1 already settled, 3 errors', err.getvalue())
+        self.assertEqual(Transfer.objects.get(reference='TRF-SET-2').amount, Decimal('20.00'))
@@ -0,0 +1,198 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from transfers.gateways import SettlementGateway, SettlementError, FileSettlementGateway
+from transfers.models import Transfer
+from transfers.settlement import (
+    SettlementWorker, claim_for_settlement, complete_settlement, release_settlement, SETTLEMENT_BACKOFF_BASE
+)
+from utils.factories import make_account, make_transfer
+
+
+class RecordingGateway(SettlementGateway):
+    """Settles everything except the references it is told to reject"""
+
+    def __init__(self, reject=()):
+        self.reject = set(reject)
+        self.settled = []
+        self._lock = threading.Lock()
+
+    def settle(self, transfer):
+        if transfer.reference in self.reject:
+            raise SettlementError('rejected by bank')
+        with self._lock:
+            self.settled.append(transfer.reference)
+        return f'EXT-{transfer.reference}'
+
+
+class SettlementWorkerTests(TestCase):
+    """Test claiming and settling transfers through a gateway"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        for i in range(5):
+            make_transfer(self.account, '10.00', status='funds_deducted', reference=f'TRF-WRK-{i}')
+        make_transfer(self.account, '10.00', status='pending', reference='TRF-WRK-PENDING')
+
+    def test_claims_are_disjoint(self):
+        first = claim_for_settlement(batch_size=3)
+        second = claim_for_settlement(batch_size=3)
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({t.id for t in first} & {t.id for t in second})
+        self.assertEqual(claim_for_settlement(), [])
+        self.assertEqual(Transfer.objects.filter(status='pending_settlement').count(), 5)
+
+    def test_stale_claim_is_reclaimed(self):
+        claimed = claim_for_settlement(batch_size=1)
+        Transfer.objects.filter(id=claimed[0].id).update(settlement_claimed_at=timezone.now() - timedelta(hours=1))
+
+        reclaimed = claim_for_settlement(batch_size=10, claim_timeout=60)
+
+        self.assertIn(claimed[0].id, {t.id for t in reclaimed})
+
+    def test_worker_settles_and_releases_failures(self):
+        gateway = RecordingGateway(reject={'TRF-WRK-4'})
+        worker = SettlementWorker(gateway, threads=3, batch_size=2)
+
+        totals = worker.run(once=True)
+
+        self.assertEqual(totals['claimed'], 5)
+        self.assertEqual((totals['settled'], totals['failed']), (4, 1))
+        self.assertEqual(sorted(gateway.settled), [f'TRF-WRK-{i}' for i in range(4)])
+
+        settled = Transfer.objects.get(reference='TRF-WRK-0')
+        self.assertEqual((settled.status, settled.external_reference), ('completed', 'EXT-TRF-WRK-0'))
+        self.assertIsNone(settled.settlement_claimed_at)
+        self.assertEqual(settled.logs.filter(log_type='settlement_completed').count(), 1)
+
+        failed = Transfer.objects.get(reference='TRF-WRK-4')
+        self.assertEqual((failed.status, failed.settlement_attempts), ('funds_deducted', 1))
+        self.assertGreater(failed.settlement_next_attempt_at, timezone.now())
+        self.assertTrue(failed.logs.filter(log_type='error').exists())
+
+    def test_failing_gateway_backs_off(self):
+        references = [f'TRF-WRK-{i}' for i in range(5)]
+        gateway = RecordingGateway(reject=references)
+        gateway.settle = mock.Mock(wraps=gateway.settle)
+        worker = SettlementWorker(gateway, threads=2, batch_size=2)
+
+        totals = worker.run(once=True)
+
+        self.assertEqual((totals['claimed'], totals['failed']), (5, 5))
+        for transfer in Transfer.objects.filter(reference__in=references):
+            self.assertEqual((transfer.status, transfer.settlement_attempts), ('funds_deducted', 1))
+            self.assertGreater(transfer.settlement_next_attempt_at, timezone.now())
+        self.assertEqual(claim_for_settlement(), [])
+
+        # Nothing is due, so the worker goes idle instead of retrying in a loop
+        class Idle(Exception):
+            pass
+
+        with mock.patch('utils.workers.time.sleep', side_effect=Idle) as sleep:
+            with self.assertRaises(Idle):
+                worker.run(poll_interval=7)
+        sleep.assert_called_once_with(7)
+        self.assertEqual(gateway.settle.call_count, 5)
+
+        # Once due, it is retried, with a longer delay after another failure
+        Transfer.objects.filter(reference='TRF-WRK-0').update(settlement_next_attempt_at=timezone.now())
+        self.assertEqual(worker.run(once=True)['failed'], 1)
+        retried = Transfer.objects.get(reference='TRF-WRK-0')
+        self.assertEqual(retried.settlement_attempts, 2)
+        self.assertGreater(
+            retried.settlement_next_attempt_at, timezone.now() + timedelta(seconds=SETTLEMENT_BACKOFF_BASE)
+        )
+
+    def test_taken_over_claim_records_nothing(self):
+        slow, = claim_for_settlement(batch_size=1)
+        Transfer.objects.filter(id=slow.id).update(settlement_claimed_at=timezone.now() - timedelta(hours=1))
+        slow.settlement_claimed_at = Transfer.objects.get(id=slow.id).settlement_claimed_at
+        reclaimed = {t.id: t for t in claim_for_settlement(batch_size=10, claim_timeout=60)}[slow.id]
+
+        # Both workers paid out; only the current claimant's outcome is recorded
+        self.assertFalse(complete_settlement(slow, 'EXT-SLOW', 'RecordingGateway'))
+        self.assertFalse(release_settlement(slow, SettlementError('timeout')))
+        self.assertTrue(complete_settlement(reclaimed, 'EXT-NEW', 'RecordingGateway'))
+
+        transfer = Transfer.objects.get(id=slow.id)
+        self.assertEqual((transfer.status, transfer.external_reference), ('completed', 'EXT-NEW'))
+        self.assertEqual(transfer.logs.filter(log_type='settlement_completed').count(), 1)
+        self.assertFalse(transfer.logs.filter(log_type='error').exists())
+
+    def test_worker_counts_taken_over_claim_as_lost(self):
+        worker = SettlementWorker(RecordingGateway(), batch_size=1)
+        transfer, = claim_for_settlement(batch_size=1)
+        Transfer.objects.filter(id=transfer.id).update(settlement_claimed_at=timezone.now())
+
+        counts = worker.record([(transfer, 'EXT-SLOW', None)])
+
+        self.assertEqual((counts['settled'], counts['lost']), (0, 1))
+        self.assertEqual(Transfer.objects.get(id=transfer.id).status, 'pending_settlement')
+
+    def test_bulk_import_skips_claimed_transfers(self):
+        from transfers.settlement import settle_transfers
+
+        claim_for_settlement(batch_size=1)
+        claimed = Transfer.objects.get(status='pending_settlement')
+
+        result, = settle_transfers([(2, claimed.reference, 'BANK-1', '')])
+
+        self.assertEqual(result['message'], 'Transfer is being settled by the settlement worker')
+
+    def test_file_gateway(self):
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        transfer = Transfer.objects.select_related('account').get(reference='TRF-WRK-0')
+        self.assertEqual(FileSettlementGateway(path).settle(transfer), 'FILE-TRF-WRK-0')
+
+        with open(path) as f:
+            line = json.loads(f.readline())
+        self.assertEqual((line['reference'], line['amount']), ('TRF-WRK-0', '10.00'))
+
+    def test_command_requires_gateway(self):
+        with self.assertRaises(CommandError):
+            call_command('settlement_worker', '--once', stdout=StringIO())
+
+    @override_settings(
+        SETTLEMENT_GATEWAY='transfers.gateways.FileSettlementGateway',
+        SETTLEMENT_GATEWAY_OPTIONS={'path': 'unused.jsonl'}
+    )
+    def test_gateway_override_ignores_default_options(self):
+        out = StringIO()
+        call_command(
+            'settlement_worker', '--once', '--gateway', 'transfers.tests.test_settlement_worker.RecordingGateway',
+            stdout=out
+        )
+        self.assertIn('Settled 5 of 5 claimed transfers', out.getvalue())
+
+    @override_settings(
+        SETTLEMENT_GATEWAY='transfers.tests.test_settlement_worker.RecordingGateway',
+        SETTLEMENT_GATEWAY_OPTIONS={'path': 'unused.jsonl'}
+    )
+    def test_command_reports_bad_gateway_options(self):
+        with self.assertRaisesMessage(CommandError, 'Cannot build settlement gateway'):
+            call_command('settlement_worker', '--once', stdout=StringIO())
+
+    @override_settings(SETTLEMENT_GATEWAY='transfers.tests.test_settlement_worker.RecordingGateway')
+    def test_command(self):
+        out = StringIO()
+        call_command('settlement_worker', '--once', '--threads', '2', stdout=out)
+
+        self.assertIn('Settled 5 of 5 claimed transfers', out.getvalue())
+        self.assertEqual(Transfer.objects.filter(status='completed').count(), 5)
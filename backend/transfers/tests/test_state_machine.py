@@ -0,0 +1,112 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from compliance.models import TransferRequest
+from transactions.models import Transaction
+from transactions.services import WalletService
+from transfers.models import Transfer, TransferLimitUsage, TRANSFER_STATES
+from transfers.services import TransferService, AdminTransferService, TransferValidationError
+from transfers.state_machine import InvalidTransition
+from utils.factories import make_account, make_transfer
+
+
+class TransferStateMachineTests(TestCase):
+    """Test conditional, race-aware status transitions"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        self.transfer = make_transfer(self.account, '50.00')
+
+    def test_illegal_transition_rejected_without_queries(self):
+        with self.assertNumQueries(0):
+            with self.assertRaises(InvalidTransition):
+                TRANSFER_STATES.transition(self.transfer, 'completed')
+
+    def test_stale_instance_loses_race(self):
+        stale = Transfer.objects.get(id=self.transfer.id)
+
+        self.assertTrue(TRANSFER_STATES.transition(
+            self.transfer, 'cancelled', log={'log_type': 'status_change', 'message': 'cancelled'}
+        ))
+        self.assertFalse(TRANSFER_STATES.transition(
+            stale, 'tac_sent', log={'log_type': 'tac_sent', 'message': 'sent'}
+        ))
+
+        self.transfer.refresh_from_db()
+        self.assertEqual(self.transfer.status, 'cancelled')
+        self.assertEqual(list(self.transfer.logs.values_list('log_type', flat=True)), ['status_change'])
+
+    def test_transition_only_writes_its_own_columns(self):
+        Transfer.objects.filter(id=self.transfer.id).update(admin_notes='written elsewhere')
+
+        AdminTransferService.cancel_transfer(self.transfer.id, 'client request')
+
+        self.transfer.refresh_from_db()
+        self.assertEqual((self.transfer.status, self.transfer.admin_notes), ('cancelled', 'written elsewhere'))
+
+    def test_verify_tac_debits_once(self):
+        WalletService.credit_wallet(self.account.account_number, '200.00')
+        tac = TransferService.generate_tac(self.transfer.id)
+
+        result = TransferService.verify_tac(self.transfer.id, tac['tac_code'])
+
+        self.assertEqual(result['new_balance'], Decimal('150.00'))
+        self.assertEqual(WalletService.get_balance(self.account.account_number), Decimal('150.00'))
+        self.assertEqual(Transaction.objects.filter(reference=self.transfer.reference).count(), 1)
+
+        self.transfer.refresh_from_db()
+        self.assertEqual(self.transfer.status, 'funds_deducted')
+        self.assertEqual(TransferLimitUsage.objects.get(account=self.account).amount, Decimal('50.00'))
+
+        with self.assertRaises(TransferValidationError):
+            TransferService.verify_tac(self.transfer.id, tac['tac_code'])
+
+    def test_settle_requires_deducted_funds(self):
+        with self.assertRaises(TransferValidationError):
+            TransferService.mark_as_settled(self.transfer.id, 'EXT-1')
+
+        self.transfer.refresh_from_db()
+        self.assertEqual(self.transfer.status, 'pending')
+
+
+class TransferRequestStateMachineTests(TestCase):
+    """Test the compliance TransferRequest lifecycle on the state machine"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        self.request = TransferRequest.objects.create(
+            account=self.account,
+            amount=Decimal('75.00'),
+            recipient_name='Recipient',
+            destination_type='bank',
+            destination_details={},
+        )
+
+    def test_full_lifecycle(self):
+        code = self.request.generate_tac()
+        self.request.mark_tac_sent()
+        self.assertTrue(self.request.verify_tac(code))
+        self.request.mark_for_settlement()
+        self.request.mark_completed()
+
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.status, 'completed')
+        self.assertEqual(self.request.tac_code, code)
+        self.assertEqual(
+            sorted(self.request.logs.values_list('log_type', flat=True)),
+            sorted(['tac_generated', 'tac_sent', 'tac_verified', 'pending_settlement', 'completed'])
+        )
+
+    def test_stale_request_cannot_complete_twice(self):
+        self.request.generate_tac()
+        stale = TransferRequest.objects.get(id=self.request.id)
+
+        self.request.mark_tac_sent()
+        with self.assertRaises(ValueError):
+            stale.mark_tac_sent()
+
+        self.assertEqual(self.request.logs.filter(log_type='tac_sent').count(), 1)
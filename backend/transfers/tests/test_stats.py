@@ -0,0 +1,92 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from compliance.models import TransferRequest
+from compliance.services import TransferService as ComplianceTransferService
+from transfers.services import TransferService, AdminTransferService
+from utils.factories import make_account, make_transfer
+
+
+class TransferStatsTests(TestCase):
+    """Test the single-query, cached transfer aggregates"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        self.account_number = self.account.account_number
+        make_transfer(self.account, '100.00', reference='TRF-STATS-1')
+        make_transfer(self.account, '40.00', status='completed', reference='TRF-STATS-2')
+        make_transfer(self.account, '25.00', status='funds_deducted', reference='TRF-STATS-3')
+
+    def test_summary_is_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            summary = TransferService.get_transfer_summary(self.account_number)
+
+        self.assertEqual(summary, {
+            'total_count': 3, 'total_amount': Decimal('165.00'),
+            'today_count': 3, 'today_amount': Decimal('165.00'),
+            'pending_count': 1, 'pending_amount': Decimal('100.00'),
+            'completed_count': 1, 'completed_amount': Decimal('40.00'),
+        })
+
+        with self.assertNumQueries(0):
+            TransferService.get_transfer_summary(self.account_number)
+
+    def test_dashboard_stats(self):
+        with self.assertNumQueries(1):
+            stats = AdminTransferService.get_dashboard_stats()
+
+        self.assertEqual(stats, {
+            'total_transfers': 3,
+            'today_transfers': 3,
+            'pending_tac': 1,
+            'pending_settlement': 1,
+            'total_amount_today': Decimal('65.00'),
+            'total_amount_all': Decimal('65.00'),
+        })
+
+    def test_claimed_transfers_count_as_pending_settlement(self):
+        claimed = make_transfer(self.account, '10.00', status='pending_settlement', reference='TRF-STATS-4')
+
+        stats = AdminTransferService.get_dashboard_stats()
+
+        self.assertEqual(stats['pending_settlement'], 2)
+        self.assertEqual(stats['total_amount_all'], Decimal('75.00'))
+        self.assertIn(claimed, TransferService.get_pending_settlements())
+
+    def test_status_change_invalidates_caches(self):
+        TransferService.get_transfer_summary(self.account_number)
+        AdminTransferService.get_dashboard_stats()
+
+        transfer = self.account.transfers.get(reference='TRF-STATS-1')
+        with self.captureOnCommitCallbacks(execute=True):
+            transfer.status = 'cancelled'
+            transfer.save()
+
+        self.assertEqual(TransferService.get_transfer_summary(self.account_number)['pending_count'], 0)
+        self.assertEqual(AdminTransferService.get_dashboard_stats()['pending_tac'], 0)
+
+    def test_pending_admin_actions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            request = TransferRequest.objects.create(
+                account=self.account,
+                amount=Decimal('10.00'),
+                recipient_name='Recipient',
+                destination_type='bank',
+                destination_details={},
+            )
+
+        with self.assertNumQueries(1):
+            actions = ComplianceTransferService.get_pending_admin_actions()
+        self.assertEqual(actions, {'pending_tac': 1, 'tac_generated': 0, 'tac_verified': 0, 'kyc_required': 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            request.status = 'tac_generated'
+            request.save()
+
+        self.assertEqual(
+            ComplianceTransferService.get_pending_admin_actions(),
+            {'pending_tac': 0, 'tac_generated': 1, 'tac_verified': 0, 'kyc_required': 0}
+        )
@@ -0,0 +1,66 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from compliance.models import TransferRequest
+from compliance.services import TransferService as ComplianceTransferService
+from transfers.models import TAC
+from transfers.services import TransferService, TransferValidationError
+from utils.factories import make_account, make_transfer
+
+
+class TACExpiryTests(TestCase):
+    """Test the batched TAC expiry sweep"""
+
+    def setUp(self):
+        cache.clear()
+        self.account = make_account()
+        past = timezone.now() - timedelta(minutes=1)
+
+        self.expired_tacs = []
+        for i in range(3):
+            transfer = make_transfer(self.account, '10.00', status='tac_sent', reference=f'TRF-TAC-{i}')
+            self.expired_tacs.append(TAC.objects.create(transfer=transfer, code='111111', expires_at=past))
+        live = make_transfer(self.account, '10.00', status='tac_sent', reference='TRF-TAC-LIVE')
+        self.live_tac = TAC.objects.create(transfer=live, code='222222', expires_at=timezone.now() + timedelta(hours=1))
+
+        self.request = TransferRequest.objects.create(
+            account=self.account,
+            amount=Decimal('10.00'),
+            recipient_name='Recipient',
+            destination_type='bank',
+            destination_details={},
+        )
+        self.request.generate_tac()
+        self.request.mark_tac_sent()
+        TransferRequest.objects.filter(id=self.request.id).update(tac_expires_at=past)
+
+    def test_expire_transfer_tacs_in_batches(self):
+        self.assertEqual(TransferService.expire_tacs(batch_size=2), 3)
+
+        self.assertEqual(TAC.objects.filter(status='expired').count(), 3)
+        self.live_tac.refresh_from_db()
+        self.assertEqual(self.live_tac.status, 'pending')
+        self.assertEqual(TransferService.expire_tacs(), 0)
+
+    def test_expired_tac_cannot_be_verified(self):
+        with self.assertRaisesMessage(TransferValidationError, 'TAC is invalid or expired'):
+            TransferService.verify_tac(self.expired_tacs[0].transfer_id, '111111')
+
+    def test_expire_transfer_request_tacs(self):
+        self.assertEqual(ComplianceTransferService.expire_tacs(), 1)
+
+        self.request.refresh_from_db()
+        self.assertEqual((self.request.status, self.request.tac_code), ('pending_tac', None))
+        self.assertEqual(self.request.logs.filter(log_type='status_change').count(), 1)
+        self.assertEqual(ComplianceTransferService.get_pending_admin_actions()['pending_tac'], 1)
+
+    def test_command_reports_counts(self):
+        out = StringIO()
+        call_command('expire_tacs', stdout=out)
+        self.assertIn('Expired 4 TAC codes (3 transfers, 1 transfer requests)', out.getvalue())
@@ -2,11 +2,14 @@
 Transfer Views - API endpoints for transfer operations
 """
 
+import io
 import logging
 from rest_framework import viewsets, status, permissions, serializers
 from rest_framework.decorators import action, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from django.http import HttpResponse
 from django.utils import timezone
 from django.db import transaction
 from django.shortcuts import get_object_or_404
@@ -16,9 +19,12 @@ from .serializers import (
     TransferCreateSerializer, TransferSerializer, TransferDetailSerializer,
     TACVerificationSerializer, TransferSettlementSerializer,
     TransferCancelSerializer, TransferLimitSerializer, TransferLogSerializer,
-    TransferDashboardSerializer, AdminTransferSerializer
+    TransferDashboardSerializer, AdminTransferSerializer, TransferListSerializer
 )
 from .services import TransferService, AdminTransferService, TransferValidationError
+from .settlement import parse_settlement_csv, settle_transfers, render_results_csv, summarize
+from transactions.idempotency import idempotent
+from transactions.pagination import keyset_paginate, clamp_page_size, InvalidCursor
 
 logger = logging.getLogger(__name__)
 
@@ -38,15 +44,40 @@ class TransferViewSet(viewsets.ModelViewSet):
         if not account_number:
             return Transfer.objects.none()
 
-        # Get the Account object using the account_number
-        from accounts.models import Account
+        # Lists go through list_page(); this serves the single-transfer actions
+        return Transfer.objects.filter(
+            account__account_number=account_number
+        ).select_related('account', 'tac').order_by('-created_at')
+
+    def list_page(self, request, statuses=None):
+        """One cursor page of slim transfer rows for the authenticated user"""
+        account_number = getattr(request.user, 'account_number', None)
+        if not account_number:
+            return Response(
+                {'error': 'Account not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
         try:
-            account = Account.objects.get(account_number=account_number)
-            return Transfer.objects.filter(
-                account=account
-            ).select_related('tac').prefetch_related('logs').order_by('-created_at')
-        except Account.DoesNotExist:
-            return Transfer.objects.none()
+            transfers, next_cursor = TransferService.get_transfer_history(
+                account_number,
+                clamp_page_size(request.GET.get('limit')),
+                request.GET.get('cursor'),
+                statuses
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'transfers': TransferListSerializer(transfers, many=True).data,
+            'count': len(transfers),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }, status=status.HTTP_200_OK)
+
+    def list(self, request, *args, **kwargs):
+        """List transfers (slim rows, cursor paginated); details come from retrieve"""
+        return self.list_page(request)
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -91,6 +122,7 @@ class TransferViewSet(viewsets.ModelViewSet):
         serializer.instance = transfer
         return transfer  #  FIXED: Return the created transfer
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         """Override create to ensure proper response with full transfer data"""
         serializer = self.get_serializer(data=request.data)
@@ -168,48 +200,33 @@ class TransferViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def pending(self, request):
         """Get pending transfers for user"""
-        user = request.user
-
-        # FIX: Get account number directly from user (Account object)
-        account_number = user.account_number if hasattr(user, 'account_number') else None
-
-        if not account_number:
-            return Response(
-                {'error': 'Account not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-        # Get the Account object using the account_number
-        from accounts.models import Account
-        try:
-            account = Account.objects.get(account_number=account_number)
-            pending_transfers = Transfer.objects.filter(
-                account=account,
-                status__in=['pending', 'tac_sent', 'tac_verified']
-            ).order_by('-created_at')
-        except Account.DoesNotExist:
-            pending_transfers = Transfer.objects.none()
-
-        serializer = TransferSerializer(pending_transfers, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.list_page(request, statuses=['pending', 'tac_sent', 'tac_verified'])
 
     @action(detail=False, methods=['get'])
     def history(self, request):
         """Get transfer history for user"""
-        user = request.user
+        return self.list_page(request)
 
-        # FIX: Get account number directly from user (Account object)
-        account_number = user.account_number if hasattr(user, 'account_number') else None
+    @action(detail=True, methods=['get'])
+    def logs(self, request, pk=None):
+        """Get the full log of one transfer, newest first (cursor paginated)"""
+        transfer = self.get_object()
 
-        if not account_number:
-            return Response(
-                {'error': 'Account not found'},
-                status=status.HTTP_404_NOT_FOUND
+        try:
+            logs, next_cursor = keyset_paginate(
+                TransferLog.objects.filter(transfer=transfer),
+                request.GET.get('cursor'),
+                clamp_page_size(request.GET.get('limit')),
+                field='created_at'
             )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        transfers = TransferService.get_transfer_history(account_number)
-        serializer = TransferSerializer(transfers, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response({
+            'logs': TransferLogSerializer(logs, many=True).data,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }, status=status.HTTP_200_OK)
 
 
 class AdminTransferViewSet(viewsets.ModelViewSet):
@@ -257,6 +274,8 @@ class AdminTransferViewSet(viewsets.ModelViewSet):
 
             return Response(tac_info, status=status.HTTP_200_OK)
 
+        except TransferValidationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             logger.error(f"Error generating TAC: {str(e)}")
             return Response(
@@ -300,6 +319,8 @@ class AdminTransferViewSet(viewsets.ModelViewSet):
             serializer = self.get_serializer(transfer)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
+        except TransferValidationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             logger.error(f"Error settling transfer: {str(e)}")
             return Response(
@@ -307,6 +328,31 @@ class AdminTransferViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='settle-bulk', parser_classes=[MultiPartParser])
+    def settle_bulk(self, request):
+        """Settle transfers from an uploaded bank settlement CSV (admin only)"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'Upload the settlement CSV as "file"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            rows = parse_settlement_csv(io.TextIOWrapper(upload.file, encoding='utf-8-sig'))
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = settle_transfers(rows, settled_by=request.user)
+        summary = summarize(results)
+        logger.info(f"Bulk settlement by {request.user.email}: {summary}")
+
+        response = HttpResponse(render_results_csv(results), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="settlement-results.csv"'
+        for outcome, count in summary.items():
+            response[f"X-Settlement-{outcome.replace('_', '-').title()}"] = str(count)
+        return response
+
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """Cancel a transfer (admin only)"""
@@ -0,0 +1,39 @@
+# backend/utils/factories.py
+"""
+Model factories shared by the app test suites
+
+Nothing here clears the cache: tests that depend on a cold cache call
+cache.clear() in setUp, before creating their accounts.
+"""
+
+from decimal import Decimal
+
+from django.utils import timezone
+
+from accounts.models import Account
+from transfers.models import Transfer
+
+
+def make_account(email='test@claverica.com', phone='+254700000001', first_name='Test', last_name='User'):
+    """Create an account; signals create its wallet and notification preferences"""
+    return Account.objects.create_user(
+        email=email,
+        password='testpass123',
+        phone=phone,
+        first_name=first_name,
+        last_name=last_name,
+    )
+
+
+def make_transfer(account, amount, status='pending', reference='TRF-TEST-1'):
+    """Create a transfer; funds_deducted ones are stamped deducted_at"""
+    return Transfer.objects.create(
+        reference=reference,
+        account=account,
+        amount=Decimal(amount),
+        recipient_name='Recipient',
+        destination_type='claverica',
+        destination_details={'account_number': 'CLV-TEST'},
+        status=status,
+        deducted_at=timezone.now() if status == 'funds_deducted' else None,
+    )
@@ -1,37 +1,227 @@
 # backend/utils/pusher.py
+"""
+Pusher client and request-scoped event dispatch
+
+trigger_notification() does not call Pusher. It queues the event:
+
+  * events queued inside a transaction are only kept if it commits;
+  * during a request (PusherDispatchMiddleware) events collect until the
+    response is ready, then go out together;
+  * outside a request (workers, shell) each committed event goes out on
+    its own.
+
+Going out means: coalesce() the events (drop duplicates, and fold a
+burst of per-item events such as notification.updated into one
+notifications.bulk_updated per channel), then send them through Pusher's
+batch_events API, up to 10 events per call, on a background thread, so
+the request thread never waits on Pusher.
+
+send_events() is the synchronous path, for callers that need to know
+whether Pusher accepted the events (the notification outbox worker).
+"""
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pusher
 from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
 
-def get_pusher_client():
+BATCH_LIMIT = 10  # Pusher: events per batch_events call
+
+# Per-item event -> bulk event that replaces a burst of them on one channel
+COALESCED_EVENTS = {
+    'notification.updated': 'notifications.bulk_updated',
+}
+COALESCE_THRESHOLD = getattr(settings, 'PUSHER_COALESCE_THRESHOLD', 3)
+COALESCE_MAX_IDS = getattr(settings, 'PUSHER_COALESCE_MAX_IDS', 500)  # Keeps the bulk event under Pusher's 10KB
+
+
+def get_pusher_client(**options):
     """
     Initialize and return a Pusher client instance
     """
-    pusher_client = pusher.Pusher(
-        app_id=settings.PUSHER_APP_ID,
-        key=settings.PUSHER_KEY,
-        secret=settings.PUSHER_SECRET,
-        cluster=settings.PUSHER_CLUSTER,
-        ssl=settings.PUSHER_SSL
-    )
+    options = {
+        'app_id': settings.PUSHER_APP_ID,
+        'key': settings.PUSHER_KEY,
+        'secret': settings.PUSHER_SECRET,
+        'cluster': settings.PUSHER_CLUSTER,
+        'ssl': settings.PUSHER_SSL,
+        **options,
+    }
+    pusher_client = pusher.Pusher(**options)
     return pusher_client
 
 # Singleton instance for reuse
 pusher_client = get_pusher_client()
 
+
+def user_channel(account_number):
+    """Private channel of one user"""
+    return f'private-user-{account_number}'
+
+
+def coalesce(events):
+    """
+    Shrink a list of (channel, event_name, data) events, keeping order.
+
+    Exact duplicates are dropped. COALESCE_THRESHOLD or more events named in
+    COALESCED_EVENTS on one channel become a single bulk event, in place of
+    the first of them, with data {'count', 'ids', 'status'} ('ids' is left
+    out past COALESCE_MAX_IDS - clients then refetch; 'status' only when
+    all events agree on it).
+    """
+    unique, seen = [], set()
+    for channel, name, data in events:
+        key = (channel, name, json.dumps(data, sort_keys=True, default=str))
+        if key not in seen:
+            seen.add(key)
+            unique.append((channel, name, data))
+
+    bursts = {}
+    for channel, name, data in unique:
+        if name in COALESCED_EVENTS:
+            bursts.setdefault((channel, name), []).append(data)
+
+    coalesced, emitted = [], set()
+    for channel, name, data in unique:
+        burst = bursts.get((channel, name))
+        if burst is None or len(burst) < COALESCE_THRESHOLD:
+            coalesced.append((channel, name, data))
+            continue
+        if (channel, name) in emitted:
+            continue
+        emitted.add((channel, name))
+
+        bulk = {'count': len(burst)}
+        if len(burst) <= COALESCE_MAX_IDS:
+            bulk['ids'] = [item.get('id') for item in burst]
+        statuses = {item.get('status') for item in burst}
+        if len(statuses) == 1:
+            bulk['status'] = statuses.pop()
+        coalesced.append((channel, COALESCED_EVENTS[name], bulk))
+
+    return coalesced
+
+
+def send_events(events, client=None):
+    """
+    Trigger (channel, event_name, data) events now, BATCH_LIMIT per call.
+
+    Returns:
+        True if Pusher accepted every batch
+    """
+    client = client or pusher_client
+    ok = True
+    for start in range(0, len(events), BATCH_LIMIT):
+        batch = [
+            {'channel': channel, 'name': name, 'data': data}
+            for channel, name, data in events[start:start + BATCH_LIMIT]
+        ]
+        try:
+            client.trigger_batch(batch)
+            logger.debug(f"Pusher: triggered {len(batch)} event(s)")
+        except Exception as e:
+            logger.error(f"Pusher error: {e}")
+            ok = False
+    return ok
+
+
+class EventDispatcher:
+    """Queues events per request and sends them, coalesced, off the request thread"""
+
+    def __init__(self, client=None, max_workers=2):
+        self.client = client
+        self.max_workers = max_workers
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._pending = set()
+
+    def begin(self):
+        """Start collecting this thread's events (request start)"""
+        self._local.events = []
+
+    def end(self):
+        """Send everything collected since begin() (request end)"""
+        events, self._local.events = getattr(self._local, 'events', None), None
+        if events:
+            self.flush(events)
+
+    def queue(self, channel, event_name, data):
+        """Queue an event; it is dropped if the current transaction rolls back"""
+        transaction.on_commit(lambda: self._collect((channel, event_name, data)))
+
+    def _collect(self, event):
+        events = getattr(self._local, 'events', None)
+        if events is None:
+            self.flush([event])
+        else:
+            events.append(event)
+
+    def flush(self, events):
+        """Coalesce events and send them on the background pool"""
+        events = coalesce(events)
+        future = self._pool().submit(send_events, events, self.client)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def wait(self, timeout=None):
+        """Block until every flushed event has been sent (tests, shutdown)"""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.result(timeout)
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                # Threads do not survive fork; start a new pool in the child
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pusher')
+                self._executor_pid = os.getpid()
+                self._pending = set()
+            return self._executor
+
+
+dispatcher = EventDispatcher()
+
+
+class PusherDispatchMiddleware:
+    """Collects a request's Pusher events and sends them once the response is ready"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        dispatcher.begin()
+        try:
+            return self.get_response(request)
+        finally:
+            dispatcher.end()
+
+
 def trigger_notification(account_number, event_name, data):
     """
     Helper function to trigger a notification to a specific user
-    
+
+    The event is queued on the dispatcher (see module docstring); it is
+    sent after the request/transaction, coalesced with its neighbours.
+
     Args:
         account_number: The user's account number (for private channel)
         event_name: The event name (e.g., 'notification.created')
         data: Dictionary of data to send
     """
-    channel = f'private-user-{account_number}'
-    try:
-        pusher_client.trigger(channel, event_name, data)
-        print(f" Pusher: Triggered {event_name} to {channel}")
-        return True
-    except Exception as e:
-        print(f" Pusher error: {e}")
-        return False
+    dispatcher.queue(user_channel(account_number), event_name, data)
+    return True
@@ -0,0 +1,37 @@
+# backend/utils/pusher_stub.py
+"""
+Local stand-in for the Pusher HTTP API, for tests of utils.pusher.
+
+    with PusherStub() as stub:
+        send_events(events, client=stub.client())
+        stub.events()  # triggered events, in arrival order
+"""
+import json
+
+import pusher
+
+from .sendgrid_stub import SendGridStub
+
+
+class PusherStub(SendGridStub):
+    """Threaded HTTP server that accepts Pusher trigger/batch_events POSTs"""
+
+    response_body = b'{}'
+
+    def __init__(self, status=200, latency=0.0):
+        super().__init__(status=status, latency=latency)
+
+    def client(self):
+        """Pusher client that talks to this stub"""
+        host, port = self._server.server_address
+        return pusher.Pusher(app_id='1', key='stub-key', secret='stub-secret', host=host, port=port, ssl=False)
+
+    def events(self):
+        """(channel, name, data) of every event received, batch calls flattened"""
+        events = []
+        for request in self.requests:
+            for event in request.get('batch', [request]):
+                channels = event.get('channels') or [event['channel']]
+                for channel in channels:
+                    events.append((channel, event['name'], json.loads(event['data'])))
+        return events
@@ -0,0 +1,79 @@
+# backend/utils/sendgrid_stub.py
+"""
+Local stand-in for the SendGrid v3 mail/send endpoint, for tests and
+benchmarks of backend.email_backend.SendGridEmailBackend.
+
+    with SendGridStub(latency=0.02) as stub:
+        backend = SendGridEmailBackend(api_key='test', api_url=stub.url)
+        backend.send_messages(messages)
+        stub.requests  # decoded JSON bodies, in arrival order
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SendGridStub:
+    """
+    Threaded HTTP server that accepts mail/send POSTs with a fixed status;
+    requests whose subject is in reject_subjects get a 400
+    """
+
+    response_body = b''
+
+    def __init__(self, status=202, latency=0.0, reject_subjects=()):
+        self.status = status
+        self.reject_subjects = set(reject_subjects)
+        self.latency = latency
+        self.requests = []
+        self.paths = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/v3/mail/send'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real API, so connection reuse is measurable
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                data = json.loads(body or b'{}')
+                with stub._lock:
+                    stub.requests.append(data)
+                    stub.paths.append(self.path.split('?')[0])
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                self.send_response(400 if data.get('subject') in stub.reject_subjects else stub.status)
+                self.send_header('Content-Length', str(len(stub.response_body)))
+                self.end_headers()
+                self.wfile.write(stub.response_body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
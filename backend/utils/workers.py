@@ -0,0 +1,182 @@
+# backend/utils/workers.py
+"""
+Claim-process-record batch workers and their management commands
+
+The notification outbox worker, the digest worker and the settlement
+worker all loop the same way:
+
+  * claim() a batch of rows in one short transaction (SELECT ... FOR
+    UPDATE SKIP LOCKED), so concurrent workers never share a row;
+  * process() each claimed item on a thread pool, outside any transaction;
+  * record() all outcomes of the batch;
+  * sleep for poll_interval whenever the batch came back short (nothing
+    more is due), or, with once, stop.
+
+ClaimWorker runs that loop; subclasses supply the three hooks. Items that
+fail are expected to be made not-due by record() (backoff_delay()), so a
+failing dependency cannot keep the batches full and spin the loop.
+
+ClaimWorkerCommand is the matching management command: the shared
+--threads/--batch-size/--claim-timeout/--poll-interval/--once options,
+progress lines and the final summary.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+
+def backoff_delay(attempts, base, cap):
+    """Seconds to wait before retrying after the given number of failed attempts"""
+    return min(base * 2 ** (attempts - 1), cap)
+
+
+class ClaimWorker:
+    """Claims batches and processes them on a thread pool; see the module docstring"""
+
+    # Keys of the counts returned by record() (and of run()'s totals)
+    COUNTS = ('claimed',)
+    thread_name_prefix = 'worker'
+    poll_interval = 2  # seconds
+
+    def __init__(self, threads, batch_size, claim_timeout):
+        self.threads = threads
+        self.batch_size = batch_size
+        self.claim_timeout = claim_timeout
+
+    def claim(self):
+        """Claim up to batch_size items; returns a list"""
+        raise NotImplementedError
+
+    def process(self, item):
+        """Handle one claimed item (runs on the pool); returns a result or raises"""
+        raise NotImplementedError
+
+    def record(self, outcomes):
+        """
+        Write the outcomes of one batch.
+
+        Args:
+            outcomes: List of (item, result, error); error is None on success
+
+        Returns:
+            Dict of counts (keys from COUNTS); may override 'claimed'
+        """
+        raise NotImplementedError
+
+    def run_batch(self, pool):
+        """
+        Claim, process and record one batch.
+
+        Returns:
+            (counts, number of items claimed)
+        """
+        items = self.claim()
+        counts = dict.fromkeys(self.COUNTS, 0)
+        counts['claimed'] = len(items)
+        if not items:
+            return counts, 0
+
+        outcomes = []
+        futures = {pool.submit(self.process, item): item for item in items}
+        for future in as_completed(futures):
+            try:
+                outcomes.append((futures[future], future.result(), None))
+            except Exception as e:
+                outcomes.append((futures[future], None, e))
+
+        counts.update(self.record(outcomes))
+        return counts, len(items)
+
+    def run(self, once=False, poll_interval=None, on_batch=None):
+        """
+        Work until stopped (or, with once, until nothing is due).
+
+        Sleeps poll_interval (default: the class's) after a short batch.
+
+        Returns:
+            Totals of the per-batch counts
+        """
+        totals = dict.fromkeys(self.COUNTS, 0)
+
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix=self.thread_name_prefix) as pool:
+            while True:
+                counts, claimed = self.run_batch(pool)
+                for key, value in counts.items():
+                    totals[key] += value
+                if on_batch and claimed:
+                    on_batch(counts)
+
+                if claimed < self.batch_size:
+                    if once:
+                        break
+                    time.sleep(self.poll_interval if poll_interval is None else poll_interval)
+
+        return totals
+
+
+class ClaimWorkerCommand(BaseCommand):
+    """
+    Management command running a ClaimWorker.
+
+    Subclasses set the defaults and implement make_worker(), batch_line()
+    and summary_line(); add_worker_arguments() adds command-specific options
+    and header_line() an optional start-up line.
+    """
+
+    default_threads = 4
+    default_batch_size = 50
+    default_claim_timeout = 10 * 60
+    default_poll_interval = ClaimWorker.poll_interval
+    batch_help = 'Rows claimed per batch'
+    threads_help = 'Concurrent deliveries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=self.default_threads,
+                            help=f'{self.threads_help} (default {self.default_threads})')
+        parser.add_argument('--batch-size', type=int, default=self.default_batch_size,
+                            help=f'{self.batch_help} (default {self.default_batch_size})')
+        parser.add_argument('--claim-timeout', type=int, default=self.default_claim_timeout,
+                            help=f'Seconds before an abandoned claim is retried (default {self.default_claim_timeout})')
+        parser.add_argument('--poll-interval', type=float, default=self.default_poll_interval,
+                            help=f'Seconds to sleep when idle (default {self.default_poll_interval:g})')
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is due')
+        self.add_worker_arguments(parser)
+
+    def add_worker_arguments(self, parser):
+        pass
+
+    def header_line(self, worker, options):
+        """Optional line written before the worker starts"""
+        return None
+
+    def make_worker(self, options):
+        raise NotImplementedError
+
+    def batch_line(self, counts):
+        """Progress line written after each non-empty batch"""
+        raise NotImplementedError
+
+    def summary_line(self, totals, elapsed):
+        """Line written when the worker stops"""
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        worker = self.make_worker(options)
+        header = self.header_line(worker, options)
+        if header:
+            self.stdout.write(header)
+
+        started = time.perf_counter()
+        try:
+            totals = worker.run(
+                once=options['once'],
+                poll_interval=options['poll_interval'],
+                on_batch=lambda counts: self.stdout.write(f"  {self.batch_line(counts)}")
+            )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Stopped"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(self.summary_line(totals, time.perf_counter() - started)))